@@ -0,0 +1,326 @@
+"""Fetching and text extraction for linked news articles"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import DecodeError, ProtocolError, ReadTimeoutError
+
+from automation.rate_limit import CHARS_PER_TOKEN
+from automation.urls import canonicalize_url
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "viral_content_automation" / "articles"
+DEFAULT_USER_AGENT = "Mozilla/5.0 (compatible; ViralContentBot/1.0)"
+
+# Stop reading a page after this many bytes; article text is near the top anyway
+DEFAULT_MAX_BYTES = 2_000_000
+
+_HTML_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class Article:
+    """Main text extracted from an article page"""
+    url: str
+    title: str
+    text: str
+    fetched_at: float
+    truncated: bool = False  # The page was cut off by the byte cap or the time limit
+
+
+class _TextExtractor(HTMLParser):
+    """Collects headings and paragraphs, ignoring scripts and page chrome"""
+
+    SKIP = {
+        "script", "style", "noscript", "template", "svg", "iframe", "form",
+        "nav", "header", "footer", "aside", "button", "select", "figure",
+    }
+    BLOCKS = {"p", "h1", "h2", "h3", "h4", "li", "blockquote", "pre", "td"}
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.og_title = ""
+        self.paragraphs: List[str] = []
+        self.article_paragraphs: List[str] = []
+        self._skip_depth = 0
+        self._article_depth = 0
+        self._in_title = False
+        self._buffer: List[str] = []
+
+    def _flush(self) -> None:
+        text = _WHITESPACE.sub(" ", "".join(self._buffer)).strip()
+        self._buffer = []
+        if text:
+            self.paragraphs.append(text)
+            if self._article_depth:
+                self.article_paragraphs.append(text)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag == "meta":
+            values = dict(attrs)
+            if values.get("property") == "og:title" and values.get("content"):
+                self.og_title = values["content"].strip()
+        elif tag in ("article", "main"):
+            self._flush()
+            self._article_depth += 1
+        elif tag in self.BLOCKS or tag == "br":
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "title":
+            self._in_title = False
+        elif tag in ("article", "main"):
+            self._flush()
+            self._article_depth = max(0, self._article_depth - 1)
+        elif tag in self.BLOCKS:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth:
+            self._buffer.append(data)
+
+    def close(self) -> None:
+        super().close()
+        self._flush()
+
+
+def extract_text(html: str, min_paragraph_chars: int = 40) -> Article:
+    """
+    Pull the readable text out of an HTML page
+
+    Paragraphs inside <article> or <main> are preferred when there are any.
+    Fragments shorter than min_paragraph_chars (bylines, share buttons,
+    captions) are dropped.
+
+    Returns:
+        An Article with the page title and text; url and fetched_at are left empty
+    """
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+
+    paragraphs = parser.article_paragraphs or parser.paragraphs
+    kept = [p for p in paragraphs if len(p) >= min_paragraph_chars]
+    title = parser.og_title or _WHITESPACE.sub(" ", parser.title).strip()
+    return Article(url="", title=title, text="\n\n".join(kept), fetched_at=0.0)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly max_tokens, preferring paragraph and sentence boundaries"""
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    for boundary in ("\n\n", ". ", " "):
+        index = cut.rfind(boundary)
+        if index > limit // 2:
+            cut = cut[:index + (1 if boundary == ". " else 0)]
+            break
+    return cut.rstrip() + "\n[…]"
+
+
+class ArticleCache:
+    """Stores extracted articles as gzip JSON keyed by canonical URL"""
+
+    def __init__(
+        self, directory: Union[str, Path] = DEFAULT_CACHE_DIR, max_age: float = 7 * 24 * 3600
+    ) -> None:
+        self._directory = Path(directory)
+        self._max_age = max_age
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha256(canonicalize_url(url).encode("utf-8")).hexdigest()
+
+    def _path(self, url: str) -> Path:
+        key = self.key(url)
+        return self._directory / key[:2] / f"{key}.json.gz"
+
+    def load(self, url: str) -> Optional[Article]:
+        """Read an article, returning None if it is missing, unreadable or expired"""
+        try:
+            with gzip.open(self._path(url), "rt", encoding="utf-8") as f:
+                article = Article(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+        if time.time() - article.fetched_at > self._max_age:
+            return None
+        return article
+
+    def store(self, article: Article) -> None:
+        """Write an article atomically so readers never see a partial file"""
+        path = self._path(article.url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw_file, gzip.GzipFile(fileobj=raw_file, mode="wb") as f:
+                f.write(json.dumps(asdict(article), separators=(",", ":")).encode("utf-8"))
+            os.replace(tmp_name, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+
+
+def _iter_body(response: requests.Response, chunk_size: int) -> Iterator[bytes]:
+    """Yield the decoded body in chunks as they arrive rather than once chunk_size have"""
+    read1 = getattr(response.raw, "read1", None)  # urllib3 2.x
+    if read1 is None:
+        yield from response.iter_content(chunk_size=chunk_size)
+        return
+    while True:
+        # Raised as requests' exceptions, the same way iter_content does
+        try:
+            chunk = read1(chunk_size, decode_content=True)
+        except ReadTimeoutError as e:
+            raise requests.ConnectionError(e) from e
+        except ProtocolError as e:
+            raise requests.exceptions.ChunkedEncodingError(e) from e
+        except DecodeError as e:
+            raise requests.exceptions.ContentDecodingError(e) from e
+        if not chunk:
+            return
+        yield chunk
+
+
+class ArticleFetcher:
+    """
+    Downloads article pages concurrently and extracts their main text
+
+    Requests go through one pooled session, at most max_workers at a time.
+    Each body is streamed and reading stops after max_bytes or once timeout
+    seconds have passed since the request started, so a huge or slow page
+    costs a bounded amount of time and memory; whatever arrived by then is
+    still used. A server that stops sending altogether is given up on after
+    another timeout seconds of silence. Non-HTML responses are skipped.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[ArticleCache] = None,
+        session: Optional[requests.Session] = None,
+        max_workers: int = 8,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        timeout: float = 10.0,
+        user_agent: str = DEFAULT_USER_AGENT,
+    ) -> None:
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2 * max_workers, pool_maxsize=max_workers)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self._session = session
+        self._cache = cache
+        self._max_workers = max_workers
+        self._max_bytes = max_bytes
+        self._timeout = timeout
+        self._user_agent = user_agent
+
+    def _download(self, url: str) -> Optional[Article]:
+        deadline = time.monotonic() + self._timeout
+        with self._session.get(
+            url,
+            headers={"User-Agent": self._user_agent, "Accept": "text/html,*/*;q=0.5"},
+            timeout=self._timeout,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "text/html").lower()
+            if not content_type.startswith(_HTML_TYPES):
+                return None
+
+            chunks: List[bytes] = []
+            size = 0
+            truncated = False
+            try:
+                for chunk in _iter_body(response, 64 * 1024):
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= self._max_bytes or time.monotonic() > deadline:
+                        truncated = True
+                        break
+            except requests.ConnectionError:
+                if not chunks:
+                    raise
+                truncated = True  # The server stalled mid-page; keep what arrived
+            body = b"".join(chunks)[:self._max_bytes]
+
+        # requests assumes ISO-8859-1 for text/* without a charset; prefer the page's own
+        charset = None
+        if "charset=" in content_type:
+            charset = response.encoding
+        else:
+            match = _META_CHARSET.search(body[:4096])
+            if match:
+                charset = match.group(1).decode("ascii")
+        try:
+            html = body.decode(charset or "utf-8", errors="replace")
+        except LookupError:
+            html = body.decode("utf-8", errors="replace")
+
+        article = extract_text(html)
+        if not article.text:
+            return None
+        article.url = url
+        article.fetched_at = time.time()
+        article.truncated = truncated
+        return article
+
+    def fetch(self, url: str) -> Optional[Article]:
+        """
+        Get the article at url, from the cache if possible
+
+        Returns:
+            The article, or None if it could not be downloaded or had no text
+        """
+        if self._cache is not None:
+            cached = self._cache.load(url)
+            if cached is not None:
+                return cached
+        try:
+            article = self._download(url)
+        except (requests.RequestException, ValueError):
+            return None
+        if article is not None and self._cache is not None:
+            self._cache.store(article)
+        return article
+
+    def fetch_many(self, urls: Iterable[str]) -> Dict[str, Optional[Article]]:
+        """Fetch several articles concurrently; each distinct page is downloaded once"""
+        urls = list(urls)
+        by_canonical: Dict[str, str] = {}
+        for url in urls:
+            by_canonical.setdefault(canonicalize_url(url), url)
+        if not by_canonical:
+            return {}
+
+        workers = max(1, min(self._max_workers, len(by_canonical)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            fetched = dict(zip(by_canonical, executor.map(self.fetch, by_canonical.values())))
+        return {url: fetched[canonicalize_url(url)] for url in urls}
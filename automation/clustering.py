@@ -0,0 +1,243 @@
+"""Near-duplicate clustering of topics that cover the same story"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+import re
+import zlib
+
+from automation.models import TrendingTopic
+from automation.urls import canonicalize_url
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Up to this many topics are compared pairwise on exact Jaccard similarity,
+# which is cheaper than loading NumPy; larger sets go through MinHash and LSH
+EXACT_LIMIT = 256
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have",
+    "in", "is", "it", "its", "of", "on", "or", "that", "the", "this", "to", "was",
+    "were", "will", "with", "after", "over", "new", "says", "say", "html", "htm",
+    "www", "com", "index", "amp", "article", "story", "news",
+}
+
+
+@lru_cache(maxsize=1 << 17)
+def _word_hash(word: str) -> Optional[int]:
+    """Hash of a content word, with a trailing plural or third-person s dropped"""
+    if word in _STOPWORDS or len(word) < 2 or word.isdigit():
+        return None
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+    return zlib.crc32(word.encode("utf-8"))
+
+
+def _url_path(url: str) -> str:
+    """Path of a URL without the cost of a full urlsplit"""
+    rest = url.split("://", 1)[-1]
+    slash = rest.find("/")
+    if slash < 0:
+        return ""
+    return rest[slash:].split("?", 1)[0].split("#", 1)[0]
+
+
+def shingles(topic: TrendingTopic) -> List[int]:
+    """
+    Hashed content words of a topic's title and article URL slug
+
+    Single words rather than word n-grams, since outlets phrase the same
+    headline differently. URL slugs usually repeat the headline, so they
+    share words with other outlets' titles for the same story; domains and
+    numbers (dates, ids) are left out on purpose.
+    """
+    text = topic.title.lower()
+    if topic.article_url:
+        text += " " + _url_path(topic.article_url).lower()
+    hashes = {_word_hash(word) for word in _TOKEN.findall(text)}
+    hashes.discard(None)
+    return list(hashes)
+
+
+def minhash_signatures(
+    shingle_sets: Sequence[Sequence[int]], num_perm: int = 128, seed: int = 1, chunk: int = 4096
+) -> np.ndarray:
+    """
+    MinHash signature per shingle set, as an (n, num_perm) uint32 array
+
+    Uses multiply-add-shift hash functions ((a * x + b) mod 2^64) >> 32 over
+    32-bit shingle hashes, evaluated for a chunk of sets at a time. Empty
+    sets get a row of all ones-bits and should not be compared.
+    """
+    import numpy as np
+
+    rng = np.random.RandomState(seed)
+    a = rng.randint(0, 1 << 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.randint(0, 1 << 63, num_perm, dtype=np.uint64)
+    signatures = np.full((len(shingle_sets), num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+
+    for start in range(0, len(shingle_sets), chunk):
+        block = [(i, s) for i, s in enumerate(shingle_sets[start:start + chunk], start) if s]
+        if not block:
+            continue
+        rows = np.array([i for i, _ in block])
+        lengths = np.array([len(s) for _, s in block])
+        flat = np.fromiter((h for _, s in block for h in s), dtype=np.uint64, count=int(lengths.sum()))
+        # One row per hash function keeps each set's values contiguous for reduceat
+        hashed = ((a[:, None] * flat[None, :] + b[:, None]) >> np.uint64(32)).astype(np.uint32)
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        signatures[rows] = np.minimum.reduceat(hashed, offsets, axis=1).T
+    return signatures
+
+
+class _UnionFind:
+    def __init__(self, n: int) -> None:
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> None:
+        i, j = self.find(i), self.find(j)
+        if i != j:
+            self.parent[max(i, j)] = min(i, j)
+
+
+@dataclass
+class TopicCluster:
+    """
+    Topics judged to be the same story
+
+    The representative keeps its own Reddit score and comment count; score
+    and comment_count are the whole story's totals, for ranking.
+    """
+    representative: TrendingTopic  # Highest-scoring member
+    members: List[TrendingTopic] = field(default_factory=list)
+
+    @property
+    def score(self) -> int:
+        return sum(t.score for t in self.members)
+
+    @property
+    def comment_count(self) -> int:
+        return sum(t.comment_count for t in self.members)
+
+
+class NearDuplicateClusterer:
+    """
+    Groups topics whose titles and article URLs are near-duplicates
+
+    Each topic gets a MinHash signature over its shingles. Signatures are cut
+    into bands and topics sharing a band bucket become candidates; a
+    candidate joins its bucket's first member if their estimated Jaccard
+    similarity reaches threshold. Topics with the same canonical article URL
+    are always grouped. Bucketing is a sort per band, so the whole pass is
+    roughly linear in the number of topics. At most exact_limit topics (a
+    normal interactive fetch) are instead compared pairwise on their exact
+    similarity, so NumPy only loads for large batches.
+
+    The default 32 bands of 4 rows put the LSH threshold near 0.42, just
+    above the default similarity threshold.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.4,
+        num_perm: int = 128,
+        bands: int = 32,
+        seed: int = 1,
+        exact_limit: int = EXACT_LIMIT,
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self._threshold = threshold
+        self._num_perm = num_perm
+        self._bands = bands
+        self._seed = seed
+        self._exact_limit = exact_limit
+
+    def _link_exact(self, sets: Sequence[Sequence[int]], groups: _UnionFind) -> None:
+        """Join each topic to the first earlier one whose similarity reaches threshold"""
+        word_sets = [frozenset(s) for s in sets]
+        for i, words in enumerate(word_sets):
+            if not words:
+                continue
+            for j in range(i):
+                other = word_sets[j]
+                if other and len(words & other) >= self._threshold * len(words | other):
+                    groups.union(i, j)
+                    break
+
+    def _link_duplicates(self, topics: Sequence[TrendingTopic], groups: _UnionFind) -> None:
+        first_by_url: Dict[str, int] = {}
+        for i, topic in enumerate(topics):
+            if topic.article_url:
+                j = first_by_url.setdefault(canonicalize_url(topic.article_url), i)
+                if j != i:
+                    groups.union(i, j)
+
+        sets = [shingles(t) for t in topics]
+        if len(topics) <= self._exact_limit:
+            self._link_exact(sets, groups)
+            return
+
+        import numpy as np
+
+        signatures = minhash_signatures(sets, self._num_perm, self._seed)
+        has_shingles = np.array([bool(s) for s in sets])
+        rows = self._num_perm // self._bands
+        for band in range(self._bands):
+            block = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+            keys = block.view(np.dtype((np.void, block.dtype.itemsize * rows))).ravel()
+            _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            leader = first[inverse.ravel()]
+            candidates = np.flatnonzero((leader != np.arange(len(topics))) & has_shingles)
+            if not len(candidates):
+                continue
+            similarity = (signatures[candidates] == signatures[leader[candidates]]).mean(axis=1)
+            for i in candidates[similarity >= self._threshold]:
+                groups.union(int(i), int(leader[i]))
+
+    def cluster(self, topics: Sequence[TrendingTopic]) -> List[TopicCluster]:
+        """
+        Group topics into stories
+
+        The same post fetched from several configs counts once.
+
+        Returns:
+            Clusters in order of their first topic
+        """
+        unique: List[TrendingTopic] = []
+        by_id: Dict[str, int] = {}
+        for topic in topics:
+            index = by_id.get(topic.id) if topic.id else None
+            if index is None:
+                if topic.id:
+                    by_id[topic.id] = len(unique)
+                unique.append(topic)
+            elif topic.score > unique[index].score:
+                unique[index] = topic
+
+        groups = _UnionFind(len(unique))
+        if len(unique) > 1:
+            self._link_duplicates(unique, groups)
+
+        clusters: Dict[int, TopicCluster] = {}
+        for i, topic in enumerate(unique):
+            cluster = clusters.setdefault(groups.find(i), TopicCluster(topic))
+            cluster.members.append(topic)
+            if topic.score > cluster.representative.score:
+                cluster.representative = topic
+        return list(clusters.values())
+
+    def representatives(self, topics: Sequence[TrendingTopic]) -> List[TrendingTopic]:
+        """The highest-scoring topic of each story, unchanged"""
+        return [cluster.representative for cluster in self.cluster(topics)]
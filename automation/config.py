@@ -1,8 +1,11 @@
 """Configuration for Reddit API client"""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List
 
+from automation.filters import WORD_MODE
+from automation.models import REDDIT_BASE_URL
+
 
 @dataclass
 class RedditConfig:
@@ -11,13 +14,20 @@ class RedditConfig:
     limit: int = 25
     minimum_score: int = 100
     user_agent: str = "ViralContentAutomation/1.0"
+    blocked_keywords: List[str] = field(default_factory=list)  # Extra terms on top of the political filter
+    keyword_match_mode: str = WORD_MODE  # "word" or "phrase"
+    max_pages: int = 1  # Listing pages to follow via the after cursor
+    target_topics: int = 0  # Stop paging once this many posts pass the filters (0 reads every page)
+    cache_ttl: int = 0  # Seconds a cached listing is served without revalidation (0 disables caching)
+    cache_stale_ttl: int = 0  # Extra seconds a stale listing is served while it revalidates
+    base_url: str = REDDIT_BASE_URL  # Point at a local stand-in for offline testing
 
     @property
     def url(self) -> str:
         """Get the Reddit API URL for the configured subreddit"""
         # For multiple subreddits, we'll join them with +
         subreddit_path = "+".join(self.subreddits)
-        return f"https://www.reddit.com/r/{subreddit_path}/hot.json"
+        return f"{self.base_url}/r/{subreddit_path}/hot.json"
 
 
 # Predefined configs for different content types
@@ -26,42 +36,70 @@ class RedditConfig:
 VIRAL_ENTERTAINMENT_CONFIG = RedditConfig(
     subreddits=["entertainment", "movies", "television", "Music", "popculture"],
     limit=30,
-    minimum_score=500
+    minimum_score=500,
+    max_pages=3,
+    target_topics=10,
+    cache_ttl=60,
+    cache_stale_ttl=300
 )
 
 VIRAL_FOOD_CONFIG = RedditConfig(
     subreddits=["food", "FoodPorn", "Cooking", "recipes", "EatCheapAndHealthy"],
     limit=30,
-    minimum_score=500
+    minimum_score=500,
+    max_pages=3,
+    target_topics=10,
+    cache_ttl=60,
+    cache_stale_ttl=300
 )
 
 VIRAL_GAMING_CONFIG = RedditConfig(
     subreddits=["gaming", "Games", "pcgaming", "PS5", "xbox"],
     limit=30,
-    minimum_score=500
+    minimum_score=500,
+    max_pages=3,
+    target_topics=10,
+    cache_ttl=60,
+    cache_stale_ttl=300
 )
 
 VIRAL_LIFESTYLE_CONFIG = RedditConfig(
     subreddits=["BeautyGuruChatter", "MakeupAddiction", "SkincareAddiction", "fashion", "streetwear"],
     limit=30,
-    minimum_score=500
+    minimum_score=500,
+    max_pages=3,
+    target_topics=10,
+    cache_ttl=60,
+    cache_stale_ttl=300
 )
 
 VIRAL_HOBBIES_CONFIG = RedditConfig(
     subreddits=["DIY", "crafts", "Art", "photography", "gardening"],
     limit=30,
-    minimum_score=500
+    minimum_score=500,
+    max_pages=3,
+    target_topics=10,
+    cache_ttl=60,
+    cache_stale_ttl=300
 )
 
 VIRAL_SPORTS_CONFIG = RedditConfig(
     subreddits=["sports", "nba", "nfl", "soccer", "fitness"],
     limit=30,
-    minimum_score=500
+    minimum_score=500,
+    max_pages=3,
+    target_topics=10,
+    cache_ttl=60,
+    cache_stale_ttl=300
 )
 
 # Combined non-political viral content
 VIRAL_ALL_CONFIG = RedditConfig(
     subreddits=["videos", "gifs", "Damnthatsinteresting", "interestingasfuck", "oddlysatisfying", "nextfuckinglevel"],
     limit=50,
-    minimum_score=1000
+    minimum_score=1000,
+    max_pages=3,
+    target_topics=10,
+    cache_ttl=60,
+    cache_stale_ttl=300
 )
@@ -0,0 +1,155 @@
+"""Long-running poller that fetches each Reddit config on its own cadence"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, FrozenSet, List, Optional, Sequence, Union
+import asyncio
+import random
+import signal
+
+from automation.config import RedditConfig
+from automation.models import TrendingTopic
+from automation.reddit_client import RedditClient
+
+TopicSink = Union[
+    "asyncio.Queue[TrendingTopic]",
+    Callable[[List[TrendingTopic]], Optional[Awaitable[None]]],
+]
+
+
+@dataclass
+class PollSchedule:
+    """Per-config polling state"""
+    config: RedditConfig
+    interval: float
+    last_ids: FrozenSet[str] = field(default_factory=frozenset)
+    polls: int = 0
+    failures: int = 0
+
+    @property
+    def name(self) -> str:
+        return "+".join(self.config.subreddits)
+
+
+def listing_churn(previous: FrozenSet[str], current: FrozenSet[str]) -> float:
+    """Fraction of the two listings that differs (0 = identical, 1 = disjoint)"""
+    union = previous | current
+    if not union:
+        return 0.0
+    return 1.0 - len(previous & current) / len(union)
+
+
+class PollingDaemon:
+    """
+    Polls every config independently and pushes newly accepted topics downstream
+
+    Each config starts at initial_interval. After every poll the interval
+    tightens when much of the listing changed since the previous poll and
+    backs off when it barely moved, within [min_interval, max_interval].
+    Listings are read into a columnar TopicBatch and only ids from the
+    latest poll are kept per config, so memory stays bounded however long
+    the daemon runs.
+    """
+
+    def __init__(
+        self,
+        configs: Sequence[RedditConfig],
+        sink: TopicSink,
+        client_factory: Callable[[RedditConfig], RedditClient] = RedditClient,
+        initial_interval: float = 300.0,
+        min_interval: float = 60.0,
+        max_interval: float = 1800.0,
+        high_churn: float = 0.3,
+        low_churn: float = 0.1,
+    ) -> None:
+        self._schedules = [PollSchedule(config, initial_interval) for config in configs]
+        self._sink = sink
+        self._client_factory = client_factory
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._high_churn = high_churn
+        self._low_churn = low_churn
+        self._stop: Optional[asyncio.Event] = None
+
+    @property
+    def schedules(self) -> List[PollSchedule]:
+        return list(self._schedules)
+
+    def stop(self) -> None:
+        """Ask every poller to finish its current fetch and exit"""
+        if self._stop is not None:
+            self._stop.set()
+
+    def _adapt(self, schedule: PollSchedule, churn: float) -> None:
+        if churn >= self._high_churn:
+            schedule.interval *= 0.5
+        elif churn <= self._low_churn:
+            schedule.interval *= 1.5
+        schedule.interval = min(self._max_interval, max(self._min_interval, schedule.interval))
+
+    async def _emit(self, topics: List[TrendingTopic]) -> None:
+        if isinstance(self._sink, asyncio.Queue):
+            for topic in topics:
+                await self._sink.put(topic)
+            return
+        result = self._sink(topics)
+        if asyncio.iscoroutine(result):
+            await result
+
+    async def _sleep(self, seconds: float) -> bool:
+        """Sleep unless stopped first; returns False once the daemon is stopping"""
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            return True
+        return False
+
+    async def _poll_forever(self, schedule: PollSchedule) -> None:
+        client = self._client_factory(schedule.config)
+
+        # Stagger the first polls so configs don't all fire at once
+        if not await self._sleep(random.uniform(0, min(5.0, schedule.interval))):
+            return
+
+        while not self._stop.is_set():
+            try:
+                batch = await asyncio.get_running_loop().run_in_executor(
+                    None, client.fetch_topic_batch
+                )
+            except Exception as e:
+                schedule.failures += 1
+                schedule.interval = min(self._max_interval, schedule.interval * 2)
+                print(f"⚠️  r/{schedule.name}: {e} (next poll in {schedule.interval:.0f}s)")
+            else:
+                current = frozenset(batch.ids)
+                if schedule.polls:
+                    self._adapt(schedule, listing_churn(schedule.last_ids, current))
+                # Only new topics become standalone objects; the rest of the batch is dropped
+                new_topics = [row.to_topic() for row in batch if row.id not in schedule.last_ids]
+                new_topics.sort(key=lambda t: t.score, reverse=True)
+                schedule.last_ids = current
+                schedule.polls += 1
+                if new_topics:
+                    await self._emit(new_topics)
+
+            if not await self._sleep(schedule.interval):
+                return
+
+    async def run(self) -> None:
+        """Poll until stop() is called or the process gets SIGINT/SIGTERM"""
+        self._stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        installed = []
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+                installed.append(sig)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass  # Not supported on this platform or outside the main thread
+
+        try:
+            await asyncio.gather(*(self._poll_forever(s) for s in self._schedules))
+        finally:
+            for sig in installed:
+                loop.remove_signal_handler(sig)
@@ -0,0 +1,83 @@
+"""Suffix-indexed classification of article hosts"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+@dataclass(frozen=True)
+class DomainMatch:
+    """Result of classifying a URL against a domain allow-list"""
+    domain: str  # Allow-listed domain that matched (e.g. "bbc.co.uk")
+    source_name: str  # Readable name for display (e.g. "BBC")
+
+
+def _host(url: str) -> str:
+    """Extract the lowercase host from a URL, without port or www. prefix"""
+    host = (urlsplit(url).hostname or "").rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    return host
+
+
+class DomainClassifier:
+    """
+    Matches hosts against an allow-list of registrable domains
+
+    Domains are stored in a trie keyed by reversed labels, so a host matches
+    if it is an allow-listed domain or one of its subdomains. Lookups cost one
+    step per label regardless of list size, and "notcnn.com.evil.io" is not
+    mistaken for "cnn.com".
+    """
+
+    _END = ""
+
+    def __init__(
+        self,
+        domains: Iterable[str],
+        names: Optional[Mapping[str, str]] = None,
+        cache_size: int = 4096,
+    ) -> None:
+        self._names = dict(names or {})
+        self._index: Dict[str, dict] = {}
+        for domain in domains:
+            node = self._index
+            for label in reversed(domain.lower().strip(".").split(".")):
+                node = node.setdefault(label, {})
+            node[self._END] = domain.lower()
+        self.classify_host = lru_cache(maxsize=cache_size)(self._classify_host)
+
+    def _classify_host(self, host: str) -> Optional[DomainMatch]:
+        """Classify a bare host name"""
+        node = self._index
+        matched: Optional[str] = None
+        for label in reversed(host.split(".")):
+            node = node.get(label)
+            if node is None:
+                break
+            # Keep the longest allow-listed suffix seen so far
+            matched = node.get(self._END, matched)
+        if matched is None:
+            return None
+        return DomainMatch(domain=matched, source_name=self.source_name(matched))
+
+    def source_name(self, domain: str) -> str:
+        """Readable name for an allow-listed domain"""
+        return self._names.get(domain, domain.split(".")[0].title())
+
+    def classify(self, url: str) -> Optional[DomainMatch]:
+        """Classify a URL, returning None if its host is not allow-listed"""
+        try:
+            host = _host(url)
+        except ValueError:
+            return None
+        if not host:
+            return None
+        return self.classify_host(host)
+
+    def cache_info(self) -> Tuple[int, int, int, int]:
+        """Hit/miss statistics of the host cache"""
+        return self.classify_host.cache_info()
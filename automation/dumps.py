@@ -0,0 +1,301 @@
+"""Filtering archived Reddit submission dumps with the live acceptance rules"""
+
+from __future__ import annotations
+
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Set, TextIO, Tuple, Union
+import itertools
+import json
+import mmap
+import os
+import time
+
+from automation.filters import WORD_MODE
+from automation.listing_parser import SCORE_PATTERN
+from automation.models import TopicBatch, TrendingTopic
+from automation.post_filter import PostFilter, record_filter_results
+from automation.topic_store import TopicStore
+
+# Bytes of dump handed to a worker at a time
+DEFAULT_CHUNK_BYTES = 32 * 1024 * 1024
+
+# Newlines are counted in slices of this size so a chunk is never copied whole
+_COUNT_STEP = 4 * 1024 * 1024
+
+Chunk = Tuple[str, int, int]  # (path, start, end) byte range
+
+
+@dataclass
+class ChunkResult:
+    """Accepted topics and filter counts for one byte range of a dump"""
+    topics: TopicBatch
+    lines: int
+    bytes: int
+    results: Counter = field(default_factory=Counter)
+    keyword_rejections: Counter = field(default_factory=Counter)
+
+
+@dataclass
+class DumpStats:
+    """Running totals for a dump filtering run"""
+    files: int = 0
+    bytes: int = 0
+    lines: int = 0
+    seconds: float = 0.0
+    results: Counter = field(default_factory=Counter)
+    keyword_rejections: Counter = field(default_factory=Counter)
+
+    @property
+    def accepted(self) -> int:
+        return self.results["accepted"]
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.bytes / 1e6 / self.seconds if self.seconds else 0.0
+
+    def add(self, result: ChunkResult) -> None:
+        self.bytes += result.bytes
+        self.lines += result.lines
+        self.results.update(result.results)
+        self.keyword_rejections.update(result.keyword_rejections)
+
+
+def _line_bounds(mm: mmap.mmap, start: int, end: int) -> Tuple[int, int]:
+    """
+    Move a byte range onto line boundaries
+
+    Each offset moves forward to the start of the next line (or stays if it
+    already is one), so ranges that touch before alignment still touch after
+    it and every line lands in exactly one range.
+    """
+    size = len(mm)
+
+    def align(offset: int) -> int:
+        if offset <= 0 or offset >= size:
+            return max(0, min(offset, size))
+        newline = mm.find(b"\n", offset - 1)
+        return size if newline == -1 else newline + 1
+
+    return align(start), align(end)
+
+
+def _count_lines(mm: mmap.mmap, start: int, end: int) -> int:
+    count = 0
+    for offset in range(start, end, _COUNT_STEP):
+        count += mm[offset:min(offset + _COUNT_STEP, end)].count(b"\n")
+    if end > start and mm[end - 1] != ord("\n"):
+        count += 1  # Last line of the file without a trailing newline
+    return count
+
+
+def _candidate_lines(mm: mmap.mmap, start: int, end: int, minimum_score: int) -> Iterator[Tuple[int, int]]:
+    """
+    Yield (start, end) of each line that could pass the score filter
+
+    Rather than splitting every line, the range is scanned for "score" keys
+    that reach the threshold and only the lines holding one are returned, so
+    the bulk of low-score posts are never decoded. As in parse_listing, a
+    line's own score is one of its "score" keys, so no passing post is missed.
+    """
+    if minimum_score <= 0:
+        offset = start
+        while offset < end:
+            newline = mm.find(b"\n", offset, end)
+            line_end = end if newline == -1 else newline
+            yield offset, line_end
+            offset = line_end + 1
+        return
+
+    last_end = -1
+    for match in SCORE_PATTERN.finditer(mm, start, end):
+        if match.start() < last_end or int(match.group(1)) < minimum_score:
+            continue
+        newline = mm.rfind(b"\n", start, match.start())
+        line_start = start if newline == -1 else newline + 1
+        newline = mm.find(b"\n", match.end(), end)
+        last_end = end if newline == -1 else newline
+        yield line_start, last_end
+
+
+def _post_data(record: object) -> dict:
+    # Dumps store submissions bare; listings wrap them as {"kind": "t3", "data": {...}}
+    if not isinstance(record, dict):
+        return {}
+    data = record.get("data") if record.get("kind") == "t3" else record
+    return data if isinstance(data, dict) else {}
+
+
+def _retrieved_at(data: dict) -> datetime:
+    """When the post's score was captured, falling back to when it was posted"""
+    for key in ("retrieved_on", "retrieved_utc", "created_utc"):
+        try:
+            return datetime.fromtimestamp(float(data[key]), timezone.utc)
+        except (KeyError, TypeError, ValueError, OverflowError, OSError):
+            continue
+    return datetime.now(timezone.utc)
+
+
+def filter_chunk(post_filter: PostFilter, path: str, start: int, end: int) -> ChunkResult:
+    """
+    Filter the lines of a newline-delimited JSON dump that start in [start, end)
+
+    The file is memory-mapped, so only the pages the scan touches are read
+    and nothing is copied into the process up front. The filter's counters
+    are moved into the result and reset. Accepted posts go straight into a
+    columnar TopicBatch, which is also much cheaper to send back from a
+    worker process than a list of topics.
+    """
+    topics = TopicBatch()
+    decoded = malformed = 0
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start, end = _line_bounds(mm, start, end)
+        lines = _count_lines(mm, start, end)
+        for line_start, line_end in _candidate_lines(mm, start, end, post_filter.minimum_score):
+            line = mm[line_start:line_end]
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                malformed += 1
+                continue
+            decoded += 1
+            data = _post_data(record)
+            post_filter.parse_into(topics, data, _retrieved_at(data))
+
+    results = Counter(post_filter.results)
+    # Lines skipped without decoding had no score reaching the threshold
+    results["score"] += max(0, lines - decoded - malformed)
+    if malformed:
+        results["malformed"] += malformed
+    result = ChunkResult(topics, lines, end - start, results, Counter(post_filter.keyword_rejections))
+    post_filter.results.clear()
+    post_filter.keyword_rejections.clear()
+    return result
+
+
+# Each worker process builds its filter once, in _init_worker
+_worker_filter: Optional[PostFilter] = None
+
+
+def _init_worker(minimum_score: int, blocked_keywords: Tuple[str, ...], keyword_match_mode: str) -> None:
+    global _worker_filter
+    _worker_filter = PostFilter(minimum_score, blocked_keywords, keyword_match_mode)
+
+
+def _filter_chunk_in_worker(path: str, start: int, end: int) -> ChunkResult:
+    return filter_chunk(_worker_filter, path, start, end)
+
+
+class DumpFilter:
+    """
+    Runs archived submissions through the same rules as RedditClient
+
+    Input files are newline-delimited JSON with one submission per line, as
+    in the Pushshift/Arctic Shift archives (decompress .zst dumps first).
+    Listing-style {"kind": "t3", "data": {...}} lines work too. Files are
+    cut into byte ranges that a process pool filters independently, so
+    throughput grows with the number of cores.
+    """
+
+    def __init__(
+        self,
+        minimum_score: int = 100,
+        blocked_keywords: Iterable[str] = (),
+        keyword_match_mode: str = WORD_MODE,
+        workers: Optional[int] = None,
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+    ) -> None:
+        self._filter_args = (minimum_score, tuple(blocked_keywords), keyword_match_mode)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_bytes = chunk_bytes
+        self.stats = DumpStats()
+
+    @classmethod
+    def from_config(cls, config, **kwargs) -> DumpFilter:
+        """Filter with a RedditConfig's threshold and blocklist"""
+        return cls(config.minimum_score, config.blocked_keywords, config.keyword_match_mode, **kwargs)
+
+    def chunks(self, paths: Iterable[Union[str, Path]]) -> List[Chunk]:
+        """Byte ranges covering every file, chunk_bytes at a time"""
+        chunks = []
+        for path in paths:
+            size = os.path.getsize(path)
+            for start in range(0, size, self.chunk_bytes):
+                chunks.append((str(path), start, min(start + self.chunk_bytes, size)))
+        return chunks
+
+    def _results(self, chunks: List[Chunk]) -> Iterator[ChunkResult]:
+        """Filter chunks in the pool, yielding results as they finish"""
+        if self.workers <= 1 or len(chunks) <= 1:
+            post_filter = PostFilter(*self._filter_args)
+            for chunk in chunks:
+                yield filter_chunk(post_filter, *chunk)
+            return
+
+        remaining = iter(chunks)
+        pending: Set[Future] = set()
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=self._filter_args) as pool:
+            try:
+                # Two chunks in flight per worker keeps every core busy without
+                # finished results piling up faster than they are written
+                for chunk in itertools.islice(remaining, self.workers * 2):
+                    pending.add(pool.submit(_filter_chunk_in_worker, *chunk))
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        chunk = next(remaining, None)
+                        if chunk is not None:
+                            pending.add(pool.submit(_filter_chunk_in_worker, *chunk))
+                        yield future.result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def iter_batches(self, paths: Iterable[Union[str, Path]]) -> Iterator[TopicBatch]:
+        """
+        Yield the accepted topics of each chunk as soon as it is filtered
+
+        Chunks finish in whatever order the workers get to them. stats and
+        the shared metrics are updated as results arrive.
+        """
+        paths = list(paths)
+        started = time.perf_counter()
+        self.stats.files += len(paths)
+        try:
+            for result in self._results(self.chunks(paths)):
+                self.stats.add(result)
+                record_filter_results(result.results)
+                yield result.topics
+        finally:
+            self.stats.seconds += time.perf_counter() - started
+
+    def iter_topics(self, paths: Iterable[Union[str, Path]]) -> Iterator[TrendingTopic]:
+        """Yield every accepted topic across the dump files"""
+        for batch in self.iter_batches(paths):
+            yield from batch.to_topics()
+
+    def run(
+        self,
+        paths: Iterable[Union[str, Path]],
+        output: Optional[TextIO] = None,
+        store: Optional[TopicStore] = None,
+    ) -> DumpStats:
+        """
+        Filter the dumps, streaming accepted topics to JSON Lines and/or a topic store
+
+        Topics are written chunk by chunk, so memory stays flat however
+        large the dumps are.
+        """
+        for batch in self.iter_batches(paths):
+            if output is not None:
+                for row in batch:
+                    output.write(json.dumps(row.to_dict(), ensure_ascii=False) + "\n")
+                output.flush()
+            if store is not None:
+                store.upsert(batch)
+        return self.stats
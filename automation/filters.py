@@ -0,0 +1,141 @@
+"""Compiled keyword matching for content filters"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Optional, Set
+import re
+
+# Matching modes
+WORD_MODE = "word"      # term must appear exactly, bounded by word boundaries
+PHRASE_MODE = "phrase"  # like WORD_MODE, but spaces match any run of separators
+
+_SEPARATOR = " "
+
+# Endings a blocked term may carry, so "democrat" also blocks "Democrats",
+# "israel" blocks "Israeli" and "president" blocks "Presidential"
+_SUFFIXES = ("s", "es", "er", "ers", "ian", "ians", "ial", "i", "is")
+# Endings that replace a term's last letter: "vote" -> "voters",
+# "ukraine" -> "Ukrainian", "politics" -> "politicians", "policy" -> "policies"
+_STEM_SUFFIXES = {
+    "e": ("er", "ers", "ian", "ians", "ial"),
+    "s": ("ian", "ians"),
+    "y": ("ies",),
+}
+
+
+def _normalize(term: str) -> str:
+    """Lowercase a term and collapse whitespace to single spaces"""
+    return _SEPARATOR.join(term.lower().split())
+
+
+def _phrase_key(text: str) -> str:
+    """Reduce text to its words so differently separated phrases compare equal"""
+    return _SEPARATOR.join(re.findall(r"[^\W_]+", text.lower()))
+
+
+def _inflections(term: str) -> Set[str]:
+    """
+    The term plus its inflected forms
+
+    Only endings are added, and the word boundary in front still applies, so
+    "law" blocks "laws" but not "lawn" and "war" never matches inside "award".
+    """
+    forms = {term}
+    forms.update(term + suffix for suffix in _SUFFIXES)
+    stem = term[:-1]
+    if stem and not stem.endswith(_SEPARATOR):
+        forms.update(stem + suffix for suffix in _STEM_SUFFIXES.get(term[-1], ()))
+    return forms
+
+
+def _trie_pattern(terms: Iterable[str], mode: str) -> str:
+    """
+    Build a regex alternation shaped like a trie of the given terms
+
+    Sharing prefixes keeps the regex engine from retrying every term at every
+    position, so a title is scanned in one pass even with thousands of terms.
+    """
+    trie: Dict[str, dict] = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    separator = r"[\W_]+" if mode == PHRASE_MODE else r"\s+"
+
+    def build(node: Dict[str, dict]) -> str:
+        optional = "" in node
+        branches = []
+        for char in sorted(c for c in node if c):
+            atom = separator if char == _SEPARATOR else re.escape(char)
+            branches.append(atom + build(node[char]))
+        if not branches:
+            return ""
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if optional else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Single-pass matcher over a fixed set of blocked terms
+
+    Terms match whole words, optionally with an inflected ending:
+
+    >>> matcher = KeywordMatcher({"law", "war", "democrat", "republican",
+    ...                           "president", "tariff", "sanction", "ukraine",
+    ...                           "israel", "vote", "politics"})
+    >>> matcher.match("New lawn care tips"), matcher.match("Film wins award")
+    (None, None)
+    >>> [matcher.match(title) for title in (
+    ...     "Democrats win big", "Republicans block plan", "Presidential debate",
+    ...     "New tariffs", "Sanctions hit Russia", "Ukrainian soldiers",
+    ...     "Israeli strike", "Voters head to polls", "Politicians react",
+    ...     "Wars in 2024")]
+    ['democrat', 'republican', 'president', 'tariff', 'sanction', 'ukraine', 'israel', 'vote', 'politics', 'war']
+    """
+
+    def __init__(self, terms: Iterable[str], mode: str = WORD_MODE) -> None:
+        if mode not in (WORD_MODE, PHRASE_MODE):
+            raise ValueError(f"Unknown keyword match mode: {mode}")
+        self.mode = mode
+        self.terms: FrozenSet[str] = frozenset(t for t in map(_normalize, terms) if t)
+        self._pattern: Optional[re.Pattern] = None
+        # Every matchable form, and its phrase key, mapped to the term it came from
+        self._forms: Dict[str, str] = {}
+        for term in sorted(self.terms, key=len, reverse=True):
+            self._forms.update((form, term) for form in _inflections(term))
+        for term in self.terms:
+            self._forms[term] = term  # A term is never reported as another's inflection
+        self._phrases: Dict[str, str] = {}
+        if mode == PHRASE_MODE:
+            self._phrases = {_phrase_key(form): term for form, term in self._forms.items()}
+        if self.terms:
+            body = _trie_pattern(self._forms, mode)
+            self._pattern = re.compile(rf"(?<!\w)(?:{body})(?!\w)", re.IGNORECASE)
+
+    def match(self, text: str) -> Optional[str]:
+        """Return the first blocked term found in text, or None"""
+        if self._pattern is None:
+            return None
+        found = self._pattern.search(text)
+        if found is None:
+            return None
+        form = _normalize(found.group(0))
+        if form in self._forms:
+            return self._forms[form]
+        return self._phrases.get(_phrase_key(form), form)
+
+    def __contains__(self, text: str) -> bool:
+        return self.match(text) is not None
+
+
+@lru_cache(maxsize=64)
+def get_matcher(terms: FrozenSet[str], mode: str = WORD_MODE) -> KeywordMatcher:
+    """Get a matcher for a keyword set, compiling it only once"""
+    return KeywordMatcher(terms, mode)
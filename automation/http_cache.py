@@ -0,0 +1,105 @@
+"""On-disk cache for Reddit listing responses"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Union
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+# Post fields kept in cached listings; everything else is dropped on write
+LISTING_FIELDS = (
+    "id", "title", "url", "permalink", "score", "num_comments",
+    "subreddit", "author", "is_self", "created_utc",
+)
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "viral_content_automation" / "http"
+
+
+def compact_listing(payload: Mapping[str, Any]) -> Dict[str, Any]:
+    """Strip a listing down to the cursor and the post fields we use"""
+    data = payload.get("data", {})
+    children = []
+    for child in data.get("children", []):
+        post = child.get("data", {})
+        children.append({"data": {k: post[k] for k in LISTING_FIELDS if k in post}})
+    return {"data": {"after": data.get("after"), "children": children}}
+
+
+@dataclass
+class CacheEntry:
+    """A cached listing plus the validators needed to revalidate it"""
+    payload: Dict[str, Any]
+    fetched_at: float
+    etag: str = ""
+    last_modified: str = ""
+
+    def age(self) -> float:
+        """Seconds since the entry was fetched or last revalidated"""
+        return time.time() - self.fetched_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Headers that turn a GET into a conditional request"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """Stores gzip-compressed listing responses keyed by URL and params"""
+
+    def __init__(self, directory: Union[str, Path] = DEFAULT_CACHE_DIR) -> None:
+        self._directory = Path(directory)
+
+    @staticmethod
+    def key(url: str, params: Optional[Mapping[str, Any]] = None) -> str:
+        """Stable cache key for a request"""
+        query = "&".join(f"{k}={v}" for k, v in sorted((params or {}).items()))
+        return hashlib.sha256(f"{url}?{query}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self._directory / key[:2] / f"{key}.json.gz"
+
+    def load(self, key: str) -> Optional[CacheEntry]:
+        """Read an entry, returning None if it is missing or unreadable"""
+        try:
+            with gzip.open(self._path(key), "rt", encoding="utf-8") as f:
+                raw = json.load(f)
+            return CacheEntry(
+                payload=raw["payload"],
+                fetched_at=float(raw["fetched_at"]),
+                etag=raw.get("etag", ""),
+                last_modified=raw.get("last_modified", ""),
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def store(self, key: str, entry: CacheEntry) -> None:
+        """Write an entry atomically so readers never see a partial file"""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        raw = {
+            "payload": entry.payload,
+            "fetched_at": entry.fetched_at,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+        }
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw_file, gzip.GzipFile(fileobj=raw_file, mode="wb") as f:
+                f.write(json.dumps(raw, separators=(",", ":")).encode("utf-8"))
+            os.replace(tmp_name, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
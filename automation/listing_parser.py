@@ -0,0 +1,78 @@
+"""Field-selective decoding of Reddit listing responses"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+import json
+import re
+
+from automation.http_cache import LISTING_FIELDS, compact_listing
+
+# Start of each post in a listing's children array. Quotes inside JSON strings
+# are always escaped, so this can only match the structure itself.
+_POST_START = re.compile(rb'\{\s*"kind"\s*:\s*"t3"\s*,\s*"data"\s*:')
+# Any "score" key in a post, including those of nested crossposts
+SCORE_PATTERN = re.compile(rb'"score"\s*:\s*(-?\d+)')
+_AFTER = re.compile(rb'"after"\s*:\s*(null|"[^"\\]*")')
+
+_decoder = json.JSONDecoder()
+
+
+def _after_cursor(envelope: bytes) -> Optional[str]:
+    match = _AFTER.search(envelope)
+    if match is None:
+        return None
+    return json.loads(match.group(1))
+
+
+def _max_score(chunk: bytes) -> Optional[int]:
+    scores = [int(s) for s in SCORE_PATTERN.findall(chunk)]
+    return max(scores) if scores else None
+
+
+def parse_listing(body: bytes, minimum_score: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Decode a listing response, keeping only the cursor and the post fields we use
+
+    Instead of building the whole listing as nested dicts, the raw body is
+    split into one byte range per post. When minimum_score is given, a range
+    is dropped without being decoded if no "score" in it reaches the
+    threshold; the post's own score is one of them, so this never drops a
+    post that would pass. Surviving posts are decoded one at a time and cut
+    down to LISTING_FIELDS, so preview images, media embeds and awards never
+    outlive their own post. Bodies that don't look like a post listing fall
+    back to a full decode.
+
+    Returns:
+        A compact listing like compact_listing() produces, plus "dist", the
+        number of posts on the page before any were dropped
+    """
+    starts = [m.start() for m in _POST_START.finditer(body)]
+    if not starts:
+        payload = compact_listing(json.loads(body))
+        payload["data"]["dist"] = len(payload["data"]["children"])
+        return payload
+
+    ends = starts[1:] + [len(body)]
+    children: List[Dict[str, Any]] = []
+    for start, end in zip(starts, ends):
+        chunk = body[start:end]
+        if minimum_score is not None and minimum_score > 0:
+            best = _max_score(chunk)
+            if best is None or best < minimum_score:
+                continue
+
+        # The chunk may end in ", " or the listing's closing brackets; raw_decode stops before them
+        child, _ = _decoder.raw_decode(chunk.decode("utf-8"))
+        post = child.get("data") if isinstance(child, dict) else None
+        if not isinstance(post, dict):
+            raise ValueError("Malformed post in listing")
+        if minimum_score is not None and post.get("score", 0) < minimum_score:
+            continue
+        children.append({"data": {k: post[k] for k in LISTING_FIELDS if k in post}})
+
+    # Reddit puts the cursor before the children; look after them as well just in case
+    after = _after_cursor(body[:starts[0]])
+    if after is None:
+        after = _after_cursor(body[body.rfind(b"]"):])
+    return {"data": {"after": after, "dist": len(starts), "children": children}}
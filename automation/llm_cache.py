@@ -0,0 +1,96 @@
+"""Persistent content-addressed cache for Claude responses"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional, Union
+import hashlib
+import json
+import sqlite3
+import time
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "viral_content_automation" / "llm.sqlite3"
+
+
+class LLMResultCache:
+    """
+    SQLite-backed cache of generated text keyed by a hash of its inputs
+
+    Entries older than max_age seconds are never served, and once more than
+    max_entries are stored the least recently used ones are evicted.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = DEFAULT_CACHE_PATH,
+        max_entries: int = 5000,
+        max_age: float = 7 * 24 * 3600,
+    ) -> None:
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at)"
+        )
+        self._conn.commit()
+        self._lock = Lock()
+        self._max_entries = max_entries
+        self._max_age = max_age
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        """Hash the inputs that determine a response"""
+        return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached text for key, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM results WHERE key = ? AND created_at >= ?",
+                (key, now - self._max_age),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE results SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        """Store text for key, evicting expired and least recently used entries"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM results WHERE created_at < ?", (now - self._max_age,)
+            )
+            self._conn.execute(
+                "DELETE FROM results WHERE key IN ("
+                " SELECT key FROM results ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self._max_entries,),
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": size}
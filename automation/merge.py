@@ -0,0 +1,115 @@
+"""Bounded top-K merging of topics from multiple sources"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import heapq
+
+from automation.models import TrendingTopic
+from automation.urls import canonicalize_url
+
+# (value, -source index, -position): higher is better and ties keep source order
+Rank = Tuple[float, int, int]
+
+
+class TopKMerger:
+    """
+    Keeps the K highest-scoring distinct topics seen so far
+
+    Topics are deduplicated on both post id and canonical article URL, and
+    the highest-ranked instance of each story wins. A single push can
+    replace two kept topics at once (its id matches one and its article URL
+    another), which frees a place in the top K, so the next `reserve`
+    best topics (K by default) are held too and move up to fill it. All
+    are kept in one min-heap whose root is the weakest survivor, so memory
+    is O(K + reserve) no matter how many topics are pushed, and results are
+    exact unless more than `reserve` pushes each replace two kept topics.
+
+    >>> from datetime import datetime, timezone
+    >>> def topic(id, url, score):
+    ...     return TrendingTopic(id, id, "", score, 0, datetime.now(timezone.utc), article_url=url)
+    >>> merger = TopKMerger(2)
+    >>> merger.extend([topic("a", "https://x.com/1", 30), topic("b", "https://x.com/2", 20),
+    ...                topic("c", "https://x.com/3", 10), topic("a", "https://x.com/2", 40)])
+    >>> [t.id for t in merger.results()]
+    ['a', 'c']
+    """
+
+    def __init__(self, k: Optional[int], reserve: Optional[int] = None) -> None:
+        self._k = k
+        self._capacity = None if k is None else max(k, 0) + (max(k, 0) if reserve is None else reserve)
+        self._heap: List[list] = []  # [rank, topic, alive]
+        self._by_key: Dict[str, list] = {}
+        self._live = 0
+
+    @staticmethod
+    def _keys(topic: TrendingTopic) -> List[str]:
+        keys = []
+        if topic.id:
+            keys.append(f"id:{topic.id}")
+        if topic.article_url:
+            keys.append(f"url:{canonicalize_url(topic.article_url)}")
+        return keys
+
+    def _discard(self, entry: list) -> None:
+        """Drop an entry from the indexes; it leaves the heap lazily"""
+        entry[2] = False
+        self._live -= 1
+        for key in self._keys(entry[1]):
+            if self._by_key.get(key) is entry:
+                del self._by_key[key]
+
+    def _prune(self) -> None:
+        """Remove dead entries from the root, compacting if too many pile up"""
+        while self._heap and not self._heap[0][2]:
+            heapq.heappop(self._heap)
+        if self._capacity is not None and len(self._heap) > 2 * self._capacity:
+            self._heap = [entry for entry in self._heap if entry[2]]
+            heapq.heapify(self._heap)
+
+    def push(self, topic: TrendingTopic, rank: Rank) -> None:
+        """Offer a topic to the merge"""
+        keys = self._keys(topic)
+        duplicates = {id(e): e for e in (self._by_key.get(k) for k in keys) if e is not None}
+
+        # An equal or better copy of this story is already kept
+        if any(entry[0] >= rank for entry in duplicates.values()):
+            return
+
+        for entry in duplicates.values():
+            self._discard(entry)
+        self._prune()
+
+        if self._capacity is not None and self._live >= self._capacity:
+            if self._capacity <= 0 or rank <= self._heap[0][0]:
+                return
+            self._discard(self._heap[0])
+            self._prune()
+
+        entry = [rank, topic, True]
+        heapq.heappush(self._heap, entry)
+        self._live += 1
+        for key in keys:
+            self._by_key[key] = entry
+
+    def extend(
+        self,
+        topics: Iterable[TrendingTopic],
+        source_index: int = 0,
+        values: Optional[Sequence[float]] = None,
+    ) -> None:
+        """
+        Offer every topic from one source
+
+        Topics are ranked by values if given (one per topic), otherwise by
+        score, with ties broken by source index and then position.
+        """
+        for position, topic in enumerate(topics):
+            value = values[position] if values is not None else topic.score
+            self.push(topic, (value, -source_index, -position))
+
+    def results(self) -> List[TrendingTopic]:
+        """The best K surviving topics, best first"""
+        live = [entry for entry in self._heap if entry[2]]
+        live.sort(key=lambda entry: entry[0], reverse=True)
+        return [entry[1] for entry in live[:self._k]]
@@ -0,0 +1,219 @@
+"""Anthropic Message Batches backend for bulk analysis and generation"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Union
+import json
+import os
+import re
+import time
+
+from automation.models import TrendingTopic
+
+BuildAnalysisFn = Callable[[TrendingTopic], dict]
+BuildGenerationFn = Callable[[TrendingTopic, str], dict]
+
+
+@dataclass
+class BatchItemResult:
+    """Outcome of one request in a message batch"""
+    text: str = ""
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+class BatchBackend:
+    """
+    Interface for submitting message batches
+
+    AnthropicBatchBackend talks to the real API; tests can implement these
+    three methods with a local stub.
+    """
+
+    def submit(self, requests: Dict[str, dict]) -> str:
+        """Submit requests keyed by custom_id, returning the batch id"""
+        raise NotImplementedError
+
+    def is_done(self, batch_id: str) -> bool:
+        """Check whether every request in the batch has finished processing"""
+        raise NotImplementedError
+
+    def results(self, batch_id: str) -> Dict[str, BatchItemResult]:
+        """Fetch the results of a finished batch keyed by custom_id"""
+        raise NotImplementedError
+
+
+class AnthropicBatchBackend(BatchBackend):
+    """BatchBackend backed by client.messages.batches"""
+
+    def __init__(self, client: Any) -> None:
+        self._batches = client.messages.batches
+
+    def submit(self, requests: Dict[str, dict]) -> str:
+        batch = self._batches.create(requests=[
+            {"custom_id": custom_id, "params": params}
+            for custom_id, params in requests.items()
+        ])
+        return batch.id
+
+    def is_done(self, batch_id: str) -> bool:
+        return self._batches.retrieve(batch_id).processing_status == "ended"
+
+    def results(self, batch_id: str) -> Dict[str, BatchItemResult]:
+        results: Dict[str, BatchItemResult] = {}
+        for entry in self._batches.results(batch_id):
+            result = entry.result
+            if result.type == "succeeded":
+                text = "".join(
+                    block.text for block in result.message.content
+                    if getattr(block, "type", "text") == "text"
+                )
+                results[entry.custom_id] = BatchItemResult(text=text)
+            else:
+                error = getattr(result, "error", None)
+                results[entry.custom_id] = BatchItemResult(error=str(error or result.type))
+        return results
+
+
+def custom_id_for(topic: TrendingTopic) -> str:
+    """Batch custom_id for a topic (letters, digits, _ and - only, max 64 chars)"""
+    return re.sub(r"[^A-Za-z0-9_-]", "_", topic.id)[:64] or "topic"
+
+
+class MessageBatchRunner:
+    """
+    Runs analysis and generation for many topics as two message batches
+
+    All analysis requests go out as one batch. Once it ends, the generation
+    requests that depend on its summaries go out as a second batch. Batch ids
+    and finished summaries are checkpointed to a JSON state file, so a
+    restarted process picks up the in-flight batch instead of resubmitting.
+    """
+
+    def __init__(
+        self,
+        backend: BatchBackend,
+        state_path: Union[str, Path],
+        poll_interval: float = 5.0,
+        max_poll_interval: float = 60.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self._backend = backend
+        self._state_path = Path(state_path)
+        self._poll_interval = poll_interval
+        self._max_poll_interval = max_poll_interval
+        self._sleep = sleep
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self._state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        tmp_path = self._state_path.with_suffix(self._state_path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self._state_path)
+
+    def resumable_topics(self) -> List[TrendingTopic]:
+        """Topics of an interrupted run, or an empty list if there is none"""
+        return [TrendingTopic.from_dict(t) for t in self._load_state().get("topic_data", [])]
+
+    def _wait(self, batch_id: str) -> Dict[str, BatchItemResult]:
+        """Poll with exponential backoff until the batch ends"""
+        interval = self._poll_interval
+        while not self._backend.is_done(batch_id):
+            self._sleep(interval)
+            interval = min(interval * 1.5, self._max_poll_interval)
+        return self._backend.results(batch_id)
+
+    def _run_stage(
+        self,
+        state: Dict[str, Any],
+        stage: str,
+        build: Callable[[str], dict],
+        pending: List[str],
+    ) -> Dict[str, BatchItemResult]:
+        """Submit (or resume) one stage's batch and return its results"""
+        batch_key = f"{stage}_batch_id"
+        if not state.get(batch_key):
+            if not pending:
+                return {}
+            state[batch_key] = self._backend.submit({cid: build(cid) for cid in pending})
+            self._save_state(state)
+            print(f"📦 Submitted {stage} batch {state[batch_key]} ({len(pending)} requests)")
+        return self._wait(state[batch_key])
+
+    def run(
+        self,
+        topics: List[TrendingTopic],
+        build_analysis: BuildAnalysisFn,
+        build_generation: BuildGenerationFn,
+    ) -> Dict[str, Dict[str, BatchItemResult]]:
+        """
+        Analyze and generate packages for every topic
+
+        Returns:
+            Results keyed by topic id, each with "analysis" and (if analysis
+            succeeded) "generation" entries
+        """
+        by_custom_id = {custom_id_for(topic): topic for topic in topics}
+        state = self._load_state()
+        if state.get("topics") != sorted(by_custom_id):
+            # State belongs to a different set of topics; start over
+            state = {
+                "topics": sorted(by_custom_id),
+                "topic_data": [topic.to_dict() for topic in topics],
+                "summaries": {},
+            }
+
+        summaries: Dict[str, str] = state["summaries"]
+        outcomes: Dict[str, Dict[str, BatchItemResult]] = {
+            topic.id: {} for topic in topics
+        }
+
+        pending = [cid for cid in by_custom_id if cid not in summaries]
+        analysis = self._run_stage(
+            state, "analysis",
+            lambda cid: build_analysis(by_custom_id[cid]),
+            pending,
+        )
+        for cid, result in analysis.items():
+            if cid in by_custom_id and result.ok:
+                summaries[cid] = result.text
+        self._save_state(state)
+
+        for cid, topic in by_custom_id.items():
+            if cid in summaries:
+                outcomes[topic.id]["analysis"] = BatchItemResult(text=summaries[cid])
+            else:
+                outcomes[topic.id]["analysis"] = analysis.get(
+                    cid, BatchItemResult(error="missing from analysis batch")
+                )
+
+        generation = self._run_stage(
+            state, "generation",
+            lambda cid: build_generation(by_custom_id[cid], summaries[cid]),
+            list(summaries),
+        )
+        for cid, topic in by_custom_id.items():
+            if cid in summaries:
+                outcomes[topic.id]["generation"] = generation.get(
+                    cid, BatchItemResult(error="missing from generation batch")
+                )
+
+        return outcomes
+
+    def clear(self) -> None:
+        """Forget checkpointed progress once results have been saved"""
+        try:
+            self._state_path.unlink()
+        except OSError:
+            pass
@@ -1,9 +1,42 @@
 """Data models for viral content automation"""
 
-from dataclasses import dataclass
-from datetime import datetime
+from __future__ import annotations
 
+from array import array
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+import sys
 
+REDDIT_BASE_URL = "https://www.reddit.com"
+
+
+def _with_slots(cls):
+    """Rebuild a dataclass with __slots__ (dataclass(slots=True) needs Python 3.10)"""
+    names = tuple(f.name for f in fields(cls))
+    namespace = {k: v for k, v in cls.__dict__.items() if k not in names}
+    namespace.pop("__dict__", None)
+    namespace.pop("__weakref__", None)
+    namespace["__slots__"] = names
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+def _format_topic(topic) -> str:
+    article_info = ""
+    if topic.article_url:
+        article_info = f"   📰 Article: {topic.article_url}\n"
+        if topic.article_source:
+            article_info = f"   📰 Article ({topic.article_source}): {topic.article_url}\n"
+
+    return (
+        f"📈 {topic.title}\n"
+        f"   ⬆️  Score: {topic.score:,} | 💬 Comments: {topic.comment_count:,}\n"
+        f"{article_info}"
+        f"   🔗 Reddit: {topic.url}\n"
+    )
+
+
+@_with_slots
 @dataclass
 class TrendingTopic:
     """Represents a trending topic from social media"""
@@ -18,16 +51,208 @@ class TrendingTopic:
     article_url: str = ""  # Related news article URL
     article_source: str = ""  # Article source (e.g., "CNN", "BBC")
 
+    def __post_init__(self) -> None:
+        # Categorical fields repeat across thousands of topics; share one copy.
+        # Archived posts by deleted accounts can have no author or subreddit
+        self.subreddit = sys.intern(self.subreddit or "")
+        self.author = sys.intern(self.author or "")
+        self.article_source = sys.intern(self.article_source or "")
+
     def __str__(self) -> str:
-        article_info = ""
-        if self.article_url:
-            article_info = f"   📰 Article: {self.article_url}\n"
-            if self.article_source:
-                article_info = f"   📰 Article ({self.article_source}): {self.article_url}\n"
-
-        return (
-            f"📈 {self.title}\n"
-            f"   ⬆️  Score: {self.score:,} | 💬 Comments: {self.comment_count:,}\n"
-            f"{article_info}"
-            f"   🔗 Reddit: {self.url}\n"
+        return _format_topic(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready fields, with retrieved_at as an ISO 8601 string"""
+        data = asdict(self)
+        data["retrieved_at"] = self.retrieved_at.isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> TrendingTopic:
+        """Inverse of to_dict; keys that aren't topic fields are ignored"""
+        values = {f.name: data[f.name] for f in fields(cls) if f.name in data}
+        values["retrieved_at"] = datetime.fromisoformat(values["retrieved_at"])
+        return cls(**values)
+
+
+class _Categories:
+    """Maps repeated strings to small integer codes"""
+
+    __slots__ = ("values", "_codes")
+
+    def __init__(self) -> None:
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def code(self, value: Optional[str]) -> int:
+        value = value or ""
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        return code
+
+
+class TopicRow:
+    """
+    Read-only view of one row of a TopicBatch
+
+    Has the same attributes as TrendingTopic, but fields are read from the
+    batch's columns on access instead of being copied into the row.
+    """
+
+    __slots__ = ("_batch", "_index")
+
+    def __init__(self, batch: TopicBatch, index: int) -> None:
+        self._batch = batch
+        self._index = index
+
+    @property
+    def id(self) -> str:
+        return self._batch.ids[self._index]
+
+    @property
+    def title(self) -> str:
+        return self._batch.titles[self._index]
+
+    @property
+    def url(self) -> str:
+        return REDDIT_BASE_URL + self._batch.permalinks[self._index]
+
+    @property
+    def score(self) -> int:
+        return self._batch.scores[self._index]
+
+    @property
+    def comment_count(self) -> int:
+        return self._batch.comment_counts[self._index]
+
+    @property
+    def retrieved_at(self) -> datetime:
+        return datetime.fromtimestamp(self._batch.retrieved_at[self._index], timezone.utc)
+
+    @property
+    def subreddit(self) -> str:
+        return self._batch.subreddits.values[self._batch.subreddit_codes[self._index]]
+
+    @property
+    def author(self) -> str:
+        return self._batch.authors.values[self._batch.author_codes[self._index]]
+
+    @property
+    def article_url(self) -> str:
+        return self._batch.article_urls[self._index]
+
+    @property
+    def article_source(self) -> str:
+        return self._batch.sources.values[self._batch.source_codes[self._index]]
+
+    def to_topic(self) -> TrendingTopic:
+        """Materialize the row as a standalone TrendingTopic"""
+        return TrendingTopic(
+            id=self.id,
+            title=self.title,
+            url=self.url,
+            score=self.score,
+            comment_count=self.comment_count,
+            retrieved_at=self.retrieved_at,
+            subreddit=self.subreddit,
+            author=self.author,
+            article_url=self.article_url,
+            article_source=self.article_source,
         )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Same as TrendingTopic.to_dict, without materializing the topic"""
+        data = {f.name: getattr(self, f.name) for f in fields(TrendingTopic)}
+        data["retrieved_at"] = self.retrieved_at.isoformat()
+        return data
+
+    def __str__(self) -> str:
+        return _format_topic(self)
+
+    def __repr__(self) -> str:
+        return f"TopicRow(id={self.id!r}, title={self.title!r}, score={self.score})"
+
+
+class TopicBatch:
+    """
+    Columnar container for many topics
+
+    Scores, comment counts and retrieval times live in typed arrays (usable
+    directly as NumPy buffers), repeated strings are stored once per batch as
+    categorical codes, and Reddit URLs are kept as bare permalinks.
+    """
+
+    def __init__(self) -> None:
+        self.ids: List[str] = []
+        self.titles: List[str] = []
+        self.permalinks: List[str] = []
+        self.article_urls: List[str] = []
+        self.scores = array("q")
+        self.comment_counts = array("q")
+        self.retrieved_at = array("d")  # Epoch seconds
+        self.subreddits = _Categories()
+        self.subreddit_codes = array("I")
+        self.authors = _Categories()
+        self.author_codes = array("I")
+        self.sources = _Categories()
+        self.source_codes = array("I")
+
+    def append(
+        self,
+        id: str,
+        title: str,
+        permalink: str,
+        score: int,
+        comment_count: int,
+        retrieved_at: float,
+        subreddit: str = "",
+        author: str = "",
+        article_url: str = "",
+        article_source: str = "",
+    ) -> None:
+        """Add one topic; permalink is the path under https://www.reddit.com"""
+        self.ids.append(id)
+        self.titles.append(title)
+        self.permalinks.append(permalink)
+        self.article_urls.append(article_url)
+        self.scores.append(score)
+        self.comment_counts.append(comment_count)
+        self.retrieved_at.append(retrieved_at)
+        self.subreddit_codes.append(self.subreddits.code(subreddit))
+        self.author_codes.append(self.authors.code(author))
+        self.source_codes.append(self.sources.code(article_source))
+
+    def append_topic(self, topic: Union[TrendingTopic, TopicRow]) -> None:
+        url = topic.url
+        permalink = url[len(REDDIT_BASE_URL):] if url.startswith(REDDIT_BASE_URL) else url
+        self.append(
+            topic.id, topic.title, permalink, topic.score, topic.comment_count,
+            topic.retrieved_at.timestamp(), topic.subreddit, topic.author,
+            topic.article_url, topic.article_source,
+        )
+
+    @classmethod
+    def from_topics(cls, topics: Iterable[Union[TrendingTopic, TopicRow]]) -> TopicBatch:
+        batch = cls()
+        for topic in topics:
+            batch.append_topic(topic)
+        return batch
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> TopicRow:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("TopicBatch index out of range")
+        return TopicRow(self, index)
+
+    def __iter__(self) -> Iterator[TopicRow]:
+        return (TopicRow(self, i) for i in range(len(self)))
+
+    def to_topics(self) -> List[TrendingTopic]:
+        """Materialize every row as a TrendingTopic"""
+        return [row.to_topic() for row in self]
@@ -0,0 +1,96 @@
+"""Headless batch pipeline turning trending topics into video packages"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Semaphore
+from typing import Callable, List, Optional
+import time
+
+from automation.models import TrendingTopic
+
+AnalyzeFn = Callable[[TrendingTopic], str]
+GenerateFn = Callable[[TrendingTopic, str], str]
+WriteFn = Callable[[TrendingTopic, str, str], Path]
+
+
+@dataclass
+class BatchResult:
+    """Outcome of running one topic through the pipeline"""
+    topic: TrendingTopic
+    path: Optional[Path] = None
+    error: Optional[Exception] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class BatchPipeline:
+    """
+    Runs analyze -> generate -> write for many topics at once
+
+    Each stage has its own concurrency limit, so a topic can be generating
+    while the next is still being analyzed without exceeding either limit.
+    Packages are written as soon as their topic finishes, and a failure in
+    one topic is recorded on its result instead of aborting the batch.
+    """
+
+    def __init__(
+        self,
+        analyze: AnalyzeFn,
+        generate: GenerateFn,
+        write: WriteFn,
+        analyze_workers: int = 2,
+        generate_workers: int = 2,
+    ) -> None:
+        self._analyze = analyze
+        self._generate = generate
+        self._write = write
+        self._analyze_workers = max(1, analyze_workers)
+        self._generate_workers = max(1, generate_workers)
+        self._analyze_slots = Semaphore(self._analyze_workers)
+        self._generate_slots = Semaphore(self._generate_workers)
+
+    def _process(self, topic: TrendingTopic) -> BatchResult:
+        started = time.perf_counter()
+        result = BatchResult(topic=topic)
+        try:
+            with self._analyze_slots:
+                summary = self._analyze(topic)
+            with self._generate_slots:
+                package = self._generate(topic, summary)
+            result.path = self._write(topic, summary, package)
+        except Exception as e:
+            result.error = e
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def run(
+        self,
+        topics: List[TrendingTopic],
+        on_result: Optional[Callable[[BatchResult], None]] = None,
+    ) -> List[BatchResult]:
+        """
+        Process every topic, returning results in the order topics were given
+
+        Args:
+            topics: Topics to turn into video packages
+            on_result: Called with each result as soon as its topic finishes
+
+        Returns:
+            One BatchResult per topic
+        """
+        if not topics:
+            return []
+
+        workers = min(len(topics), self._analyze_workers + self._generate_workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self._process, topic) for topic in topics]
+            if on_result is not None:
+                for future in futures:
+                    future.add_done_callback(lambda f: on_result(f.result()))
+            return [future.result() for future in futures]
@@ -0,0 +1,191 @@
+"""Acceptance rules that turn raw Reddit posts into TrendingTopics"""
+
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, Mapping, Optional
+
+from automation.domains import DomainClassifier, DomainMatch
+from automation.filters import WORD_MODE, KeywordMatcher, get_matcher
+from automation.metrics import get_metrics
+from automation.models import REDDIT_BASE_URL, TopicBatch, TrendingTopic
+
+# Known news domains that are acceptable article sources
+NEWS_DOMAINS = {
+    'bbc.com', 'bbc.co.uk', 'cnn.com', 'nytimes.com', 'theguardian.com',
+    'reuters.com', 'apnews.com', 'bloomberg.com', 'cnbc.com', 'forbes.com',
+    'wsj.com', 'washingtonpost.com', 'npr.org', 'abcnews.go.com', 'cbsnews.com',
+    'nbcnews.com', 'usatoday.com', 'latimes.com', 'time.com', 'newsweek.com',
+    'theverge.com', 'techcrunch.com', 'arstechnica.com', 'wired.com', 'vice.com',
+    'vox.com', 'axios.com', 'politico.com', 'thehill.com', 'huffpost.com',
+    'businessinsider.com', 'space.com', 'scientificamerican.com', 'nature.com',
+    'nationalgeographic.com', 'espn.com', 'skysports.com', 'variety.com',
+    'hollywoodreporter.com', 'rollingstone.com', 'pitchfork.com', 'ign.com',
+    'gamespot.com', 'polygon.com', 'kotaku.com', 'pcgamer.com', 'ew.com',
+    'billboard.com', 'allrecipes.com', 'seriouseats.com', 'bonappetit.com',
+    'epicurious.com', 'eater.com', 'cosmopolitan.com', 'vogue.com', 'gq.com',
+    'menshealth.com', 'womenshealthmag.com', 'shape.com', 'allure.com'
+}
+
+# Readable names for news domains (others are derived from the domain)
+NEWS_SOURCE_NAMES = {
+    'nytimes.com': 'New York Times',
+    'washingtonpost.com': 'Washington Post',
+    'bbc.com': 'BBC',
+    'bbc.co.uk': 'BBC',
+    'cnn.com': 'CNN',
+    'reuters.com': 'Reuters',
+    'apnews.com': 'AP News',
+    'bloomberg.com': 'Bloomberg',
+    'theguardian.com': 'The Guardian',
+    'wsj.com': 'Wall Street Journal',
+    'forbes.com': 'Forbes',
+    'cnbc.com': 'CNBC',
+    'npr.org': 'NPR',
+    'space.com': 'Space.com',
+}
+
+# Political keywords to filter out
+POLITICAL_KEYWORDS = {
+    'trump', 'biden', 'congress', 'senate', 'election', 'vote', 'political',
+    'politics', 'president', 'republican', 'democrat', 'campaign', 'maduro',
+    'venezuela', 'war', 'military', 'government', 'parliament', 'minister',
+    'policy', 'legislation', 'bill', 'law', 'supreme court', 'justice',
+    'immigration', 'border', 'tariff', 'sanction', 'diplomat', 'putin',
+    'ukraine', 'gaza', 'israel', 'china', 'taiwan', 'embassy', 'treaty'
+}
+
+# Filter outcomes: "accepted", or the filter that rejected the post
+REJECTION_REASONS = ("score", "political", "self_post", "non_news")
+
+
+def record_filter_results(results: Mapping[str, int]) -> None:
+    """Add filter outcome counts to the shared metrics"""
+    metrics = get_metrics()
+    for result, count in results.items():
+        if result == "accepted":
+            metrics.inc("reddit_posts_accepted_total", count)
+        else:
+            metrics.inc("reddit_posts_rejected_total", count, reason=result)
+
+
+class PostFilter:
+    """
+    Decides which posts become topics, independent of where the posts came from
+
+    Used by RedditClient on live listings and by the dump filter on archived
+    submissions, so both apply exactly the same rules: minimum score,
+    political and blocklisted keywords, no self posts, and news domains only.
+    """
+
+    # Built once at class load and shared by every filter
+    news_classifier = DomainClassifier(NEWS_DOMAINS, NEWS_SOURCE_NAMES)
+
+    def __init__(
+        self,
+        minimum_score: int = 100,
+        blocked_keywords: Iterable[str] = (),
+        keyword_match_mode: str = WORD_MODE,
+    ) -> None:
+        self.minimum_score = minimum_score
+        self.keyword_matcher: KeywordMatcher = get_matcher(
+            frozenset(POLITICAL_KEYWORDS) | frozenset(blocked_keywords),
+            keyword_match_mode,
+        )
+        # How many titles each blocked term has rejected
+        self.keyword_rejections: Counter[str] = Counter()
+        # Filter outcomes not yet added to the shared metrics
+        self.results: Counter[str] = Counter()
+
+    @classmethod
+    def from_config(cls, config) -> PostFilter:
+        """Filter with a RedditConfig's threshold and blocklist"""
+        return cls(config.minimum_score, config.blocked_keywords, config.keyword_match_mode)
+
+    def match_blocked_keyword(self, title: str) -> Optional[str]:
+        """Return the political or blocklisted term found in title, if any"""
+        return self.keyword_matcher.match(title)
+
+    def classify_news_url(self, url: str) -> Optional[DomainMatch]:
+        """Match URL against the news allow-list, parsing it only once"""
+        return self.news_classifier.classify(url)
+
+    def accept(self, data: dict) -> Optional[DomainMatch]:
+        """
+        Apply the acceptance filters to one post, returning its news match if accepted
+
+        Archived posts can hold null for any field, so missing and null
+        values get the same defaults.
+        """
+        # Skip posts below minimum score
+        if (data.get("score") or 0) < self.minimum_score:
+            self.results["score"] += 1
+            return None
+
+        # Get title and check for political content
+        title = data.get("title") or "Untitled"
+
+        # FILTER OUT POLITICAL CONTENT
+        blocked_term = self.match_blocked_keyword(title)
+        if blocked_term is not None:
+            self.keyword_rejections[blocked_term] += 1
+            self.results["political"] += 1
+            return None
+
+        # Get the URL from the post
+        url = data.get("url") or ""
+
+        # Skip if it's a self post without external URL
+        if not url or url.startswith("https://www.reddit.com/r/"):
+            self.results["self_post"] += 1
+            return None
+
+        # IMPORTANT: Only include posts that link to news articles
+        news_match = self.classify_news_url(url)
+        self.results["non_news" if news_match is None else "accepted"] += 1
+        return news_match
+
+    def parse(self, data: dict, retrieved_at: datetime) -> Optional[TrendingTopic]:
+        """Build a TrendingTopic from one post, returning None if it is rejected"""
+        news_match = self.accept(data)
+        if news_match is None:
+            return None
+
+        return TrendingTopic(
+            id=data.get("id") or "",
+            title=data.get("title") or "Untitled",
+            url=f"{REDDIT_BASE_URL}{data.get('permalink') or ''}",  # Reddit discussion link
+            score=int(data.get("score") or 0),
+            comment_count=int(data.get("num_comments") or 0),
+            retrieved_at=retrieved_at,
+            subreddit=data.get("subreddit") or "",
+            author=data.get("author") or "",
+            article_url=data.get("url") or "",  # The actual news article
+            article_source=news_match.source_name  # Source name comes from the same lookup
+        )
+
+    def parse_into(self, batch: TopicBatch, data: dict, retrieved_at: datetime) -> bool:
+        """Like parse, but append the accepted post to batch instead of building a topic"""
+        news_match = self.accept(data)
+        if news_match is None:
+            return False
+
+        batch.append(
+            id=data.get("id") or "",
+            title=data.get("title") or "Untitled",
+            permalink=data.get("permalink") or "",
+            score=int(data.get("score") or 0),
+            comment_count=int(data.get("num_comments") or 0),
+            retrieved_at=retrieved_at.timestamp(),
+            subreddit=data.get("subreddit") or "",
+            author=data.get("author") or "",
+            article_url=data.get("url") or "",
+            article_source=news_match.source_name,
+        )
+        return True
+
+    def flush_metrics(self) -> None:
+        """Add the filter outcomes counted so far to the shared metrics"""
+        record_filter_results(self.results)
+        self.results.clear()
@@ -0,0 +1,170 @@
+"""Ranking strategies for merging topics across sources"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from automation.models import TrendingTopic
+from automation.topic_store import TopicStore
+
+
+class RankingStrategy:
+    """Assigns each topic a value; higher values rank first"""
+
+    def rank(self, topics: Sequence[TrendingTopic]) -> Sequence[float]:
+        raise NotImplementedError
+
+
+class ScoreRanker(RankingStrategy):
+    """Ranks by raw Reddit score (the default behaviour)"""
+
+    def rank(self, topics: Sequence[TrendingTopic]) -> Sequence[float]:
+        return [float(topic.score) for topic in topics]
+
+
+@dataclass
+class VelocityWeights:
+    """How much each normalized signal contributes to the final value"""
+    velocity: float = 1.0  # Upvotes per hour between the last two snapshots
+    acceleration: float = 0.5  # Change in velocity per hour
+    comment_ratio: float = 0.25  # Comments per upvote
+    score: float = 0.25  # log(score), so big posts still count for something
+
+
+def _group_zscore(values: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    """Standardize values within each group (zero where a group has no spread)"""
+    counts = np.bincount(groups, minlength=n_groups).astype(float)
+    counts[counts == 0] = 1.0
+    means = np.bincount(groups, weights=values, minlength=n_groups) / counts
+    centered = values - means[groups]
+    variances = np.bincount(groups, weights=centered * centered, minlength=n_groups) / counts
+    stds = np.sqrt(variances)[groups]
+    return np.divide(centered, stds, out=np.zeros_like(centered), where=stds > 0)
+
+
+def velocity_values(
+    post: np.ndarray,
+    retrieved_at: np.ndarray,
+    score: np.ndarray,
+    comments: np.ndarray,
+    subreddit: np.ndarray,
+    n_posts: int,
+    weights: VelocityWeights = VelocityWeights(),
+) -> np.ndarray:
+    """
+    Compute a ranking value per post from its snapshot history
+
+    All inputs are columns over snapshots sorted by (post, retrieved_at);
+    post holds codes 0..n_posts-1 and subreddit holds one code per post. Every
+    step is a whole-array operation, so cost is linear in snapshot count with
+    no per-post Python loop.
+
+    Returns:
+        Array of n_posts values
+    """
+    hours = retrieved_at / 3600.0
+    same_as_prev = np.zeros(len(post), dtype=bool)
+    same_as_prev[1:] = post[1:] == post[:-1]
+
+    # Velocity at each snapshot, relative to the post's previous snapshot
+    dt = np.zeros(len(post))
+    dt[1:] = hours[1:] - hours[:-1]
+    ds = np.zeros(len(post))
+    ds[1:] = score[1:] - score[:-1]
+    valid = same_as_prev & (dt > 0)
+    velocity = np.divide(ds, dt, out=np.zeros(len(post)), where=valid)
+
+    # Acceleration needs two consecutive velocities of the same post
+    dv = np.zeros(len(post))
+    dv[1:] = velocity[1:] - velocity[:-1]
+    valid_accel = np.zeros(len(post), dtype=bool)
+    valid_accel[1:] = valid[1:] & valid[:-1]
+    acceleration = np.divide(dv, dt, out=np.zeros(len(post)), where=valid_accel)
+
+    # Take each post's latest snapshot
+    last = np.ones(len(post), dtype=bool)
+    last[:-1] = post[:-1] != post[1:]
+    last_index = np.flatnonzero(last)
+    codes = post[last_index]
+
+    latest_score = np.zeros(n_posts)
+    latest_score[codes] = score[last_index]
+    latest_comments = np.zeros(n_posts)
+    latest_comments[codes] = comments[last_index]
+    post_velocity = np.zeros(n_posts)
+    post_velocity[codes] = velocity[last_index]
+    post_acceleration = np.zeros(n_posts)
+    post_acceleration[codes] = acceleration[last_index]
+
+    ratio = latest_comments / np.maximum(latest_score, 1.0)
+    log_score = np.log1p(np.maximum(latest_score, 0.0))
+
+    n_subreddits = int(subreddit.max()) + 1 if len(subreddit) else 0
+    return (
+        weights.velocity * _group_zscore(post_velocity, subreddit, n_subreddits)
+        + weights.acceleration * _group_zscore(post_acceleration, subreddit, n_subreddits)
+        + weights.comment_ratio * _group_zscore(ratio, subreddit, n_subreddits)
+        + weights.score * _group_zscore(log_score, subreddit, n_subreddits)
+    )
+
+
+class VelocityRanker(RankingStrategy):
+    """
+    Ranks topics by how fast they are rising rather than how big they are
+
+    Uses the score snapshots kept in a TopicStore, so topics only gain a
+    velocity once they have been fetched at least twice. Each signal is
+    normalized within the topic's subreddit, so busy and quiet subreddits
+    compete on equal terms.
+    """
+
+    def __init__(self, store: TopicStore, weights: Optional[VelocityWeights] = None) -> None:
+        self._store = store
+        self._weights = weights or VelocityWeights()
+
+    def rank(self, topics: Sequence[TrendingTopic]) -> Sequence[float]:
+        if not topics:
+            return []
+
+        post_codes = {}
+        for topic in topics:
+            post_codes.setdefault(topic.id, len(post_codes))
+        subreddit_codes = {}
+        post_subreddit = np.zeros(len(post_codes), dtype=np.int64)
+        for topic in topics:
+            code = subreddit_codes.setdefault(topic.subreddit.lower(), len(subreddit_codes))
+            post_subreddit[post_codes[topic.id]] = code
+
+        ids, retrieved_at, scores, comments = self._store.snapshot_columns(list(post_codes))
+
+        # Topics fetched just now may not be stored yet; count them as a snapshot
+        stored = set(ids)
+        extra = [t for t in topics if t.id not in stored]
+        ids = list(ids) + [t.id for t in extra]
+        retrieved_at = list(retrieved_at) + [t.retrieved_at.timestamp() for t in extra]
+        scores = list(scores) + [t.score for t in extra]
+        comments = list(comments) + [t.comment_count for t in extra]
+
+        post = np.fromiter((post_codes[i] for i in ids), dtype=np.int64, count=len(ids))
+        times = np.asarray(retrieved_at, dtype=float)
+        order = np.lexsort((times, post))
+        values = velocity_values(
+            post[order],
+            times[order],
+            np.asarray(scores, dtype=float)[order],
+            np.asarray(comments, dtype=float)[order],
+            post_subreddit,
+            len(post_codes),
+            self._weights,
+        )
+        return [float(values[post_codes[topic.id]]) for topic in topics]
+
+
+def rank_topics(topics: List[TrendingTopic], strategy: RankingStrategy) -> List[TrendingTopic]:
+    """Sort topics best first according to a strategy"""
+    values = strategy.rank(topics)
+    order = sorted(range(len(topics)), key=lambda i: values[i], reverse=True)
+    return [topics[i] for i in order]
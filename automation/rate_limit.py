@@ -0,0 +1,106 @@
+"""Client-side rate limiting for API calls"""
+
+from __future__ import annotations
+
+from threading import Lock
+from typing import Any, Optional
+import time
+
+# Rough characters-per-token ratio used to estimate prompt size before sending
+CHARS_PER_TOKEN = 4
+
+
+class TokenBucket:
+    """Refills continuously up to capacity at rate units per second"""
+
+    def __init__(self, capacity: float, rate: float) -> None:
+        self.capacity = capacity
+        self.rate = rate
+        self._level = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take amount from the bucket, returning how long to wait before using it"""
+        now = time.monotonic()
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        self._level -= amount
+        if self._level >= 0:
+            return 0.0
+        return -self._level / self.rate
+
+
+class RateLimiter:
+    """Keeps callers under per-minute request and input-token budgets"""
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+    ) -> None:
+        self._lock = Lock()
+        self._requests = (
+            TokenBucket(requests_per_minute, requests_per_minute / 60)
+            if requests_per_minute else None
+        )
+        self._tokens = (
+            TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+            if tokens_per_minute else None
+        )
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until one request using this many input tokens fits the budget"""
+        with self._lock:
+            wait = 0.0
+            if self._requests is not None:
+                wait = max(wait, self._requests.reserve(1))
+            if self._tokens is not None and tokens:
+                wait = max(wait, self._tokens.reserve(tokens))
+        if wait > 0:
+            time.sleep(wait)
+
+
+def _text_length(content: Any) -> int:
+    """Characters of text in a string or a list of content blocks"""
+    if isinstance(content, str):
+        return len(content)
+    return sum(len(block.get("text", "")) for block in content if isinstance(block, dict))
+
+
+def estimate_input_tokens(request: dict) -> int:
+    """Estimate the input tokens of a messages.create request from its text"""
+    chars = _text_length(request.get("system", ""))
+    chars += sum(_text_length(m.get("content", "")) for m in request.get("messages", []))
+    return chars // CHARS_PER_TOKEN + 1
+
+
+class _RateLimitedMessages:
+    def __init__(self, messages: Any, limiter: RateLimiter) -> None:
+        self._messages = messages
+        self._limiter = limiter
+
+    def create(self, **kwargs: Any) -> Any:
+        self._limiter.acquire(estimate_input_tokens(kwargs))
+        return self._messages.create(**kwargs)
+
+    def stream(self, **kwargs: Any) -> Any:
+        self._limiter.acquire(estimate_input_tokens(kwargs))
+        return self._messages.stream(**kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._messages, name)
+
+
+class RateLimitedClient:
+    """Wraps an Anthropic client so every messages call waits for the limiter"""
+
+    def __init__(self, client: Any, limiter: RateLimiter) -> None:
+        self._client = client
+        self.messages = _RateLimitedMessages(client.messages, limiter)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
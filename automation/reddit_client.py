@@ -2,185 +2,460 @@
 
 from __future__ import annotations
 
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 from datetime import datetime, timezone
-from typing import List, Optional
+from threading import Lock, Thread
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
 from urllib.parse import urlparse
 import re
+import time
 
 import requests
-from tenacity import retry, stop_after_attempt, wait_exponential
+from requests.adapters import HTTPAdapter
 
 from automation.config import RedditConfig
-from automation.models import TrendingTopic
+from automation.domains import DomainMatch
+from automation.http_cache import CacheEntry, ResponseCache
+from automation.listing_parser import parse_listing
+from automation.merge import TopKMerger
+from automation.metrics import timed
+from automation.models import TopicBatch, TrendingTopic
+from automation.post_filter import NEWS_DOMAINS, NEWS_SOURCE_NAMES, POLITICAL_KEYWORDS, PostFilter
+from automation.scheduler import RequestScheduler, get_shared_scheduler
+from automation.topic_store import TopicStore
+
+if TYPE_CHECKING:
+    from automation.clustering import NearDuplicateClusterer
+    from automation.ranking import RankingStrategy
+
+# Default number of configs fetched in parallel by fetch_multiple_sources
+DEFAULT_MAX_WORKERS = 8
+
+_shared_session: Optional[requests.Session] = None
+_shared_session_lock = Lock()
+
+# Cache keys with a background revalidation in flight
+_revalidating = set()
+_revalidating_lock = Lock()
+
+
+def get_shared_session() -> requests.Session:
+    """Get the process-wide keep-alive session used by all Reddit clients"""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=DEFAULT_MAX_WORKERS)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _shared_session = session
+        return _shared_session
 
 
 class RedditClient:
     """Client for fetching trending topics from Reddit"""
 
-    # Known news domains that are acceptable article sources
-    NEWS_DOMAINS = {
-        'bbc.com', 'bbc.co.uk', 'cnn.com', 'nytimes.com', 'theguardian.com',
-        'reuters.com', 'apnews.com', 'bloomberg.com', 'cnbc.com', 'forbes.com',
-        'wsj.com', 'washingtonpost.com', 'npr.org', 'abcnews.go.com', 'cbsnews.com',
-        'nbcnews.com', 'usatoday.com', 'latimes.com', 'time.com', 'newsweek.com',
-        'theverge.com', 'techcrunch.com', 'arstechnica.com', 'wired.com', 'vice.com',
-        'vox.com', 'axios.com', 'politico.com', 'thehill.com', 'huffpost.com',
-        'businessinsider.com', 'space.com', 'scientificamerican.com', 'nature.com',
-        'nationalgeographic.com', 'espn.com', 'skysports.com', 'variety.com',
-        'hollywoodreporter.com', 'rollingstone.com', 'pitchfork.com', 'ign.com',
-        'gamespot.com', 'polygon.com', 'kotaku.com', 'pcgamer.com', 'ew.com',
-        'billboard.com', 'allrecipes.com', 'seriouseats.com', 'bonappetit.com',
-        'epicurious.com', 'eater.com', 'cosmopolitan.com', 'vogue.com', 'gq.com',
-        'menshealth.com', 'womenshealthmag.com', 'shape.com', 'allure.com'
-    }
-
-    # Political keywords to filter out
-    POLITICAL_KEYWORDS = {
-        'trump', 'biden', 'congress', 'senate', 'election', 'vote', 'political',
-        'politics', 'president', 'republican', 'democrat', 'campaign', 'maduro',
-        'venezuela', 'war', 'military', 'government', 'parliament', 'minister',
-        'policy', 'legislation', 'bill', 'law', 'supreme court', 'justice',
-        'immigration', 'border', 'tariff', 'sanction', 'diplomat', 'putin',
-        'ukraine', 'gaza', 'israel', 'china', 'taiwan', 'embassy', 'treaty'
-    }
-
-    def __init__(self, config: RedditConfig) -> None:
+    # Kept here for callers that read the rules off the client
+    NEWS_DOMAINS = NEWS_DOMAINS
+    NEWS_SOURCE_NAMES = NEWS_SOURCE_NAMES
+    POLITICAL_KEYWORDS = POLITICAL_KEYWORDS
+    _news_classifier = PostFilter.news_classifier
+
+    def __init__(
+        self,
+        config: RedditConfig,
+        session: Optional[requests.Session] = None,
+        cache: Optional[ResponseCache] = None,
+        store: Optional[TopicStore] = None,
+        scheduler: Optional[RequestScheduler] = None,
+    ) -> None:
         self._config = config
+        self._session = session or get_shared_session()
+        self._scheduler = scheduler or get_shared_scheduler()
+        self._cache = cache
+        self._store = store
+        self._filter = PostFilter.from_config(config)
+
+    @property
+    def keyword_rejections(self) -> Counter[str]:
+        """How many titles each blocked term has rejected"""
+        return self._filter.keyword_rejections
+
+    def _match_blocked_keyword(self, title: str) -> Optional[str]:
+        """Return the political or blocklisted term found in title, if any"""
+        return self._filter.match_blocked_keyword(title)
 
     def _contains_political_content(self, title: str) -> bool:
         """Check if title contains political keywords"""
-        title_lower = title.lower()
-        return any(keyword in title_lower for keyword in self.POLITICAL_KEYWORDS)
+        return self._match_blocked_keyword(title) is not None
+
+    def _classify_news_url(self, url: str) -> Optional[DomainMatch]:
+        """Match URL against the news allow-list, parsing it only once"""
+        return self._filter.classify_news_url(url)
 
     def _is_news_article(self, url: str) -> bool:
         """Check if URL is from a known news source"""
-        try:
-            domain = urlparse(url).netloc.lower()
-            # Remove www. prefix
-            domain = domain.replace('www.', '')
-            return any(news_domain in domain for news_domain in self.NEWS_DOMAINS)
-        except Exception:
-            return False
+        return self._classify_news_url(url) is not None
 
     def _extract_source_name(self, url: str) -> str:
         """Extract readable source name from URL"""
+        match = self._classify_news_url(url)
+        if match is not None:
+            return match.source_name
         try:
             domain = urlparse(url).netloc.lower().replace('www.', '')
-            # Map common domains to readable names
-            name_map = {
-                'nytimes.com': 'New York Times',
-                'washingtonpost.com': 'Washington Post',
-                'bbc.com': 'BBC',
-                'bbc.co.uk': 'BBC',
-                'cnn.com': 'CNN',
-                'reuters.com': 'Reuters',
-                'apnews.com': 'AP News',
-                'bloomberg.com': 'Bloomberg',
-                'theguardian.com': 'The Guardian',
-                'wsj.com': 'Wall Street Journal',
-                'forbes.com': 'Forbes',
-                'cnbc.com': 'CNBC',
-                'npr.org': 'NPR',
-                'space.com': 'Space.com',
-            }
-            return name_map.get(domain, domain.split('.')[0].title())
+            return domain.split('.')[0].title()
         except Exception:
             return "Unknown"
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, max=10))
-    def fetch_hot_topics(self) -> List[TrendingTopic]:
+    def _request_listing(
+        self, params: dict, cached: Optional[CacheEntry] = None
+    ) -> CacheEntry:
         """
-        Fetch hot/trending topics from Reddit
-        Only includes posts that link to news articles from known sources
+        GET a listing, revalidating against a cached copy if one is given
 
         Returns:
-            List of TrendingTopic objects sorted by score
+            A fresh CacheEntry, or the cached one re-stamped on 304 Not Modified
         """
-        params = {"limit": self._config.limit}
         headers = {"User-Agent": self._config.user_agent}
+        if cached is not None:
+            headers.update(cached.conditional_headers())
 
         try:
-            response = requests.get(
+            response = self._scheduler.send(lambda: self._session.get(
                 self._config.url, params=params, headers=headers, timeout=10
-            )
+            ))
+            if cached is not None and response.status_code == 304:
+                cached.fetched_at = time.time()
+                return cached
             response.raise_for_status()
-            payload = response.json()
+            payload = parse_listing(response.content, self._config.minimum_score)
         except requests.RequestException as e:
             raise RuntimeError(f"Failed to fetch Reddit data: {e}")
+        except ValueError as e:
+            raise RuntimeError(f"Failed to decode Reddit data: {e}")
+
+        return CacheEntry(
+            payload=payload,
+            fetched_at=time.time(),
+            etag=response.headers.get("ETag", ""),
+            last_modified=response.headers.get("Last-Modified", ""),
+        )
+
+    def _revalidate_in_background(self, key: str, params: dict, cached: CacheEntry) -> None:
+        """Refresh a stale cache entry without blocking the caller"""
+        with _revalidating_lock:
+            if key in _revalidating:
+                return
+            _revalidating.add(key)
+
+        def revalidate() -> None:
+            try:
+                # A copy, so a 304 re-stamping it can't change the entry the caller is using
+                self._cache.store(key, self._request_listing(params, replace(cached)))
+            except Exception:
+                pass  # The stale copy stays in place; the next call retries
+            finally:
+                with _revalidating_lock:
+                    _revalidating.discard(key)
+
+        Thread(target=revalidate, daemon=True).start()
+
+    def _get_listing(self, params: dict) -> CacheEntry:
+        """
+        Fetch a listing, going through the response cache if enabled
 
-        now = datetime.now(timezone.utc)
-        topics: List[TrendingTopic] = []
-
-        for child in payload.get("data", {}).get("children", []):
-            data = child.get("data", {})
-
-            # Skip posts below minimum score
-            if data.get("score", 0) < self._config.minimum_score:
-                continue
+        Entries younger than cache_ttl are served as-is. Entries within the
+        following cache_stale_ttl seconds are served immediately while a
+        background request revalidates them. Older entries are revalidated
+        with a conditional request before being returned. The entry's
+        fetched_at is when its scores were actually current.
+        """
+        ttl = self._config.cache_ttl
+        if self._cache is None or ttl <= 0:
+            return self._request_listing(params)
+
+        # Listings are cached after low-score posts were dropped, so the threshold is part of the key
+        key = ResponseCache.key(
+            self._config.url, {**params, "minimum_score": self._config.minimum_score}
+        )
+        cached = self._cache.load(key)
+        if cached is not None:
+            age = cached.age()
+            if age < ttl:
+                return cached
+            if age < ttl + self._config.cache_stale_ttl:
+                self._revalidate_in_background(key, params, cached)
+                return cached
+
+        entry = self._request_listing(params, cached)
+        self._cache.store(key, entry)
+        return entry
+
+    def _accept_post(self, data: dict) -> Optional[DomainMatch]:
+        """Apply the acceptance filters to one post, returning its news match if accepted"""
+        return self._filter.accept(data)
+
+    def _parse_post(self, data: dict, retrieved_at: datetime) -> Optional[TrendingTopic]:
+        """Build a TrendingTopic from one post, returning None if it is rejected"""
+        return self._filter.parse(data, retrieved_at)
+
+    def _iter_pages(self, max_pages: Optional[int] = None) -> Iterator[Tuple[List[dict], datetime]]:
+        """
+        Yield (children, retrieved_at) for each listing page, following the after cursor
 
-            # Get title and check for political content
-            title = data.get("title", "Untitled")
+        retrieved_at is when the page was fetched from Reddit, which for a
+        cached page is earlier than now, so stored snapshots and velocities
+        reflect when the scores were really seen.
+        """
+        page_budget = max_pages if max_pages is not None else self._config.max_pages
+        seen = 0
+        after: Optional[str] = None
 
-            # FILTER OUT POLITICAL CONTENT
-            if self._contains_political_content(title):
-                continue
+        try:
+            for _ in range(page_budget):
+                params = {"limit": self._config.limit}
+                if after:
+                    params["after"] = after
+                    params["count"] = seen
+
+                entry = self._get_listing(params)
+                retrieved_at = datetime.fromtimestamp(entry.fetched_at, timezone.utc)
+                listing = entry.payload.get("data", {})
+                children = listing.get("children", [])
+                # Posts below minimum_score are dropped while decoding; dist counts them too
+                page_size = listing.get("dist", len(children))
+                self._filter.results["score"] += max(0, page_size - len(children))
+                yield children, retrieved_at
+
+                seen += page_size
+                after = listing.get("after")
+                if not after or not page_size:
+                    return
+        finally:
+            # Also runs when the consumer stops early and the generator is closed
+            self._filter.flush_metrics()
+
+    def iter_hot_topics(
+        self, target: Optional[int] = None, max_pages: Optional[int] = None
+    ) -> Iterator[TrendingTopic]:
+        """
+        Stream accepted topics from the hot listing, following the after cursor
 
-            # Get the URL from the post
-            url = data.get("url", "")
+        Pages are requested lazily, one at a time, so only as many pages are
+        fetched as needed and memory stays flat however deep we page.
 
-            # Skip if it's a self post without external URL
-            if not url or url.startswith("https://www.reddit.com/r/"):
-                continue
+        Args:
+            target: Stop once this many topics have been accepted (None for no limit)
+            max_pages: Maximum number of listing pages to request (defaults to config.max_pages)
 
-            # IMPORTANT: Only include posts that link to news articles
-            if not self._is_news_article(url):
-                continue
+        Yields:
+            TrendingTopic objects in listing order
+        """
+        accepted = 0
+        for children, retrieved_at in self._iter_pages(max_pages):
+            for child in children:
+                topic = self._parse_post(child.get("data", {}), retrieved_at)
+                if topic is None:
+                    continue
+                yield topic
+                accepted += 1
+                if target is not None and accepted >= target:
+                    return
+
+    @timed("reddit_fetch_seconds")
+    def fetch_hot_topics(self) -> List[TrendingTopic]:
+        """
+        Fetch hot/trending topics from Reddit
+        Only includes posts that link to news articles from known sources
 
-            # Extract source name for display
-            source_name = self._extract_source_name(url)
+        Pages through the listing until config.target_topics posts are
+        accepted or config.max_pages pages have been read. If the client has
+        a topic store, the accepted topics are recorded there.
 
-            topic = TrendingTopic(
-                id=data.get("id", ""),
-                title=title,
-                url=f"https://www.reddit.com{data.get('permalink', '')}",  # Reddit discussion link
-                score=int(data.get("score", 0)),
-                comment_count=int(data.get("num_comments", 0)),
-                retrieved_at=now,
-                subreddit=data.get("subreddit", ""),
-                author=data.get("author", ""),
-                article_url=url,  # The actual news article
-                article_source=source_name
-            )
-            topics.append(topic)
+        Returns:
+            List of TrendingTopic objects sorted by score
+        """
+        topics = list(self.iter_hot_topics(self._config.target_topics or None))
 
         # Sort by score (highest first)
         topics.sort(key=lambda t: t.score, reverse=True)
 
+        if self._store is not None and topics:
+            self._store.upsert(topics)
+
         return topics
 
-    def fetch_multiple_sources(self, configs: List[RedditConfig]) -> List[TrendingTopic]:
+    @timed("reddit_fetch_seconds")
+    def fetch_topic_batch(
+        self, target: Optional[int] = None, max_pages: Optional[int] = None
+    ) -> TopicBatch:
+        """
+        Fetch accepted topics straight into a columnar TopicBatch
+
+        Same paging, filters and store recording as fetch_hot_topics, but
+        each listing child is appended to the batch's columns as it is
+        parsed, so no TrendingTopic is built per post. Rows are in listing
+        order.
+
+        Args:
+            target: Stop once this many topics have been accepted (defaults to config.target_topics)
+            max_pages: Maximum number of listing pages to request (defaults to config.max_pages)
+        """
+        if target is None:
+            target = self._config.target_topics or None
+        batch = TopicBatch()
+        pages = self._iter_pages(max_pages)
+        for children, retrieved_at in pages:
+            for child in children:
+                self._filter.parse_into(batch, child.get("data", {}), retrieved_at)
+                if target is not None and len(batch) >= target:
+                    pages.close()
+                    break
+
+        if self._store is not None and len(batch):
+            self._store.upsert(batch)
+
+        return batch
+
+    @timed("reddit_fetch_multiple_seconds")
+    def fetch_multiple_sources(
+        self,
+        configs: List[RedditConfig],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        top_k: Optional[int] = None,
+        ranking: Optional[RankingStrategy] = None,
+        clusterer: Optional[NearDuplicateClusterer] = None,
+        skip_seen: bool = False,
+    ) -> List[TrendingTopic]:
         """
         Fetch from multiple Reddit configurations and combine results
 
+        Configs are fetched concurrently over the shared keep-alive session.
+        A config that fails is skipped so the others still contribute; the
+        error is only raised if every config fails.
+
+        Topics are deduplicated on post id and canonical article URL, so the
+        same article cross-posted to several subreddits is kept only once,
+        as its highest-scoring post.
+
+        With a clusterer, near-duplicate posts of the same story (different
+        titles and outlets) are collapsed into their highest-scoring post.
+        Without a ranking strategy, stories are ordered by the cluster's
+        combined score, but the returned topic keeps its own post's score
+        and comment count.
+
+        If the client has a topic store, every accepted topic from every
+        config is recorded there in one bulk write, before any clustering.
+        With skip_seen, stories the store has seen are then left out, so
+        only what is new since they were shown competes for the top_k. A
+        story counts as seen once any of its posts is: one marked seen
+        itself, another post of the same canonical article URL, or with a
+        clusterer, any post in its cluster. The other posts of a seen
+        cluster are marked seen as well.
+
         Args:
             configs: List of RedditConfig objects
+            max_workers: Maximum number of configs fetched at the same time
+            top_k: Keep only this many topics (None keeps all)
+            ranking: Strategy that orders topics (defaults to raw score)
+            clusterer: Collapses near-duplicate stories before ranking
+            skip_seen: Leave out stories already seen in the topic store
 
         Returns:
             Combined and deduplicated list of trending topics
         """
-        all_topics: List[TrendingTopic] = []
-        seen_urls = set()
+        if not configs:
+            return []
 
-        for config in configs:
-            client = RedditClient(config)
-            topics = client.fetch_hot_topics()
-
-            for topic in topics:
-                if topic.url not in seen_urls:
-                    all_topics.append(topic)
-                    seen_urls.add(topic.url)
-
-        # Sort by score
-        all_topics.sort(key=lambda t: t.score, reverse=True)
-
-        return all_topics
+        clients = [
+            RedditClient(
+                config, session=self._session, cache=self._cache, scheduler=self._scheduler
+            )
+            for config in configs
+        ]
+        workers = max(1, min(max_workers, len(configs)))
+        merger = TopKMerger(top_k)
+        errors: List[Exception] = []
+        fetched: List[TrendingTopic] = []
+        # Ranking and clustering look at all topics at once, so hold them until the end
+        held: List[List[TrendingTopic]] = []
+        skip_seen = skip_seen and self._store is not None
+        merge_as_fetched = ranking is None and clusterer is None
+        keep_all = self._store is not None or not merge_as_fetched
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(client.fetch_hot_topics) for client in clients]
+            # Ranks carry the config index, so the merge is deterministic
+            for index, (config, future) in enumerate(zip(configs, futures)):
+                topics: List[TrendingTopic] = []
+                try:
+                    topics = future.result()
+                except Exception as e:
+                    print(f"⚠️  Skipping r/{'+'.join(config.subreddits)}: {e}")
+                    errors.append(e)
+                if keep_all:
+                    fetched.extend(topics)
+                if merge_as_fetched:
+                    if skip_seen and topics:
+                        # Seen state only changes between fetches, so each config's
+                        # topics can be checked as they arrive
+                        seen = self._store.seen(topics)
+                        topics = [topic for topic in topics if topic.id not in seen]
+                    merger.extend(topics, source_index=index)
+                elif clusterer is None:
+                    held.append(topics)
+
+        for client in clients:
+            self.keyword_rejections.update(client.keyword_rejections)
+
+        if len(errors) == len(configs):
+            raise errors[0]
+
+        if self._store is not None and fetched:
+            self._store.upsert(fetched)
+
+        if merge_as_fetched:
+            return merger.results()
+
+        seen = self._store.seen(fetched) if skip_seen else set()
+
+        if clusterer is not None:
+            clusters = clusterer.cluster(fetched)
+            if seen:
+                shown = [c for c in clusters if any(t.id in seen for t in c.members)]
+                # The rest of a seen story's posts stay hidden once its seen post
+                # drops out of the listings
+                self._store.mark_seen(t.id for c in shown for t in c.members if t.id not in seen)
+                clusters = [c for c in clusters if not any(t.id in seen for t in c.members)]
+            # Stories rank by the cluster's combined score, but each keeps its own post's numbers
+            stories = [cluster.representative for cluster in clusters]
+            values = ranking.rank(stories) if ranking is not None else [float(c.score) for c in clusters]
+            merger.extend(stories, values=values)
+            return merger.results()
+
+        if seen:
+            fetched = [topic for topic in fetched if topic.id not in seen]
+            held = [[topic for topic in topics if topic.id not in seen] for topics in held]
+        # fetched and held list the same topics in the same order
+        values = ranking.rank(fetched)
+        offset = 0
+        for index, topics in enumerate(held):
+            merger.extend(topics, index, values[offset:offset + len(topics)])
+            offset += len(topics)
+        return merger.results()
+
+        if seen:
+            fetched = [topic for topic in fetched if topic.id not in seen]
+            held = [[topic for topic in topics if topic.id not in seen] for topics in held]
+        if not merge_as_fetched:
+            # fetched and held list the same topics in the same order
+            values = ranking.rank(fetched) if ranking is not None else None
+            offset = 0
+            for index, topics in enumerate(held):
+                merger.extend(topics, index, values[offset:offset + len(topics)] if values is not None else None)
+                offset += len(topics)
+
+        return merger.results()
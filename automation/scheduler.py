@@ -0,0 +1,177 @@
+"""Process-wide, rate-limit-aware scheduler for Reddit requests"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from typing import Callable, Dict, Mapping, Optional
+import random
+import time
+
+import requests
+
+from automation.metrics import get_metrics
+from automation.rate_limit import TokenBucket
+
+# Status codes worth retrying; any other 4xx is the caller's fault and is returned as-is
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class SchedulerStats:
+    """Counters describing how much the scheduler held requests back"""
+    requests: int = 0  # Attempts sent, including retries
+    retries: int = 0  # Attempts that were retries of a failed attempt
+    throttled: int = 0  # HTTP 429 responses received
+    waits: int = 0  # Times a request had to wait before being sent
+    wait_seconds: float = 0.0  # Total time spent waiting
+
+    def as_dict(self) -> Dict[str, float]:
+        return dict(self.__dict__)
+
+
+def _retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RequestScheduler:
+    """
+    Paces requests to spend Reddit's rate-limit budget evenly
+
+    Starts from a conservative token bucket and re-tunes it from each
+    response's X-Ratelimit-Remaining / X-Ratelimit-Reset headers, so the
+    remaining budget is spread over the rest of the window instead of being
+    burned in a burst. A 429 pauses every caller until Retry-After. Only
+    connection errors, timeouts, 429 and 5xx responses are retried, with
+    full-jitter exponential backoff.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 60,
+        burst: int = 5,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self._lock = Lock()
+        self._bucket = TokenBucket(burst, requests_per_minute / 60)
+        self._burst = burst
+        self._paused_until = 0.0
+        self._max_retries = max_retries
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._sleep = sleep
+        self.stats = SchedulerStats()
+
+    def _wait_for_slot(self) -> None:
+        with self._lock:
+            wait = max(self._bucket.reserve(1), self._paused_until - time.monotonic())
+            if wait > 0:
+                self.stats.waits += 1
+                self.stats.wait_seconds += wait
+        if wait > 0:
+            get_metrics().observe("reddit_rate_limit_wait_seconds", wait)
+            self._sleep(wait)
+
+    def _pause(self, seconds: float) -> None:
+        """Hold back every caller for the given time"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _learn(self, headers: Mapping[str, str]) -> None:
+        """Re-tune the pacing from the server's view of our budget"""
+        try:
+            remaining = float(headers["X-Ratelimit-Remaining"])
+            reset = float(headers["X-Ratelimit-Reset"])
+        except (KeyError, TypeError, ValueError):
+            return
+        if remaining < 1:
+            self._pause(reset)
+            return
+        with self._lock:
+            self._bucket.rate = remaining / max(reset, 1.0)
+            self._bucket.capacity = max(1.0, min(self._burst, remaining))
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self._max_delay, self._base_delay * 2 ** attempt))
+
+    def send(self, request: Callable[[], requests.Response]) -> requests.Response:
+        """
+        Send a request once a slot is free, retrying retryable failures
+
+        Returns:
+            The final response; it may still carry an error status if it was
+            not retryable or retries ran out
+
+        Raises:
+            requests.RequestException: If the last attempt failed to connect
+        """
+        metrics = get_metrics()
+        attempt = 0
+        while True:
+            self._wait_for_slot()
+            with self._lock:
+                self.stats.requests += 1
+                if attempt:
+                    self.stats.retries += 1
+            metrics.inc("reddit_requests_total")
+            if attempt:
+                metrics.inc("reddit_retries_total")
+
+            started = time.perf_counter()
+            try:
+                response = request()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                metrics.inc("reddit_request_errors_total", error=type(e).__name__)
+                if attempt >= self._max_retries:
+                    raise
+                self._sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            metrics.observe("reddit_request_seconds", time.perf_counter() - started,
+                            status=response.status_code)
+            self._learn(response.headers)
+            if response.status_code not in RETRYABLE_STATUS or attempt >= self._max_retries:
+                return response
+
+            if response.status_code == 429:
+                with self._lock:
+                    self.stats.throttled += 1
+                metrics.inc("reddit_throttled_total")
+                delay = _retry_after(response.headers)
+                self._pause(delay if delay is not None else self._backoff(attempt))
+            else:
+                self._sleep(self._backoff(attempt))
+            attempt += 1
+
+
+_shared_scheduler: Optional[RequestScheduler] = None
+_shared_scheduler_lock = Lock()
+
+
+def get_shared_scheduler() -> RequestScheduler:
+    """Get the scheduler shared by every Reddit client in the process"""
+    global _shared_scheduler
+    with _shared_scheduler_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = RequestScheduler()
+        return _shared_scheduler
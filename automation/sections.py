@@ -0,0 +1,112 @@
+"""Splitting a response into <tag>...</tag> sections, whole or as it streams"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterable, Optional
+import re
+
+
+def _open_pattern(tags: Iterable[str]) -> "re.Pattern[str]":
+    return re.compile("<(" + "|".join(re.escape(tag) for tag in tags) + ")>")
+
+
+def parse_sections(text: str, tags: Iterable[str]) -> Dict[str, str]:
+    """
+    Text of each tagged section found in text, stripped
+
+    A section that was opened but never closed (e.g. the response hit
+    max_tokens) runs to the end of the text. Missing sections are absent.
+    """
+    splitter = SectionSplitter(tags)
+    splitter.write(text)
+    splitter.close()
+    return splitter.sections
+
+
+class SectionSplitter:
+    """
+    Routes streamed text to callbacks by the tagged section it belongs to
+
+    Only the given tags are recognized, so markup inside a section passes
+    through untouched. Text outside every section is dropped. A tag split
+    across two chunks is held back until the next chunk shows what it is.
+    """
+
+    def __init__(
+        self,
+        tags: Iterable[str],
+        on_text: Optional[Callable[[str, str], None]] = None,
+        on_close: Optional[Callable[[str, str], None]] = None,
+    ) -> None:
+        """
+        Args:
+            tags: Section names, as in <name>...</name>
+            on_text: Called with (tag, text) for each piece of section text
+            on_close: Called with (tag, stripped section text) when a section ends
+        """
+        self._open = _open_pattern(tags)
+        self._on_text = on_text
+        self._on_close = on_close
+        self._buffer = ""
+        self._current: Optional[str] = None
+        self._parts: Dict[str, list] = {}
+        self.sections: Dict[str, str] = {}  # Closed sections, stripped
+
+    def _emit(self, text: str) -> None:
+        parts = self._parts[self._current]
+        if not parts:
+            text = text.lstrip()  # Newline after the opening tag
+        if text:
+            parts.append(text)
+            if self._on_text is not None:
+                self._on_text(self._current, text)
+
+    def _end_section(self) -> None:
+        tag = self._current
+        self.sections[tag] = "".join(self._parts[tag]).strip()
+        self._current = None
+        if self._on_close is not None:
+            self._on_close(tag, self.sections[tag])
+
+    def _drain(self, final: bool) -> None:
+        while self._buffer:
+            if self._current is None:
+                match = self._open.search(self._buffer)
+                if match is None:
+                    # Keep a trailing "<..." that may be the start of an opening tag
+                    start = self._buffer.rfind("<")
+                    self._buffer = "" if final or start == -1 else self._buffer[start:]
+                    return
+                self._current = match.group(1)
+                self._parts[self._current] = []
+                self._buffer = self._buffer[match.end():]
+                continue
+
+            closing = f"</{self._current}>"
+            end = self._buffer.find(closing)
+            if end != -1:
+                self._emit(self._buffer[:end])
+                self._buffer = self._buffer[end + len(closing):]
+                self._end_section()
+                continue
+
+            # Hold back a tail that could be the first part of the closing tag
+            keep = 0
+            if not final:
+                for size in range(min(len(closing) - 1, len(self._buffer)), 0, -1):
+                    if closing.startswith(self._buffer[-size:]):
+                        keep = size
+                        break
+            self._emit(self._buffer[:len(self._buffer) - keep])
+            self._buffer = self._buffer[len(self._buffer) - keep:]
+            return
+
+    def write(self, text: str) -> None:
+        self._buffer += text
+        self._drain(final=False)
+
+    def close(self) -> None:
+        """Flush held-back text, ending a section left open by a truncated response"""
+        self._drain(final=True)
+        if self._current is not None:
+            self._end_section()
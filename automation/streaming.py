@@ -0,0 +1,70 @@
+"""Streaming Claude responses to the console and to files"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, TextIO
+import sys
+import time
+
+
+@dataclass
+class GenerationTiming:
+    """Latency of one streamed generation"""
+    time_to_first_token: Optional[float] = None  # Seconds until the first text arrived
+    total: float = 0.0  # Seconds until the stream finished (or broke)
+    input_tokens: int = 0  # Usage reported by the API, 0 if the stream broke
+    output_tokens: int = 0
+
+    def __str__(self) -> str:
+        first = f"{self.time_to_first_token:.2f}s" if self.time_to_first_token is not None else "n/a"
+        return f"first token after {first}, finished in {self.total:.2f}s"
+
+
+class TeeWriter:
+    """Sends text to the console and a file, flushing the file at line ends"""
+
+    def __init__(self, file: TextIO, echo: Optional[TextIO] = sys.stdout) -> None:
+        self._file = file
+        self._echo = echo
+
+    def write(self, text: str) -> None:
+        if self._echo is not None:
+            self._echo.write(text)
+            self._echo.flush()
+        self._file.write(text)
+        if "\n" in text:
+            # Keep what has arrived on disk in case the connection drops
+            self._file.flush()
+
+
+def stream_text(
+    client: Any,
+    request: dict,
+    on_text: Callable[[str], None],
+    timing: Optional[GenerationTiming] = None,
+) -> str:
+    """
+    Stream a messages request, handing each text delta to on_text as it arrives
+
+    timing, if given, is filled in even when the stream fails part-way.
+
+    Returns:
+        The complete response text
+    """
+    timing = timing if timing is not None else GenerationTiming()
+    started = time.perf_counter()
+    chunks = []
+    try:
+        with client.messages.stream(**request) as stream:
+            for text in stream.text_stream:
+                if timing.time_to_first_token is None:
+                    timing.time_to_first_token = time.perf_counter() - started
+                chunks.append(text)
+                on_text(text)
+            usage = stream.get_final_message().usage
+            timing.input_tokens = usage.input_tokens
+            timing.output_tokens = usage.output_tokens
+    finally:
+        timing.total = time.perf_counter() - started
+    return "".join(chunks)
@@ -0,0 +1,254 @@
+"""Persistent SQLite store of fetched topics and their score history"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from pathlib import Path
+from threading import Lock
+from typing import Iterable, List, Optional, Sequence, Set, Tuple, Union
+import sqlite3
+import time
+
+from automation.models import TrendingTopic
+from automation.urls import canonicalize_url
+
+DEFAULT_STORE_PATH = Path.home() / ".cache" / "viral_content_automation" / "topics.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    article_url TEXT NOT NULL,
+    canonical_url TEXT NOT NULL,
+    article_source TEXT NOT NULL,
+    subreddit TEXT NOT NULL,
+    author TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    last_score INTEGER NOT NULL,
+    last_comment_count INTEGER NOT NULL,
+    times_fetched INTEGER NOT NULL DEFAULT 1,
+    seen_at REAL
+);
+CREATE INDEX IF NOT EXISTS posts_canonical_url ON posts (canonical_url);
+CREATE INDEX IF NOT EXISTS posts_subreddit ON posts (subreddit, last_seen);
+CREATE INDEX IF NOT EXISTS posts_unseen ON posts (last_seen, last_score) WHERE seen_at IS NULL;
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    post_id TEXT NOT NULL,
+    retrieved_at REAL NOT NULL,
+    score INTEGER NOT NULL,
+    comment_count INTEGER NOT NULL,
+    PRIMARY KEY (post_id, retrieved_at)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS snapshots_retrieved_at ON snapshots (retrieved_at);
+"""
+
+_MAX_PARAMETERS = 999
+
+_TOPIC_COLUMNS = (
+    "id, title, url, last_score, last_comment_count, last_seen,"
+    " subreddit, author, article_url, article_source"
+)
+
+
+def _epoch(moment: datetime) -> float:
+    if moment.tzinfo is None:
+        moment = moment.astimezone()
+    return moment.timestamp()
+
+
+def _topic_from_row(row: Sequence) -> TrendingTopic:
+    return TrendingTopic(
+        id=row[0],
+        title=row[1],
+        url=row[2],
+        score=row[3],
+        comment_count=row[4],
+        retrieved_at=datetime.fromtimestamp(row[5], timezone.utc),
+        subreddit=row[6],
+        author=row[7],
+        article_url=row[8],
+        article_source=row[9],
+    )
+
+
+class TopicStore:
+    """
+    Keeps every fetched post plus a snapshot of its score per fetch
+
+    Posts are upserted by id, so repeated fetches update one row and append a
+    snapshot instead of duplicating the post. Posts shown to the user or
+    turned into a package are marked seen, which lets later runs ask for only
+    what is new.
+    """
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_STORE_PATH) -> None:
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA cache_size=-65536")  # 64 MiB keeps index pages hot
+        self._conn.executescript(_SCHEMA)
+        self._lock = Lock()
+
+    def upsert(self, topics: Iterable[TrendingTopic]) -> int:
+        """
+        Record a fetch in a single transaction
+
+        A topic already recorded at the same retrieved_at, such as one read
+        again from a cached listing, is skipped rather than counted as
+        another fetch.
+
+        Returns:
+            Number of new snapshots written
+        """
+        posts = []
+        snapshots = []
+        for topic in topics:
+            at = _epoch(topic.retrieved_at)
+            posts.append((
+                topic.id, topic.title, topic.url, topic.article_url,
+                canonicalize_url(topic.article_url) if topic.article_url else "",
+                topic.article_source, topic.subreddit, topic.author,
+                at, at, topic.score, topic.comment_count,
+            ))
+            snapshots.append((topic.id, at, topic.score, topic.comment_count))
+        if not posts:
+            return 0
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO posts (id, title, url, article_url, canonical_url,"
+                " article_source, subreddit, author, first_seen, last_seen,"
+                " last_score, last_comment_count)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (id) DO UPDATE SET"
+                " title = excluded.title,"
+                " first_seen = min(first_seen, excluded.first_seen),"
+                " last_seen = max(last_seen, excluded.last_seen),"
+                # An older snapshot (e.g. from an archived dump) never replaces a newer score
+                " last_score = CASE WHEN excluded.last_seen >= last_seen"
+                " THEN excluded.last_score ELSE last_score END,"
+                " last_comment_count = CASE WHEN excluded.last_seen >= last_seen"
+                " THEN excluded.last_comment_count ELSE last_comment_count END,"
+                " times_fetched = times_fetched + 1"
+                " WHERE NOT EXISTS (SELECT 1 FROM snapshots"
+                " WHERE post_id = excluded.id AND retrieved_at = excluded.last_seen)",
+                posts,
+            )
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO snapshots (post_id, retrieved_at, score, comment_count)"
+                " VALUES (?, ?, ?, ?)",
+                snapshots,
+            )
+            return self._conn.total_changes - before
+
+    def mark_seen(self, topic_ids: Iterable[str], when: Optional[float] = None) -> None:
+        """Mark posts as shown or processed"""
+        when = time.time() if when is None else when
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE posts SET seen_at = ? WHERE id = ? AND seen_at IS NULL",
+                [(when, topic_id) for topic_id in topic_ids],
+            )
+
+    def unseen(
+        self,
+        min_score: int = 0,
+        since_hours: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> List[TrendingTopic]:
+        """Posts never marked seen, fetched within the window, best score first"""
+        since = time.time() - since_hours * 3600 if since_hours is not None else 0.0
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_TOPIC_COLUMNS} FROM posts INDEXED BY posts_unseen"
+                " WHERE seen_at IS NULL AND last_seen >= ? AND last_score >= ?"
+                " ORDER BY last_score DESC LIMIT ?",
+                (since, min_score, -1 if limit is None else limit),
+            ).fetchall()
+        return [_topic_from_row(row) for row in rows]
+
+    def by_canonical_url(self, article_url: str) -> List[TrendingTopic]:
+        """Every stored post linking to the same article"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_TOPIC_COLUMNS} FROM posts WHERE canonical_url = ?",
+                (canonicalize_url(article_url),),
+            ).fetchall()
+        return [_topic_from_row(row) for row in rows]
+
+    def _seen_values(self, column: str, values: Sequence[str]) -> Set[str]:
+        """The values of column found on posts marked seen"""
+        found: Set[str] = set()
+        with self._lock:
+            # Older SQLite builds allow at most 999 bound parameters per statement
+            for start in range(0, len(values), _MAX_PARAMETERS):
+                chunk = values[start:start + _MAX_PARAMETERS]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(row[0] for row in self._conn.execute(
+                    f"SELECT {column} FROM posts WHERE seen_at IS NOT NULL AND {column} IN ({placeholders})",
+                    chunk,
+                ))
+        return found
+
+    def seen_ids(self, topic_ids: Iterable[str]) -> Set[str]:
+        """The subset of topic_ids already marked seen"""
+        return self._seen_values("id", list(topic_ids))
+
+    def seen(self, topics: Iterable[TrendingTopic]) -> Set[str]:
+        """
+        Ids of the topics whose story was already seen
+
+        A topic counts as seen if it was marked seen itself or if a post
+        marked seen links to the same canonical article URL, so a story
+        cross-posted to another subreddit isn't offered again as new.
+        """
+        topics = list(topics)
+        urls = [canonicalize_url(t.article_url) if t.article_url else "" for t in topics]
+        seen_ids = self._seen_values("id", [t.id for t in topics])
+        seen_urls = self._seen_values("canonical_url", sorted({url for url in urls if url}))
+        return {
+            topic.id for topic, url in zip(topics, urls)
+            if topic.id in seen_ids or (url and url in seen_urls)
+        }
+
+    def history(self, post_id: str) -> List[Tuple[float, int, int]]:
+        """(retrieved_at, score, comment_count) snapshots of a post, oldest first"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT retrieved_at, score, comment_count FROM snapshots"
+                " WHERE post_id = ? ORDER BY retrieved_at",
+                (post_id,),
+            ).fetchall()
+
+    def snapshot_columns(
+        self, post_ids: Sequence[str]
+    ) -> Tuple[List[str], List[float], List[int], List[int]]:
+        """
+        Snapshots of many posts as parallel columns
+
+        Returns:
+            (post_ids, retrieved_at, scores, comment_counts), one entry per snapshot
+        """
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (id TEXT PRIMARY KEY)")
+            self._conn.execute("DELETE FROM wanted")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO wanted (id) VALUES (?)", ((i,) for i in post_ids)
+            )
+            rows = self._conn.execute(
+                "SELECT s.post_id, s.retrieved_at, s.score, s.comment_count"
+                " FROM wanted w JOIN snapshots s ON s.post_id = w.id"
+            ).fetchall()
+        if not rows:
+            return [], [], [], []
+        ids, retrieved_at, scores, comments = map(list, zip(*rows))
+        return ids, retrieved_at, scores, comments
+
+    def close(self) -> None:
+        self._conn.close()
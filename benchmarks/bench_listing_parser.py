@@ -0,0 +1,77 @@
+"""
+Compare full JSON decoding of Reddit listings against parse_listing
+
+Usage:
+    python benchmarks/bench_listing_parser.py [listing.json ...] [--posts N] [--minimum-score N]
+
+Recorded listings (raw https://www.reddit.com/r/<sub>/hot.json responses)
+can be passed as arguments; their posts are repeated to reach --posts.
+Without arguments synthetic posts from benchmarks/fixtures.py are used.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, List, Tuple
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from automation.http_cache import compact_listing  # noqa: E402
+from automation.listing_parser import parse_listing  # noqa: E402
+from benchmarks.fixtures import iter_posts, listing_body  # noqa: E402
+
+
+def build_listing(posts: int, recorded: List[Path]) -> bytes:
+    pool = []
+    for path in recorded:
+        pool.extend(json.loads(path.read_bytes())["data"]["children"])
+    return listing_body(list(iter_posts(posts, pool or None)), after="t3_next")
+
+
+def measure(parse: Callable[[], dict], repeat: int) -> Tuple[float, float]:
+    """Best wall time in seconds and peak traced memory in MB"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    parse()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("recorded", nargs="*", type=Path, help="Recorded listing JSON files")
+    parser.add_argument("--posts", type=int, default=20000, help="Posts in the listing")
+    parser.add_argument("--minimum-score", type=int, default=100, help="Score threshold")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per parser")
+    args = parser.parse_args()
+
+    body = build_listing(args.posts, args.recorded)
+    baseline = lambda: compact_listing(json.loads(body))  # noqa: E731
+    selective = lambda: parse_listing(body, args.minimum_score)  # noqa: E731
+
+    kept = len(selective()["data"]["children"])
+    print(f"Listing: {args.posts:,} posts, {len(body) / 1e6:.1f} MB, "
+          f"{kept:,} at or above score {args.minimum_score}")
+
+    results = {"json.loads + compact": measure(baseline, args.repeat),
+               "parse_listing": measure(selective, args.repeat)}
+    for name, (seconds, peak) in results.items():
+        print(f"  {name:<22} {seconds * 1000:8.1f} ms  {args.posts / seconds:>12,.0f} posts/s  "
+              f"peak {peak:7.1f} MB")
+
+    (base_s, base_mb), (sel_s, sel_mb) = results.values()
+    print(f"  speedup {base_s / sel_s:.2f}x, peak memory {sel_mb / base_mb:.0%} of baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Reddit listing fixtures for benchmarks
+
+Recorded listings are raw hot.json responses saved under benchmarks/fixtures/.
+The committed movies, gaming and food listings (25 posts each) were put
+together offline in the full hot.json wire format: stickied threads,
+galleries, crossposts, videos, awards, HTML-escaped fields and non-ASCII
+titles. Replace or extend them with live captures:
+
+    python -m benchmarks.fixtures record worldnews movies gaming
+
+Synthetic posts mimic the shape and size of real ones (previews, awards,
+flair) and are mixed so every filter has work to do: low scores, self
+posts, political titles, news and non-news domains.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterator, List, Optional
+import argparse
+import json
+import random
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures"
+ARTICLE_DIR = FIXTURE_DIR / "articles"  # Pages served by the fake news site
+
+NEWS_DOMAINS = ["www.bbc.com", "www.cnn.com", "www.reuters.com", "apnews.com", "variety.com",
+                "www.ign.com", "www.espn.com", "www.theverge.com", "www.billboard.com"]
+OTHER_DOMAINS = ["i.redd.it", "v.redd.it", "imgur.com", "youtube.com", "example-blog.net"]
+SUBREDDITS = ["movies", "television", "Music", "food", "gaming", "sports", "worldnews", "pics"]
+WORDS = (
+    "star album trailer season finale recipe record stadium championship "
+    "studio release tour launch festival chef player coach award debut "
+    "sequel premiere console update review fans crowd viral restaurant "
+    "breaking final team goal series cast director"
+).split()
+POLITICAL_WORDS = ["election", "senate", "tariff", "president", "ukraine"]
+
+
+def synthetic_post(i: int, rng: random.Random) -> dict:
+    """A post shaped like a real hot.json child, heavy fields included"""
+    subreddit = SUBREDDITS[i % len(SUBREDDITS)]
+    words = rng.sample(WORDS, 8)
+    if rng.random() < 0.1:
+        words[rng.randrange(8)] = rng.choice(POLITICAL_WORDS)
+    title = " ".join(words).capitalize()
+    slug = "-".join(words[:5])
+
+    is_self = rng.random() < 0.15
+    if is_self:
+        url = f"https://www.reddit.com/r/{subreddit}/comments/{i:x}/{slug}/"
+    elif rng.random() < 0.6:
+        url = f"https://{rng.choice(NEWS_DOMAINS)}/{slug}-{i}"
+    else:
+        url = f"https://{rng.choice(OTHER_DOMAINS)}/{i:x}"
+
+    image = {
+        "url": f"https://external-preview.redd.it/{i:x}.jpg?auto=webp&s={rng.getrandbits(64):x}",
+        "width": 1200,
+        "height": 675,
+    }
+    return {"kind": "t3", "data": {
+        "approved_at_utc": None, "subreddit": subreddit, "selftext": "" if not is_self else title * 3,
+        "author_fullname": f"t2_{i:x}", "saved": False, "gilded": 0, "clicked": False,
+        "title": title, "link_flair_richtext": [{"e": "text", "t": "News"}],
+        "subreddit_name_prefixed": f"r/{subreddit}", "hidden": False, "pwls": 6,
+        "link_flair_css_class": "news", "downs": 0, "thumbnail_height": 78,
+        "hide_score": False, "name": f"t3_{i:x}", "quarantine": False,
+        "upvote_ratio": round(rng.random(), 2), "ups": 0, "total_awards_received": 0,
+        "media_embed": {}, "thumbnail_width": 140, "is_original_content": False,
+        "secure_media": None, "is_reddit_media_domain": False, "is_meta": False,
+        "link_flair_text": "News", "score": int(rng.paretovariate(1.2) * 10),
+        "preview": {"images": [{
+            "source": image, "resolutions": [dict(image, width=w) for w in (108, 216, 320, 640, 960)],
+            "variants": {}, "id": f"img{i:x}",
+        }], "enabled": False},
+        "all_awardings": [{"id": "award_1", "name": "Helpful", "count": 1, "coin_price": 150}],
+        "awarders": [], "media_only": False, "can_gild": False, "spoiler": False,
+        "locked": False, "treatment_tags": [], "visited": False, "subreddit_id": "t5_2qh13",
+        "link_flair_background_color": "", "id": f"{i:x}", "is_robot_indexable": True,
+        "author": f"user{i % 5000}", "num_comments": rng.randint(0, 3000),
+        "send_replies": True, "whitelist_status": "all_ads", "contest_mode": False,
+        "permalink": f"/r/{subreddit}/comments/{i:x}/{slug}/",
+        "url": url, "subreddit_subscribers": 40000000,
+        "created_utc": 1760000000.0 + i, "num_crossposts": 0, "media": None, "is_video": False,
+        "is_self": is_self,
+    }}
+
+
+def load_recorded(directory: Path = FIXTURE_DIR) -> List[dict]:
+    """Every post child from the recorded listings in directory"""
+    children: List[dict] = []
+    for path in sorted(Path(directory).glob("*.json")):
+        children.extend(json.loads(path.read_bytes())["data"]["children"])
+    return children
+
+
+def iter_posts(count: int, recorded: Optional[List[dict]] = None, seed: int = 42) -> Iterator[dict]:
+    """
+    Yield count post children
+
+    Recorded posts are repeated to reach count, each copy with a fresh id and
+    its score and comment count scaled by a random factor, so filters and
+    rankings see a spread rather than the same values over and over; without
+    any, synthetic posts are generated.
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        if recorded:
+            child = recorded[i % len(recorded)]
+            if i >= len(recorded):
+                data = child["data"]
+                factor = rng.uniform(0.25, 2.0)
+                child = {"kind": "t3", "data": dict(
+                    data, id=f"{data.get('id', '')}{i:x}",
+                    score=int((data.get("score") or 0) * factor),
+                    num_comments=int((data.get("num_comments") or 0) * factor),
+                )}
+            yield child
+        else:
+            yield synthetic_post(i, rng)
+
+
+def listing_body(children: List[dict], after: Optional[str] = None) -> bytes:
+    """Serialize children as a hot.json response"""
+    listing = {"kind": "Listing", "data": {
+        "after": after, "dist": len(children), "modhash": "", "geo_filter": None,
+        "children": children, "before": None,
+    }}
+    return json.dumps(listing).encode("utf-8")
+
+
+def record(subreddits: List[str], directory: Path = FIXTURE_DIR, limit: int = 100) -> None:
+    """Save live hot.json listings as recorded fixtures"""
+    import requests
+
+    directory.mkdir(parents=True, exist_ok=True)
+    for subreddit in subreddits:
+        response = requests.get(
+            f"https://www.reddit.com/r/{subreddit}/hot.json",
+            params={"limit": limit},
+            headers={"User-Agent": "ViralContentAutomation/1.0 (benchmark fixtures)"},
+            timeout=10,
+        )
+        response.raise_for_status()
+        path = directory / f"{subreddit}.json"
+        path.write_bytes(response.content)
+        print(f"Recorded {len(response.json()['data']['children'])} posts to {path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage benchmark listing fixtures")
+    sub = parser.add_subparsers(dest="command", required=True)
+    record_parser = sub.add_parser("record", help="Record live listings from reddit.com")
+    record_parser.add_argument("subreddits", nargs="+")
+    record_parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args.subreddits, limit=args.limit)
+
+
+if __name__ == "__main__":
+    main()
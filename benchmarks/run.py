@@ -0,0 +1,755 @@
+"""
+Offline benchmark suite for the hot paths
+
+Usage:
+    python -m benchmarks.run                      # run and compare with baseline.json
+    python -m benchmarks.run --update-baseline    # run and store the results as the baseline
+    python -m benchmarks.run --stages parse,filter --sizes 1000,1000000
+
+Stages:
+    parse    Field-selective decoding of 100-post listing pages
+    filter   Keyword, self-post and news-domain filters on decoded posts
+    merge    Top-K merge of topics from seven sources
+    cluster  Near-duplicate story clustering
+    fetch    RedditClient paging against a local fake reddit.com (latency and 429s)
+    llm      Analysis and streamed generation against a local fake Anthropic API
+    combined The same output from one streamed call (--combined mode)
+    dump     Filtering an NDJSON submission dump with the process pool
+    startup  Fresh interpreters running the fetch command against the fake reddit.com
+    articles Concurrent article downloads and text extraction from a local fake news
+             site serving the pages in benchmarks/fixtures/articles
+    pipeline The batch command's analyze -> generate -> write pipeline against the
+             fake Anthropic API, two calls per stage at a time
+
+Post-level stages (parse, filter, fetch, dump) scale the recorded listings
+in benchmarks/fixtures up to each size; pass --synthetic to use generated
+posts instead. Story-level stages (merge, cluster, llm, combined, pipeline)
+always use generated posts, since copies of a few dozen stories would all be
+duplicates.
+
+The startup, articles and pipeline stages also check behaviour and stop the
+run with an error if a check fails: startup that fetch loads neither
+anthropic nor NumPy, articles that the fetcher extracts the fixture pages,
+honours its byte cap and time limits, skips non-HTML responses and serves
+cache hits without a request, pipeline that BatchPipeline keeps each stage
+within its concurrency limit, returns results in topic order and records a
+failed API call or write on that topic's result without stopping the rest.
+
+Each stage reports throughput, p50/p99 latency per operation and peak
+traced memory. The process exits with status 1 if any metric regressed by
+more than --tolerance against the stored baseline. Every result is stored
+with a calibration score, the machine's speed on a fixed workload, and the
+CPU-bound stages are compared after scaling by the ratio of the two scores,
+so a baseline recorded on one machine still holds on another. Stages that
+mostly wait on the fake servers are compared as measured.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+import weakref
+
+import requests
+
+from automation.articles import ArticleCache, ArticleFetcher
+from automation.clustering import NearDuplicateClusterer
+from automation.config import RedditConfig
+from automation.dumps import DumpFilter
+from automation.listing_parser import parse_listing
+from automation.merge import TopKMerger
+from automation.models import TrendingTopic
+from automation.reddit_client import RedditClient
+from automation.scheduler import RequestScheduler
+from benchmarks import servers
+from benchmarks.fixtures import FIXTURE_DIR, iter_posts, listing_body, load_recorded, synthetic_post
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+ROOT = Path(__file__).resolve().parent.parent
+PAGE_SIZE = 100
+CHUNK = 1000  # Posts per timed operation in the in-memory stages
+
+# Stages whose speed follows the CPU; the rest mostly wait on the fake servers
+CPU_BOUND = {"parse", "filter", "merge", "cluster", "dump", "startup"}
+
+# A stage prepares its inputs for a size and returns the work to time; the
+# work returns one latency per operation
+Work = Callable[[], List[float]]
+Stage = Callable[[int, "argparse.Namespace"], Tuple[Work, int]]
+
+
+@dataclass
+class Measurement:
+    stage: str
+    size: int
+    items: int
+    seconds: float
+    throughput: float  # Items per second
+    p50_ms: float
+    p99_ms: float
+    peak_mb: float
+    calibration: float = 0.0  # calibrate() on the machine that measured this
+
+    @property
+    def key(self) -> str:
+        return f"{self.stage}/{self.size}"
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def calibrate(rounds: int = 7) -> float:
+    """
+    Rounds per second of a fixed decode-and-filter workload, best of several
+
+    Used to compare results measured on different machines; the best round
+    is kept so a moment of background load doesn't skew it.
+    """
+    rng = random.Random(0)
+    body = listing_body([synthetic_post(i, rng) for i in range(200)])
+    best = float("inf")
+    for _ in range(rounds):
+        began = time.perf_counter()
+        for _ in range(5):
+            children = parse_listing(body, 0)["data"]["children"]
+            sorted((child["data"]["score"], child["data"]["title"].lower()) for child in children)
+        best = min(best, time.perf_counter() - began)
+    return 1 / best
+
+
+def _timed_chunks(items: Sequence, handle: Callable[[Sequence], None]) -> List[float]:
+    latencies = []
+    for start in range(0, len(items), CHUNK):
+        began = time.perf_counter()
+        handle(items[start:start + CHUNK])
+        latencies.append(time.perf_counter() - began)
+    return latencies
+
+
+def _posts(size: int, args: argparse.Namespace) -> List[dict]:
+    return list(iter_posts(size, args.recorded_posts))
+
+
+def _topics(size: int, args: argparse.Namespace) -> List[TrendingTopic]:
+    """Accepted-looking topics built from generated posts, each its own story"""
+    now = datetime.now(timezone.utc)
+    topics = []
+    for child in iter_posts(size):
+        data = child["data"]
+        topics.append(TrendingTopic(
+            id=data["id"], title=data["title"], url=f"https://www.reddit.com{data['permalink']}",
+            score=data["score"], comment_count=data["num_comments"], retrieved_at=now,
+            subreddit=data["subreddit"], author=data["author"], article_url=data["url"],
+            article_source="Fixture",
+        ))
+    return topics
+
+
+def stage_parse(size: int, args: argparse.Namespace) -> Tuple[Work, int]:
+    # A pool of distinct pages is reused to reach large sizes without holding GBs of JSON
+    posts = _posts(min(size, 100 * PAGE_SIZE), args)
+    pages = [listing_body(posts[i:i + PAGE_SIZE], after="t3_next")
+             for i in range(0, len(posts), PAGE_SIZE)]
+    n_pages = max(1, size // PAGE_SIZE)
+
+    def work() -> List[float]:
+        latencies = []
+        for i in range(n_pages):
+            began = time.perf_counter()
+            parse_listing(pages[i % len(pages)], 100)
+            latencies.append(time.perf_counter() - began)
+        return latencies
+    return work, n_pages * PAGE_SIZE
+
+
+def stage_filter(size: int, args: argparse.Namespace) -> Tuple[Work, int]:
+    posts = [child["data"] for child in _posts(size, args)]
+    client = RedditClient(RedditConfig(subreddits=["bench"], minimum_score=100))
+    now = datetime.now(timezone.utc)
+
+    def handle(chunk: Sequence[dict]) -> None:
+        for data in chunk:
+            client._parse_post(data, now)
+    return (lambda: _timed_chunks(posts, handle)), size
+
+
+def stage_merge(size: int, args: argparse.Namespace) -> Tuple[Work, int]:
+    topics = _topics(size, args)
+    sources = [topics[i::7] for i in range(7)]
+
+    def work() -> List[float]:
+        merger = TopKMerger(10)
+        latencies = []
+        for index, source in enumerate(sources):
+            latencies += _timed_chunks(source, lambda chunk: merger.extend(chunk, index))
+        merger.results()
+        return latencies
+    return work, size
+
+
+def stage_cluster(size: int, args: argparse.Namespace) -> Tuple[Work, int]:
+    import numpy  # noqa: F401  The clusterer loads it on first use; keep that out of the timings
+
+    topics = _topics(size, args)
+    clusterer = NearDuplicateClusterer()
+
+    def work() -> List[float]:
+        began = time.perf_counter()
+        clusterer.representatives(topics)
+        return [time.perf_counter() - began]
+    return work, size
+
+
+class _TimedSession(requests.Session):
+    """Session that records the latency of every request"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.latencies: List[float] = []
+
+    def request(self, *a, **kw):
+        began = time.perf_counter()
+        try:
+            return super().request(*a, **kw)
+        finally:
+            self.latencies.append(time.perf_counter() - began)
+
+
+def stage_fetch(size: int, args: argparse.Namespace) -> Tuple[Work, int]:
+    pages = max(1, size // PAGE_SIZE)
+
+    def work() -> List[float]:
+        with servers.running(
+            "reddit", posts=pages * PAGE_SIZE, latency=args.reddit_latency,
+            throttle_every=args.throttle_every, retry_after=0.05,
+            recorded=str(args.recorded or ""),
+        ) as base_url:
+            session = _TimedSession()
+            config = RedditConfig(
+                subreddits=["bench"], limit=PAGE_SIZE, max_pages=pages, base_url=base_url
+            )
+            scheduler = RequestScheduler(requests_per_minute=600000, burst=100, base_delay=0.01)
+            RedditClient(config, session=session, scheduler=scheduler).fetch_hot_topics()
+            return session.latencies
+    return work, pages * PAGE_SIZE
+
+
+def stage_llm(size: int, args: argparse.Namespace) -> Tuple[Work, int]:
+    import anthropic
+
+    from automation.streaming import GenerationTiming, stream_text
+    from viral_content_automation import (
+        ANALYSIS_INSTRUCTIONS, GENERATION_INSTRUCTIONS, MODEL, _system_prompt,
+    )
+
+    topics = _topics(size, args)
+
+    def work() -> List[float]:
+        latencies = []
+        with servers.running(
+            "anthropic", latency=args.llm_latency, token_delay=args.token_delay, output_tokens=200,
+        ) as base_url:
+            client = anthropic.Anthropic(api_key="bench", base_url=base_url, max_retries=0)
+            for topic in topics:
+                began = time.perf_counter()
+                summary = client.messages.create(
+                    model=MODEL, max_tokens=2000, system=_system_prompt(ANALYSIS_INSTRUCTIONS),
+                    messages=[{"role": "user", "content": f"Title: {topic.title}\nURL: {topic.article_url}"}],
+                ).content[0].text
+                stream_text(client, dict(
+                    model=MODEL, max_tokens=8000, system=_system_prompt(GENERATION_INSTRUCTIONS),
+                    messages=[{"role": "user", "content": summary}],
+                ), lambda text: None, GenerationTiming())
+                latencies.append(time.perf_counter() - began)
+        return latencies
+    return work, size
+
+
+def stage_dump(size: int, args: argparse.Namespace) -> Tuple[Work, int]:
+    directory = tempfile.mkdtemp()
+    dump = Path(directory) / "submissions.ndjson"
+    with open(dump, "w", encoding="utf-8") as f:
+        for child in iter_posts(size, args.recorded_posts):
+            f.write(json.dumps(child["data"]) + "\n")
+    # Small chunks, so even the smallest dump is spread over every worker
+    chunk_bytes = max(1 << 20, dump.stat().st_size // (4 * args.dump_workers) + 1)
+
+    def work() -> List[float]:
+        dump_filter = DumpFilter(100, workers=args.dump_workers, chunk_bytes=chunk_bytes)
+        latencies = []
+        began = time.perf_counter()
+        for _ in dump_filter.iter_batches([dump]):
+            latencies.append(time.perf_counter() - began)
+            began = time.perf_counter()
+        return latencies
+    weakref.finalize(work, shutil.rmtree, directory, ignore_errors=True)
+    return work, size
+
+
+def stage_startup(size: int, args: argparse.Namespace) -> Tuple[Work, int]:
+    # A whole fetch command against the fake reddit.com, in a fresh interpreter
+    # with an empty home directory (so no cached listings) and without the
+    # Reddit request pacing; the exit status says whether it failed or pulled
+    # in a module fetch must not load
+    script = (
+        "import sys, viral_content_automation as v, automation.scheduler as s\n"
+        "s._shared_scheduler = s.RequestScheduler(requests_per_minute=600000, burst=100)\n"
+        "for name in dir(v):\n"
+        "    if name.startswith('VIRAL_') and name.endswith('_CONFIG'):\n"
+        "        getattr(v, name).base_url = sys.argv[1]\n"
+        "status = v.main(['fetch', '--format', 'jsonl'])\n"
+        "sys.exit(status or 2 * ('anthropic' in sys.modules) or 3 * ('numpy' in sys.modules))\n"
+    )
+    problems = {1: "The fetch command failed", 2: "The fetch command imported anthropic",
+                3: "The fetch command imported numpy"}
+    env = {k: v for k, v in os.environ.items() if k != "ANTHROPIC_API_KEY"}
+
+    def work() -> List[float]:
+        latencies = []
+        with servers.running("reddit", recorded=str(args.recorded or "")) as base_url:
+            for _ in range(size):
+                with tempfile.TemporaryDirectory(prefix="bench-home-") as home:
+                    began = time.perf_counter()
+                    status = subprocess.run(
+                        [sys.executable, "-c", script, base_url], cwd=ROOT,
+                        env=dict(env, HOME=home), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                    ).returncode
+                    latencies.append(time.perf_counter() - began)
+                if status:
+                    raise RuntimeError(problems.get(status, f"The fetch command exited with {status}"))
+        return latencies
+    return work, size
+
+
+# What the fetcher must pull out of each fixture page, and what it must leave behind
+ARTICLE_EXPECTATIONS = {
+    "nolan-odyssey-trailer.html": {
+        "title": "Nolan’s Odyssey trailer breaks 24-hour viewing record",  # og:title wins
+        "contains": ["167 million times", "Deadpool & Wolverine", "“mythic action epic”", "the Cyclops"],
+        "excludes": ["script text", "Navigation links", "Search the whole site", "Cookies",
+                     "Matt Damon", "Oppenheimer", "Share this story", "Copyright"],
+    },
+    "creme-brulee.html": {  # Latin-1, declared only in the page's <meta>
+        "title": "Crème brûlée with burnt honey | Serious Eats",
+        "contains": ["Classic crème brûlée", "150°C", "glassy and crisp"],
+        "excludes": ["Home", "Serves 6"],
+    },
+}
+
+
+def check_article_fetcher(base_url: str) -> None:
+    """Raise RuntimeError unless ArticleFetcher behaves as documented against the fake news site"""
+    problems = []
+
+    def check(ok: bool, problem: str) -> None:
+        if not ok:
+            problems.append(problem)
+
+    with tempfile.TemporaryDirectory(prefix="bench-articles-") as directory:
+        timeout, max_bytes = 1.0, 256 * 1024
+        fetcher = ArticleFetcher(ArticleCache(directory), max_bytes=max_bytes, timeout=timeout)
+
+        for page, expected in ARTICLE_EXPECTATIONS.items():
+            article = fetcher.fetch(f"{base_url}/{page}")
+            if article is None:
+                problems.append(f"{page}: no article extracted")
+                continue
+            check(article.title == expected["title"], f"{page}: title {article.title!r}")
+            check(not article.truncated, f"{page}: marked truncated")
+            for text in expected["contains"]:
+                check(text in article.text, f"{page}: {text!r} missing from the text")
+            for text in expected["excludes"]:
+                check(text not in article.text, f"{page}: {text!r} extracted from page chrome")
+
+        check(fetcher.fetch(f"{base_url}/annual-report.pdf") is None, "a PDF was treated as an article")
+
+        began = time.perf_counter()
+        article = fetcher.fetch(f"{base_url}/huge.html")
+        check(article is not None and article.truncated and len(article.text) <= max_bytes,
+              "huge.html was not cut off at the byte cap")
+        check(time.perf_counter() - began < timeout, "huge.html was read past the byte cap")
+
+        began = time.perf_counter()
+        article = fetcher.fetch(f"{base_url}/slow.html")
+        check(time.perf_counter() - began < timeout + 0.5, "slow.html was read past the time limit")
+        check(article is not None and article.truncated and bool(article.text),
+              "the part of slow.html read before the time limit was not kept")
+
+        began = time.perf_counter()
+        check(fetcher.fetch(f"{base_url}/stall.html") is None, "stall.html produced an article")
+        check(time.perf_counter() - began < 2 * timeout + 0.5, "stall.html was waited on past the timeout")
+
+        # A second fetcher on the same cache directory, asking for the same
+        # article with tracking parameters, must not download it again
+        requests_before = requests.get(f"{base_url}/_requests", timeout=5).json()
+        cached = ArticleFetcher(ArticleCache(directory), timeout=timeout).fetch_many([
+            f"{base_url}/nolan-odyssey-trailer.html?utm_source=reddit",
+            f"{base_url}/creme-brulee.html#comments",
+            f"{base_url}/creme-brulee.html",
+        ])
+        requests_after = requests.get(f"{base_url}/_requests", timeout=5).json()
+        check(all(article is not None for article in cached.values()), "cached articles were not returned")
+        check(requests_after == requests_before, "cached articles were downloaded again")
+
+    if problems:
+        raise RuntimeError("ArticleFetcher check failed: " + "; ".join(problems))
+
+
+def stage_articles(size: int, args: argparse.Namespace) -> Tuple[Work, int]:
+    with servers.running("articles", trickle_seconds=5.0) as base_url:
+        check_article_fetcher(base_url)
+
+    # Distinct URLs, so each one is downloaded and extracted; no cache
+    pages = sorted(ARTICLE_EXPECTATIONS)
+    paths = [f"/{pages[i % len(pages)]}?copy={i}" for i in range(size)]
+
+    def work() -> List[float]:
+        latencies = []
+        with servers.running("articles", latency=args.article_latency) as base_url:
+            fetcher = ArticleFetcher(max_workers=8)
+            for start in range(0, len(paths), 8):
+                began = time.perf_counter()
+                fetched = fetcher.fetch_many(base_url + path for path in paths[start:start + 8])
+                latencies.append(time.perf_counter() - began)
+                if not all(fetched.values()):
+                    raise RuntimeError("ArticleFetcher returned no article for a fixture page")
+        return latencies
+    return work, size
+
+
+def stage_combined(size: int, args: argparse.Namespace) -> Tuple[Work, int]:
+    import anthropic
+
+    from automation.sections import SectionSplitter
+    from automation.streaming import GenerationTiming, stream_text
+    from viral_content_automation import (
+        COMBINED_INSTRUCTIONS, COMBINED_SECTIONS, MODEL, _system_prompt,
+    )
+
+    topics = _topics(size, args)
+
+    def work() -> List[float]:
+        latencies = []
+        # As many words as analysis and generation together in the llm stage
+        with servers.running(
+            "anthropic", latency=args.llm_latency, token_delay=args.token_delay, output_tokens=400,
+        ) as base_url:
+            client = anthropic.Anthropic(api_key="bench", base_url=base_url, max_retries=0)
+            for topic in topics:
+                began = time.perf_counter()
+                splitter = SectionSplitter(COMBINED_SECTIONS)
+                stream_text(client, dict(
+                    model=MODEL, max_tokens=10000, system=_system_prompt(COMBINED_INSTRUCTIONS),
+                    messages=[{"role": "user", "content": f"Title: {topic.title}\nURL: {topic.article_url}"}],
+                ), splitter.write, GenerationTiming())
+                splitter.close()
+                latencies.append(time.perf_counter() - began)
+        return latencies
+    return work, size
+
+
+# Titles containing this fail at the fake Anthropic API
+FAIL_MARKER = "[fail]"
+
+
+def _pipeline(base_url: str, analyze_workers: int, generate_workers: int, write=None, probe=None):
+    """
+    BatchPipeline whose stages call the fake Anthropic API like the batch command
+
+    probe, if given, is called with (stage, +1) as a call starts and
+    (stage, -1) as it ends; write defaults to returning a dummy path.
+    """
+    import anthropic
+
+    from automation.pipeline import BatchPipeline
+    from automation.streaming import GenerationTiming, stream_text
+    from viral_content_automation import (
+        ANALYSIS_INSTRUCTIONS, GENERATION_INSTRUCTIONS, MODEL, _system_prompt,
+    )
+
+    client = anthropic.Anthropic(api_key="bench", base_url=base_url, max_retries=0)
+    probe = probe or (lambda stage, change: None)
+
+    def analyze(topic: TrendingTopic) -> str:
+        probe("analyze", 1)
+        try:
+            return client.messages.create(
+                model=MODEL, max_tokens=2000, system=_system_prompt(ANALYSIS_INSTRUCTIONS),
+                messages=[{"role": "user", "content": f"Title: {topic.title}\nURL: {topic.article_url}"}],
+            ).content[0].text
+        finally:
+            probe("analyze", -1)
+
+    def generate(topic: TrendingTopic, summary: str) -> str:
+        probe("generate", 1)
+        try:
+            return stream_text(client, dict(
+                model=MODEL, max_tokens=8000, system=_system_prompt(GENERATION_INSTRUCTIONS),
+                messages=[{"role": "user", "content": summary}],
+            ), lambda text: None, GenerationTiming())
+        finally:
+            probe("generate", -1)
+
+    return BatchPipeline(
+        analyze, generate, write or (lambda topic, summary, package: Path(f"{topic.id}.txt")),
+        analyze_workers=analyze_workers, generate_workers=generate_workers,
+    )
+
+
+def check_batch_pipeline(base_url: str, topics: List[TrendingTopic]) -> None:
+    """
+    Raise RuntimeError unless BatchPipeline behaves as documented against the fake Anthropic API
+
+    The first topic's analysis call fails at the API and the second topic's
+    write fails; every other topic must still get its package.
+    """
+    from automation.pipeline import BatchResult
+
+    analyze_workers, generate_workers = 2, 3
+    lock = threading.Lock()
+    active = {"analyze": 0, "generate": 0}
+    peak = {"analyze": 0, "generate": 0, "both": 0}
+    written: List[str] = []
+    reported: List[BatchResult] = []
+    problems = []
+
+    def check(ok: bool, problem: str) -> None:
+        if not ok:
+            problems.append(problem)
+
+    def probe(stage: str, change: int) -> None:
+        with lock:
+            active[stage] += change
+            peak[stage] = max(peak[stage], active[stage])
+            peak["both"] = max(peak["both"], min(active["analyze"], active["generate"]))
+
+    def write(topic: TrendingTopic, summary: str, package: str) -> Path:
+        written.append(topic.id)
+        if topic is topics[1]:
+            raise OSError("Disk full")
+        return Path(f"{topic.id}.txt")
+
+    topics = [replace(topics[0], title=f"{FAIL_MARKER} {topics[0].title}")] + topics[1:]
+    pipeline = _pipeline(base_url, analyze_workers, generate_workers, write, probe)
+    try:
+        results = pipeline.run(topics, on_result=reported.append)
+    except Exception as e:
+        raise RuntimeError(f"BatchPipeline check failed: a failed topic aborted the batch ({e!r})")
+
+    check([r.topic for r in results] == topics, "results are not in the order the topics were given")
+    check(sorted(id(r) for r in reported) == sorted(id(r) for r in results),
+          "on_result was not called exactly once for each result")
+    check(peak["analyze"] == analyze_workers,
+          f"analysis ran {peak['analyze']} at a time, not up to its limit of {analyze_workers}")
+    check(1 < peak["generate"] <= generate_workers,
+          f"generation ran {peak['generate']} at a time, with a limit of {generate_workers}")
+    check(peak["both"] > 0, "no topic was generated while another was being analyzed")
+
+    failed = results[0].error
+    check(getattr(failed, "status_code", None) == 500,
+          f"the failed analysis was not recorded on its result: {failed!r}")
+    check(topics[0].id not in written, "a topic whose analysis failed was written")
+    check(isinstance(results[1].error, OSError) and results[1].path is None,
+          f"the failed write was not recorded on its result: {results[1].error!r}")
+    check(all(r.ok and r.path == Path(f"{r.topic.id}.txt") for r in results[2:]),
+          "a failure in one topic stopped others from being written")
+
+    if problems:
+        raise RuntimeError("BatchPipeline check failed: " + "; ".join(problems))
+
+
+def stage_pipeline(size: int, args: argparse.Namespace) -> Tuple[Work, int]:
+    topics = _topics(max(size, 12), args)
+    with servers.running(
+        "anthropic", latency=args.llm_latency, token_delay=args.token_delay,
+        output_tokens=200, fail_marker=FAIL_MARKER,
+    ) as base_url:
+        check_batch_pipeline(base_url, topics[:12])
+    topics = topics[:size]
+
+    def work() -> List[float]:
+        with servers.running(
+            "anthropic", latency=args.llm_latency, token_delay=args.token_delay, output_tokens=200,
+        ) as base_url:
+            results = _pipeline(base_url, 2, 2).run(topics)
+        if not all(result.ok for result in results):
+            raise RuntimeError("BatchPipeline failed a topic against the fake Anthropic API")
+        return [result.elapsed for result in results]
+    return work, size
+
+
+STAGES: Dict[str, Stage] = {
+    "parse": stage_parse,
+    "filter": stage_filter,
+    "merge": stage_merge,
+    "cluster": stage_cluster,
+    "fetch": stage_fetch,
+    "llm": stage_llm,
+    "combined": stage_combined,
+    "dump": stage_dump,
+    "startup": stage_startup,
+    "articles": stage_articles,
+    "pipeline": stage_pipeline,
+}
+
+
+def measure(stage: str, size: int, args: argparse.Namespace, calibration: float = 0.0) -> Measurement:
+    work, items = STAGES[stage](size, args)
+    gc.collect()
+    began = time.perf_counter()
+    latencies = work()
+    seconds = time.perf_counter() - began
+
+    # Memory is traced in a second run, since tracing slows everything down
+    gc.collect()
+    tracemalloc.start()
+    work()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return Measurement(
+        stage=stage, size=size, items=items, seconds=seconds,
+        throughput=items / seconds if seconds else 0.0,
+        p50_ms=percentile(latencies, 0.5) * 1000,
+        p99_ms=percentile(latencies, 0.99) * 1000,
+        peak_mb=peak / 1e6,
+        calibration=calibration,
+    )
+
+
+def regressions(
+    results: List[Measurement], baseline: Dict[str, dict], tolerance: float
+) -> List[str]:
+    """
+    Describe every metric that is worse than the baseline by more than tolerance
+
+    CPU-bound baselines are first scaled to this machine by the ratio of the
+    calibration scores; the scaled value is what the messages show.
+    """
+    problems = []
+    for result in results:
+        base = baseline.get(result.key)
+        if base is None:
+            continue
+        speed = 1.0
+        if result.stage in CPU_BOUND and result.calibration and base.get("calibration"):
+            speed = result.calibration / base["calibration"]
+        throughput = base["throughput"] * speed
+        p99_ms = base["p99_ms"] / speed
+        if result.throughput < throughput * (1 - tolerance):
+            problems.append(f"{result.key}: throughput {result.throughput:,.0f}/s "
+                            f"< baseline {throughput:,.0f}/s")
+        if result.p99_ms > p99_ms * (1 + tolerance) + 1.0:
+            problems.append(f"{result.key}: p99 {result.p99_ms:.1f} ms > baseline {p99_ms:.1f} ms")
+        if result.peak_mb > base["peak_mb"] * (1 + tolerance) + 1.0:
+            problems.append(f"{result.key}: peak memory {result.peak_mb:.1f} MB "
+                            f"> baseline {base['peak_mb']:.1f} MB")
+    return problems
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help="Comma-separated stages to run (default: all)")
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="Comma-separated post counts (1k to 1M)")
+    parser.add_argument("--llm-calls", type=int, default=20,
+                        help="Topics sent through analysis and generation in the llm and combined stages")
+    parser.add_argument("--dump-workers", type=int, default=2,
+                        help="Worker processes in the dump stage (fixed, so every machine runs the pool)")
+    parser.add_argument("--startup-runs", type=int, default=10,
+                        help="Interpreter launches timed in the startup stage")
+    parser.add_argument("--article-fetches", type=int, default=200,
+                        help="Article pages downloaded, eight at a time, in the articles stage")
+    parser.add_argument("--article-latency", type=float, default=0.02,
+                        help="Seconds the fake news site adds to every response")
+    parser.add_argument("--recorded", type=Path, default=FIXTURE_DIR,
+                        help="Directory of recorded listings to scale (default: benchmarks/fixtures)")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="Use generated posts instead of recorded listings everywhere")
+    parser.add_argument("--reddit-latency", type=float, default=0.005,
+                        help="Seconds the fake reddit.com adds to every response")
+    parser.add_argument("--throttle-every", type=int, default=50,
+                        help="Fake reddit.com answers every Nth request with 429")
+    parser.add_argument("--llm-latency", type=float, default=0.05,
+                        help="Seconds before the fake Anthropic API answers")
+    parser.add_argument("--token-delay", type=float, default=0.0005,
+                        help="Seconds between streamed chunks from the fake Anthropic API")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH,
+                        help="Baseline file to compare against or update")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Store these results as the new baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="Allowed fractional slowdown before a metric counts as a regression")
+    parser.add_argument("--json", type=Path, help="Also write the results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.synthetic:
+        args.recorded = None
+    args.recorded_posts = load_recorded(args.recorded) if args.recorded else None
+    if args.recorded and not args.recorded_posts:
+        raise SystemExit(f"No recorded listings in {args.recorded}; pass --synthetic or record some")
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise SystemExit(f"Unknown stages: {', '.join(sorted(unknown))}")
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    calibration = calibrate()
+    results = []
+    print(f"{'stage':<8} {'size':>9} {'items/s':>12} {'p50 ms':>9} {'p99 ms':>9} {'peak MB':>9}")
+    for stage in stages:
+        fixed = {"llm": args.llm_calls, "combined": args.llm_calls, "pipeline": args.llm_calls,
+                 "startup": args.startup_runs, "articles": args.article_fetches}
+        for size in ([fixed[stage]] if stage in fixed else sizes):
+            result = measure(stage, size, args, calibration)
+            results.append(result)
+            print(f"{stage:<8} {size:>9,} {result.throughput:>12,.0f} {result.p50_ms:>9.2f} "
+                  f"{result.p99_ms:>9.2f} {result.peak_mb:>9.1f}")
+
+    if args.json:
+        args.json.write_text(json.dumps([asdict(r) for r in results], indent=2))
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if args.update_baseline:
+        baseline.update({r.key: asdict(r) for r in results})
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"\nBaseline updated: {args.baseline}")
+        return 0
+
+    calibrations = [b["calibration"] for b in baseline.values() if b.get("calibration")]
+    if calibrations:
+        print(f"\nMachine speed: {calibration / calibrations[0]:.2f}x the baseline's")
+    problems = regressions(results, baseline, args.tolerance)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    if not baseline:
+        print("\nNo baseline to compare against; run with --update-baseline to store one")
+    elif not problems:
+        print("\nNo regressions against the baseline")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
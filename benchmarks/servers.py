@@ -0,0 +1,324 @@
+"""
+Local stand-ins for reddit.com, news sites and the Anthropic Messages API
+
+Each server runs in its own process so its work never shows up in the
+benchmarked process's timings or memory. Run one by hand with:
+
+    python -m benchmarks.servers reddit --port 8001 --latency 0.05 --throttle-every 20
+    python -m benchmarks.servers anthropic --port 8002 --latency 0.3 --token-delay 0.01
+    python -m benchmarks.servers articles --port 8003
+
+then point RedditConfig(base_url="http://127.0.0.1:8001"),
+anthropic.Anthropic(base_url="http://127.0.0.1:8002") or an ArticleFetcher
+(http://127.0.0.1:8003/nolan-odyssey-trailer.html) at it.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock
+from typing import Any, Dict, Iterator
+from urllib.parse import parse_qs, urlsplit
+import argparse
+import json
+import multiprocessing
+import random
+import time
+import zlib
+
+from benchmarks.fixtures import ARTICLE_DIR, FIXTURE_DIR, listing_body, load_recorded, synthetic_post
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so clients can pool connections
+    options: Dict[str, Any] = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, headers: Dict[str, str]) -> None:
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeRedditHandler(_Handler):
+    """
+    Serves /r/<subreddits>/hot.json from a fixed pool of posts per path
+
+    Options:
+        posts: Posts available per listing before the cursor runs out
+        latency: Seconds added to every response
+        throttle_every: Answer every Nth request with 429 (0 never does)
+        retry_after: Retry-After seconds sent with a 429
+        recorded: Directory of recorded listings to serve posts from instead
+            of synthetic ones
+        budget: X-Ratelimit-Remaining sent with every response; the client
+            spreads it over a 60 second window, so it caps requests per minute
+    """
+
+    _counter_lock = Lock()
+    _requests = 0
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _page(path: str, offset: int, limit: int, total: int, recorded: str) -> bytes:
+        pool = load_recorded(Path(recorded)) if recorded else []
+        rng = random.Random(zlib.crc32(f"{path}:{offset}".encode()))
+        children = []
+        for i in range(offset, min(offset + limit, total)):
+            child = pool[i % len(pool)] if pool else synthetic_post(i, rng)
+            children.append(child)
+        end = offset + len(children)
+        return listing_body(children, after=f"t3_{end:x}" if end < total else None)
+
+    def do_GET(self):
+        options = self.options
+        parts = urlsplit(self.path)
+        if not parts.path.endswith("/hot.json"):
+            self._send(404, b"{}", {"Content-Type": "application/json"})
+            return
+
+        with self._counter_lock:
+            type(self)._requests += 1
+            count = type(self)._requests
+        time.sleep(options.get("latency", 0.0))
+
+        throttle_every = options.get("throttle_every", 0)
+        if throttle_every and count % throttle_every == 0:
+            self._send(429, b'{"error": 429}', {
+                "Content-Type": "application/json",
+                "Retry-After": str(options.get("retry_after", 1.0)),
+            })
+            return
+
+        query = parse_qs(parts.query)
+        limit = min(100, int(query.get("limit", ["25"])[0]))
+        after = query.get("after", [None])[0]
+        offset = int(after[3:], 16) if after else 0
+        body = self._page(parts.path, offset, limit, options.get("posts", 1000),
+                          options.get("recorded", ""))
+        self._send(200, body, {
+            "Content-Type": "application/json; charset=UTF-8",
+            "X-Ratelimit-Remaining": str(options.get("budget", 1_000_000)),
+            "X-Ratelimit-Reset": "60",
+        })
+
+
+class FakeAnthropicHandler(_Handler):
+    """
+    Answers POST /v1/messages like the Messages API, streaming or not
+
+    Options:
+        latency: Seconds before the first byte (or first token when streaming)
+        token_delay: Seconds per word of output; streamed replies send a word
+            each token_delay, others wait for the whole reply to be "generated"
+        output_tokens: Words in each reply, sent one chunk per word
+        fail_marker: Requests whose messages contain this text get a 500
+            api_error instead of a reply
+
+    Requests whose system prompt asks for <analysis> and <video_package>
+    sections get the first quarter of the words in the one and the rest in
+    the other, like a combined analysis and generation reply.
+    """
+
+    def do_POST(self):
+        options = self.options
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        fail_marker = options.get("fail_marker")
+        if fail_marker and fail_marker in json.dumps(request.get("messages", []), ensure_ascii=False):
+            time.sleep(options.get("latency", 0.0))
+            error = {"type": "error", "error": {"type": "api_error", "message": "Injected failure"}}
+            self._send(500, json.dumps(error).encode(), {"Content-Type": "application/json"})
+            return
+        input_tokens = len(json.dumps(request.get("messages", []))) // 4
+        words = [f"word{i}" for i in range(options.get("output_tokens", 200))]
+        if "<video_package>" in json.dumps(request.get("system", "")):
+            split = len(words) // 4
+            words = (["<analysis>"] + words[:split] + ["</analysis>", "<video_package>"]
+                     + words[split:] + ["</video_package>"])
+        time.sleep(options.get("latency", 0.0))
+
+        usage = {"input_tokens": input_tokens, "output_tokens": len(words)}
+        message = {
+            "id": "msg_fake", "type": "message", "role": "assistant",
+            "model": request.get("model", "fake"), "stop_reason": "end_turn",
+            "stop_sequence": None, "usage": usage,
+            "content": [{"type": "text", "text": " ".join(words)}],
+        }
+        if not request.get("stream"):
+            time.sleep(options.get("token_delay", 0.0) * len(words))
+            self._send(200, json.dumps(message).encode(), {"Content-Type": "application/json"})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def event(name: str, data: dict) -> None:
+            payload = f"event: {name}\ndata: {json.dumps(data)}\n\n".encode()
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(payload), payload))
+            self.wfile.flush()
+
+        event("message_start", {"type": "message_start", "message": dict(
+            message, content=[], stop_reason=None, usage=dict(usage, output_tokens=1))})
+        event("content_block_start", {
+            "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(options.get("token_delay", 0.0))
+            event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                          "delta": {"type": "text_delta", "text": (" " if i else "") + word}})
+        event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        event("message_delta", {"type": "message_delta",
+                                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                "usage": {"output_tokens": len(words)}})
+        event("message_stop", {"type": "message_stop"})
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class FakeArticleHandler(_Handler):
+    """
+    Serves the article pages in benchmarks/fixtures/articles, plus generated ones
+
+    Pages are found by file name, ignoring any query string, and sent as
+    text/html without a charset (so the page's own <meta> charset applies)
+    or application/pdf. Generated pages:
+
+        /huge.html     page_bytes of paragraphs, to hit the byte cap
+        /slow.html     a paragraph every trickle_delay seconds for trickle_seconds
+        /stall.html    headers, then nothing for trickle_seconds
+        /_requests     JSON count of requests per path so far
+
+    Options:
+        latency: Seconds before every response
+        page_bytes: Size of /huge.html
+        trickle_delay: Seconds between /slow.html paragraphs
+        trickle_seconds: How long /slow.html and /stall.html keep the connection
+    """
+
+    # Headers and body go out as separate small writes; with Nagle's algorithm
+    # each response on a kept-alive connection would wait for a delayed ACK
+    disable_nagle_algorithm = True
+    _counter_lock = Lock()
+    _counts: Dict[str, int] = {}
+    _paragraph = (b"<p>Paragraph of a very long article page, repeated until the byte "
+                  b"cap or the time limit stops the reader.</p>\n")
+
+    def _chunk(self, data: bytes) -> None:
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _stream(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def do_GET(self):
+        options = self.options
+        path = urlsplit(self.path).path
+        if path == "/_requests":
+            with self._counter_lock:
+                body = json.dumps(self._counts).encode()
+            self._send(200, body, {"Content-Type": "application/json"})
+            return
+        with self._counter_lock:
+            self._counts[path] = self._counts.get(path, 0) + 1
+        time.sleep(options.get("latency", 0.0))
+
+        head = b"<html><head><title>Generated page</title></head><body><article>\n"
+        try:
+            if path == "/huge.html":
+                self._stream()
+                self._chunk(head)
+                for _ in range(options.get("page_bytes", 8_000_000) // len(self._paragraph)):
+                    self._chunk(self._paragraph * 64)
+                self.wfile.write(b"0\r\n\r\n")
+                return
+            if path in ("/slow.html", "/stall.html"):
+                self._stream()
+                self._chunk(head)
+                delay = options.get("trickle_delay", 0.1)
+                ends = time.monotonic() + options.get("trickle_seconds", 10.0)
+                while time.monotonic() < ends:
+                    time.sleep(delay)
+                    if path == "/slow.html":
+                        self._chunk(self._paragraph)
+                self.wfile.write(b"0\r\n\r\n")
+                return
+        except (BrokenPipeError, ConnectionResetError):
+            return  # The client stopped reading, as it should
+
+        page = ARTICLE_DIR / Path(path).name
+        if not page.is_file():
+            self._send(404, b"Not found", {"Content-Type": "text/plain"})
+            return
+        content_type = "application/pdf" if page.suffix == ".pdf" else "text/html"
+        self._send(200, page.read_bytes(), {"Content-Type": content_type})
+
+
+HANDLERS = {"reddit": FakeRedditHandler, "anthropic": FakeAnthropicHandler, "articles": FakeArticleHandler}
+
+
+def serve(kind: str, options: Dict[str, Any], port: int = 0, ready=None) -> None:
+    """Run a fake server until the process is killed, reporting its port on ready"""
+    handler = type(HANDLERS[kind].__name__, (HANDLERS[kind],), {"options": options})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    if ready is not None:
+        ready.send(server.server_address[1])
+    server.serve_forever()
+
+
+@contextmanager
+def running(kind: str, **options: Any) -> Iterator[str]:
+    """Start a fake server in a child process and yield its base URL"""
+    receive, send = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=serve, args=(kind, options, 0, send), daemon=True)
+    process.start()
+    try:
+        if not receive.poll(30):
+            raise RuntimeError(f"Fake {kind} server did not start")
+        yield f"http://127.0.0.1:{receive.recv()}"
+    finally:
+        process.terminate()
+        process.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a local fake server for benchmarks")
+    parser.add_argument("kind", choices=sorted(HANDLERS))
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--posts", type=int, default=1000, help="reddit: posts per listing")
+    parser.add_argument("--throttle-every", type=int, default=0, help="reddit: 429 every Nth request")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="reddit: Retry-After seconds")
+    parser.add_argument("--recorded", nargs="?", const=str(FIXTURE_DIR), default="",
+                        help="reddit: serve recorded listings (default directory: benchmarks/fixtures)")
+    parser.add_argument("--budget", type=int, default=1_000_000,
+                        help="reddit: X-Ratelimit-Remaining per 60 second window")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="anthropic: seconds per output word")
+    parser.add_argument("--output-tokens", type=int, default=200, help="anthropic: words per reply")
+    parser.add_argument("--fail-marker", help="anthropic: answer 500 to requests containing this text")
+    parser.add_argument("--page-bytes", type=int, default=8_000_000, help="articles: size of /huge.html")
+    parser.add_argument("--trickle-delay", type=float, default=0.1,
+                        help="articles: seconds between /slow.html paragraphs")
+    parser.add_argument("--trickle-seconds", type=float, default=10.0,
+                        help="articles: how long /slow.html and /stall.html stay open")
+    args = parser.parse_args()
+
+    options = {k: v for k, v in vars(args).items() if k not in ("kind", "port")}
+    print(f"Fake {args.kind} listening on http://127.0.0.1:{args.port}")
+    serve(args.kind, options, args.port)
+
+
+if __name__ == "__main__":
+    main()
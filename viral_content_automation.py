@@ -4,12 +4,18 @@ Viral Content Automation Tool
 Scrapes viral social media trends from Reddit and generates YouTube video prompts
 """
 
-import anthropic
+import argparse
+import json
 import os
-from datetime import datetime
+import sys
+from contextlib import nullcontext, redirect_stdout
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import List
+from typing import Any, Callable, Dict, Iterable, List, Optional, TextIO, Tuple
 
+from automation.articles import ArticleCache, ArticleFetcher, truncate_to_tokens
+from automation.http_cache import ResponseCache
+from automation.llm_cache import LLMResultCache
 from automation.reddit_client import RedditClient
 from automation.config import (
     VIRAL_ALL_CONFIG,
@@ -20,24 +26,178 @@ from automation.config import (
     VIRAL_HOBBIES_CONFIG,
     VIRAL_SPORTS_CONFIG
 )
-from automation.models import TrendingTopic
+from automation.metrics import get_metrics
+from automation.message_batches import AnthropicBatchBackend, BatchBackend, MessageBatchRunner
+from automation.models import REDDIT_BASE_URL, TrendingTopic
+from automation.topic_store import TopicStore
+from automation.pipeline import BatchPipeline, BatchResult
+from automation.rate_limit import CHARS_PER_TOKEN, RateLimitedClient, RateLimiter
+from automation.sections import SectionSplitter, parse_sections
+from automation.streaming import GenerationTiming, TeeWriter, stream_text
+
+MODEL = "claude-sonnet-4-5-20250929"
+
+# Bump whenever the instructions below change so cached results are not reused
+PROMPT_VERSION = "2"
+
+# Article text sent with each analysis request is cut to about this many tokens
+ARTICLE_TOKEN_BUDGET = 1500
+
+# Shortest prompt prefix the API caches for Sonnet models
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+ANALYSIS_INSTRUCTIONS = """Analyze the viral content in the user's message and provide a brief summary suitable for creating a YouTube video.
+
+Extract:
+1. The main topic/story
+2. Why it's going viral (emotional appeal, timing, uniqueness)
+3. Key facts or details
+4. Target audience appeal
+
+Keep it concise (3-4 paragraphs)."""
+
+GENERATION_INSTRUCTIONS = """Create a complete YouTube video package for the viral content in the user's message, including:
+
+1. A detailed AI text-to-video prompt (30-60 seconds) that includes:
+   - Hook in first 5 seconds that grabs attention
+   - Visual storyboard suggestions
+   - Key explanations/facts to include
+   - Emotional elements to emphasize
+   - Call-to-action
+   - Tone direction (energetic, shareable, suitable for both long-form and Shorts)
+
+2. SEO-optimized YouTube title (under 60 characters, attention-grabbing)
+
+3. YouTube description with:
+   - Engaging intro paragraph
+   - Key points with emojis
+   - Call-to-action
+   - Source link
+   - 15-20 relevant hashtags
+
+4. 20-25 YouTube tags for maximum discoverability
+
+Format everything clearly with headers so it's ready to copy and paste."""
+
+# One-call mode asks for both parts at once, in tagged sections split apart afterwards
+COMBINED_SECTIONS = ("analysis", "video_package")
+
+COMBINED_INSTRUCTIONS = f"""Do two things for the viral content in the user's message and put each inside its own tags, with nothing outside them.
+
+First, inside <analysis></analysis> tags:
+{ANALYSIS_INSTRUCTIONS}
+
+Then, inside <video_package></video_package> tags, building on that analysis:
+{GENERATION_INSTRUCTIONS}"""
+
+
+def _system_prompt(instructions: str) -> list:
+    """
+    System prompt block, marked for Anthropic prompt caching once it is long enough
+
+    The API only caches a prefix of at least PROMPT_CACHE_MIN_TOKENS and
+    ignores the marker on anything shorter. The instructions above are a few
+    hundred tokens, so today they are sent unmarked and every call pays their
+    prefill; longer instructions get cached without further changes.
+    """
+    block = {"type": "text", "text": instructions}
+    if len(instructions) // CHARS_PER_TOKEN >= PROMPT_CACHE_MIN_TOKENS:
+        block["cache_control"] = {"type": "ephemeral"}
+    return [block]
+
+
+def _record_usage(stage: str, input_tokens: int, output_tokens: int) -> None:
+    metrics = get_metrics()
+    metrics.inc("llm_input_tokens_total", input_tokens, stage=stage)
+    metrics.inc("llm_output_tokens_total", output_tokens, stage=stage)
 
 
 class ViralContentAutomation:
-    def __init__(self):
+    def __init__(
+        self,
+        client=None,
+        result_cache: Optional[LLMResultCache] = None,
+        ranking: str = "score",
+        article_tokens: int = ARTICLE_TOKEN_BUDGET,
+        cluster: bool = True,
+        include_seen: bool = False,
+    ):
         # Try to load from .env file first
         self._load_env_file()
 
         self.api_key = os.getenv("ANTHROPIC_API_KEY")
-        if not self.api_key:
-            raise ValueError(
-                "ANTHROPIC_API_KEY environment variable not set.\n\n"
-                "Please set it using:\n"
-                "PowerShell: $env:ANTHROPIC_API_KEY=\"your_key_here\"\n"
-                "CMD: set ANTHROPIC_API_KEY=your_key_here\n"
-                "Or create a .env file with: ANTHROPIC_API_KEY=your_key_here"
-            )
-        self.client = anthropic.Anthropic(api_key=self.api_key)
+        self.response_cache = ResponseCache()
+        # The stores, ranker and clusterer are created on first use, so each
+        # command only opens the files and loads the modules it needs
+        self._result_cache = result_cache
+        self._topic_store: Optional[TopicStore] = None
+        self._ranking_name = ranking
+        self._ranking = None
+        self._cluster = cluster
+        self._clusterer = None
+        # Topics already shown or packaged are left out of fetches unless this is set
+        self.include_seen = include_seen
+        self.last_generation_timing: Optional[GenerationTiming] = None
+        # Set article_tokens to 0 to analyze from the title and URL alone
+        self.article_tokens = article_tokens
+        self.article_fetcher = ArticleFetcher(ArticleCache())
+
+        # An injected client (e.g. a local fake) needs no API key
+        self._client = client
+
+    @property
+    def client(self):
+        """
+        The Anthropic client, created on first use
+
+        Fetching topics never touches it, so it works without an API key and
+        without paying for the SDK import.
+        """
+        if self._client is None:
+            if not self.api_key:
+                raise ValueError(
+                    "ANTHROPIC_API_KEY environment variable not set.\n\n"
+                    "Please set it using:\n"
+                    "PowerShell: $env:ANTHROPIC_API_KEY=\"your_key_here\"\n"
+                    "CMD: set ANTHROPIC_API_KEY=your_key_here\n"
+                    "Or create a .env file with: ANTHROPIC_API_KEY=your_key_here"
+                )
+            import anthropic
+            self._client = anthropic.Anthropic(api_key=self.api_key)
+        return self._client
+
+    @client.setter
+    def client(self, client) -> None:
+        self._client = client
+
+    @property
+    def result_cache(self) -> LLMResultCache:
+        if self._result_cache is None:
+            self._result_cache = LLMResultCache()
+        return self._result_cache
+
+    @property
+    def topic_store(self) -> TopicStore:
+        if self._topic_store is None:
+            self._topic_store = TopicStore()
+        return self._topic_store
+
+    @property
+    def ranking(self):
+        """VelocityRanker for "velocity" ranking, None to rank by score"""
+        if self._ranking is None and self._ranking_name == "velocity":
+            # Imported here so NumPy only loads when it is used
+            from automation.ranking import VelocityRanker
+            self._ranking = VelocityRanker(self.topic_store)
+        return self._ranking
+
+    @property
+    def clusterer(self):
+        """NearDuplicateClusterer, or None with clustering turned off"""
+        if self._clusterer is None and self._cluster:
+            from automation.clustering import NearDuplicateClusterer
+            self._clusterer = NearDuplicateClusterer()
+        return self._clusterer
 
     def _load_env_file(self):
         """Load environment variables from .env file if it exists"""
@@ -50,13 +210,15 @@ class ViralContentAutomation:
                         key, value = line.split('=', 1)
                         os.environ[key.strip()] = value.strip()
 
-    def fetch_viral_content_from_reddit(self) -> List[TrendingTopic]:
+    def fetch_viral_content_from_reddit(self, count: int = 10) -> List[TrendingTopic]:
         """Fetch viral content from Reddit - Entertainment & Lifestyle Focus"""
         print("\n🔍 Fetching viral entertainment & lifestyle content from Reddit...\n")
         print("📂 Categories: Entertainment, Food, Gaming, Beauty, Hobbies, Sports\n")
 
         # Fetch from entertainment-focused sources (NO politics/news)
-        reddit_client = RedditClient(VIRAL_ALL_CONFIG)
+        reddit_client = RedditClient(
+            VIRAL_ALL_CONFIG, cache=self.response_cache, store=self.topic_store
+        )
         topics = reddit_client.fetch_multiple_sources([
             VIRAL_ENTERTAINMENT_CONFIG,
             VIRAL_FOOD_CONFIG,
@@ -65,42 +227,89 @@ class ViralContentAutomation:
             VIRAL_HOBBIES_CONFIG,
             VIRAL_SPORTS_CONFIG,
             VIRAL_ALL_CONFIG
-        ])
+        ], top_k=count, ranking=self.ranking, clusterer=self.clusterer,  # Return top 10 by default
+            skip_seen=not self.include_seen)
 
-        return topics[:10]  # Return top 10
+        return topics
 
-    def analyze_article_with_ai(self, url: str, title: str) -> str:
-        """Use Claude to analyze and summarize the article"""
-        print(f"\n📄 Analyzing: {title}\n")
+    def fetch_article_text(self, url: str) -> str:
+        """Main text of the article at url, cut to the token budget ("" if unavailable)"""
+        if self.article_tokens <= 0 or not url or url.startswith(REDDIT_BASE_URL):
+            return ""
+        article = self.article_fetcher.fetch(url)
+        return truncate_to_tokens(article.text, self.article_tokens) if article else ""
 
-        prompt = f"""Analyze this viral content and provide a brief summary suitable for creating a YouTube video:
+    def fetch_article_texts(self, topics: List[TrendingTopic]) -> Dict[str, str]:
+        """Download every topic's article concurrently, returning text by topic id"""
+        urls = {
+            topic.id: topic.article_url for topic in topics
+            if topic.article_url and not topic.article_url.startswith(REDDIT_BASE_URL)
+        }
+        if self.article_tokens <= 0 or not urls:
+            return {}
 
-Title: {title}
-URL: {url}
+        print(f"📰 Fetching {len(urls)} articles...")
+        articles = self.article_fetcher.fetch_many(urls.values())
+        texts = {
+            topic_id: truncate_to_tokens(articles[url].text, self.article_tokens)
+            for topic_id, url in urls.items() if articles.get(url) is not None
+        }
+        print(f"📰 Got text for {len(texts)}/{len(urls)} articles")
+        return texts
 
-Extract:
-1. The main topic/story
-2. Why it's going viral (emotional appeal, timing, uniqueness)
-3. Key facts or details
-4. Target audience appeal
+    def build_analysis_request(self, url: str, title: str, article_text: str = "") -> dict:
+        """Build the messages.create parameters for analyzing an article"""
+        prompt = f"""Title: {title}
+URL: {url}"""
+        if article_text:
+            prompt += f"""
 
-Keep it concise (3-4 paragraphs)."""
+Article text:
+{article_text}"""
 
-        message = self.client.messages.create(
-            model="claude-sonnet-4-5-20250929",
+        return dict(
+            model=MODEL,
             max_tokens=2000,
+            system=_system_prompt(ANALYSIS_INSTRUCTIONS),
             messages=[{
                 "role": "user",
                 "content": prompt
             }]
         )
 
-        return message.content[0].text
+    def analyze_article_with_ai(
+        self, url: str, title: str, article_text: Optional[str] = None
+    ) -> str:
+        """
+        Use Claude to analyze and summarize the article
 
-    def generate_video_prompt(self, topic: TrendingTopic, article_summary: str):
-        """Generate AI video creation prompt and YouTube metadata"""
-        print("\n🎬 Generating video creation materials...\n")
+        The article's text is downloaded and included in the prompt unless
+        article_text is passed in (e.g. prefetched by fetch_article_texts).
+        """
+        print(f"\n📄 Analyzing: {title}\n")
+
+        if article_text is None:
+            article_text = self.fetch_article_text(url)
+        key = self.result_cache.key(MODEL, PROMPT_VERSION, "analysis", title, url, article_text)
+        metrics = get_metrics()
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            print("♻️  Using cached analysis")
+            metrics.inc("llm_cache_hits_total", stage="analysis")
+            return cached
+
+        with metrics.timer("llm_request_seconds", stage="analysis"):
+            message = self.client.messages.create(
+                **self.build_analysis_request(url, title, article_text)
+            )
+        _record_usage("analysis", message.usage.input_tokens, message.usage.output_tokens)
+
+        summary = message.content[0].text
+        self.result_cache.put(key, summary)
+        return summary
 
+    def build_generation_request(self, topic: TrendingTopic, article_summary: str) -> dict:
+        """Build the messages.create parameters for generating a video package"""
         article_info = f"Article: {topic.article_url} ({topic.article_source})" if topic.article_url else f"URL: {topic.url}"
 
         prompt = f"""Based on this viral content:
@@ -111,44 +320,389 @@ Reddit Score: {topic.score:,}
 Reddit Comments: {topic.comment_count:,}
 
 Content Analysis:
-{article_summary}
+{article_summary}"""
 
-Create a complete YouTube video package including:
+        return dict(
+            model=MODEL,
+            max_tokens=8000,
+            system=_system_prompt(GENERATION_INSTRUCTIONS),
+            messages=[{
+                "role": "user",
+                "content": prompt
+            }]
+        )
 
-1. A detailed AI text-to-video prompt (30-60 seconds) that includes:
-   - Hook in first 5 seconds that grabs attention
-   - Visual storyboard suggestions
-   - Key explanations/facts to include
-   - Emotional elements to emphasize
-   - Call-to-action
-   - Tone direction (energetic, shareable, suitable for both long-form and Shorts)
+    def generate_video_prompt(
+        self,
+        topic: TrendingTopic,
+        article_summary: str,
+        sink: Optional[TextIO] = None,
+    ):
+        """
+        Generate AI video creation prompt and YouTube metadata
 
-2. SEO-optimized YouTube title (under 60 characters, attention-grabbing)
+        With a sink, the response is streamed: text is printed and written to
+        the sink as it arrives, and the timing is kept in last_generation_timing.
+        """
+        print("\n🎬 Generating video creation materials...\n")
 
-3. YouTube description with:
-   - Engaging intro paragraph
-   - Key points with emojis
-   - Call-to-action
-   - Source link
-   - 15-20 relevant hashtags
+        # Every topic field in the prompt is part of the key, so a package
+        # quoting an old score is not served for the topic's new one
+        key = self.result_cache.key(
+            MODEL, PROMPT_VERSION, "generation",
+            topic.title, topic.article_url or topic.url, topic.article_source,
+            str(topic.score), str(topic.comment_count), article_summary,
+        )
+        metrics = get_metrics()
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            print("♻️  Using cached video package")
+            metrics.inc("llm_cache_hits_total", stage="generation")
+            if sink is not None:
+                TeeWriter(sink).write(cached)
+            return cached
 
-4. 20-25 YouTube tags for maximum discoverability
+        request = self.build_generation_request(topic, article_summary)
+        if sink is not None:
+            timing = self.last_generation_timing = GenerationTiming()
+            try:
+                video_package = stream_text(self.client, request, TeeWriter(sink).write, timing)
+            finally:
+                metrics.observe("llm_request_seconds", timing.total, stage="generation")
+                if timing.time_to_first_token is not None:
+                    metrics.observe("llm_time_to_first_token_seconds", timing.time_to_first_token)
+            _record_usage("generation", timing.input_tokens, timing.output_tokens)
+        else:
+            with metrics.timer("llm_request_seconds", stage="generation"):
+                message = self.client.messages.create(**request)
+            _record_usage("generation", message.usage.input_tokens, message.usage.output_tokens)
+            video_package = message.content[0].text
+        self.result_cache.put(key, video_package)
+        return video_package
 
-Format everything clearly with headers so it's ready to copy and paste."""
+    def build_combined_request(self, topic: TrendingTopic, article_text: str = "") -> dict:
+        """Build the messages.create parameters for analysis and package in one call"""
+        article_info = f"Article: {topic.article_url} ({topic.article_source})" if topic.article_url else f"URL: {topic.url}"
 
-        message = self.client.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=8000,
+        prompt = f"""Title: {topic.title}
+{article_info}
+Reddit Score: {topic.score:,}
+Reddit Comments: {topic.comment_count:,}"""
+        if article_text:
+            prompt += f"""
+
+Article text:
+{article_text}"""
+
+        return dict(
+            model=MODEL,
+            max_tokens=10000,
+            system=_system_prompt(COMBINED_INSTRUCTIONS),
             messages=[{
                 "role": "user",
                 "content": prompt
             }]
         )
 
-        return message.content[0].text
+    @staticmethod
+    def _split_combined(text: str) -> Tuple[str, str]:
+        """(summary, package) from a combined response"""
+        sections = parse_sections(text, COMBINED_SECTIONS)
+        # If the tags were ignored, keep the whole response as the package
+        return sections.get("analysis", ""), sections.get("video_package", text.strip())
+
+    def analyze_and_generate(
+        self,
+        topic: TrendingTopic,
+        article_text: Optional[str] = None,
+        sink: Optional[TextIO] = None,
+        on_summary: Optional[Callable[[str], None]] = None,
+    ) -> Tuple[str, str]:
+        """
+        Analyze a topic and generate its video package in a single call
+
+        Saves a round trip and resending the summary as input, compared with
+        analyze_article_with_ai followed by generate_video_prompt. The
+        response has <analysis> and <video_package> sections, which are
+        split back into the same two pieces.
+
+        Args:
+            topic: Topic to analyze and generate for
+            article_text: Article text to include; None downloads it
+            sink: Stream the package to the console and into this file as it
+                is generated, keeping the timing in last_generation_timing
+            on_summary: Called with the analysis as soon as it is complete,
+                before any package text reaches the sink
+
+        Returns:
+            (summary, video_package)
+        """
+        print(f"\n🎬 Analyzing and generating in one call: {topic.title}\n")
+
+        if article_text is None:
+            article_text = self.fetch_article_text(topic.article_url or topic.url)
+        key = self.result_cache.key(
+            MODEL, PROMPT_VERSION, "combined", topic.title, topic.article_url or topic.url,
+            topic.article_source, str(topic.score), str(topic.comment_count), article_text,
+        )
+        metrics = get_metrics()
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            print("♻️  Using cached analysis and video package")
+            metrics.inc("llm_cache_hits_total", stage="combined")
+            summary, package = self._split_combined(cached)
+            if on_summary is not None:
+                on_summary(summary)
+            if sink is not None:
+                TeeWriter(sink).write(package)
+            return summary, package
+
+        request = self.build_combined_request(topic, article_text)
+        if sink is None:
+            with metrics.timer("llm_request_seconds", stage="combined"):
+                message = self.client.messages.create(**request)
+            _record_usage("combined", message.usage.input_tokens, message.usage.output_tokens)
+            text = message.content[0].text
+            self.result_cache.put(key, text)
+            return self._split_combined(text)
+
+        tee = TeeWriter(sink)
+
+        def section_text(tag: str, text: str) -> None:
+            if tag == "video_package":
+                tee.write(text)
+
+        def section_closed(tag: str, text: str) -> None:
+            if tag == "analysis" and on_summary is not None:
+                on_summary(text)
 
-    def run(self):
-        """Main automation workflow"""
+        splitter = SectionSplitter(COMBINED_SECTIONS, section_text, section_closed)
+        timing = self.last_generation_timing = GenerationTiming()
+        try:
+            text = stream_text(self.client, request, splitter.write, timing)
+        finally:
+            splitter.close()
+            metrics.observe("llm_request_seconds", timing.total, stage="combined")
+            if timing.time_to_first_token is not None:
+                metrics.observe("llm_time_to_first_token_seconds", timing.time_to_first_token)
+        _record_usage("combined", timing.input_tokens, timing.output_tokens)
+
+        summary, package = self._split_combined(text)
+        if "video_package" not in splitter.sections:
+            # Nothing was recognized as the package while streaming; send it all now
+            if "analysis" not in splitter.sections and on_summary is not None:
+                on_summary(summary)
+            tee.write(package)
+        self.result_cache.put(key, text)
+        return summary, package
+
+    def save_video_package(
+        self,
+        topic: TrendingTopic,
+        article_summary: str,
+        video_package: str,
+        output_dir: Path = Path("."),
+        unique: bool = False,
+    ) -> Path:
+        """
+        Write a video package to a timestamped text file
+
+        Args:
+            topic: Topic the package was generated for
+            article_summary: Output of analyze_article_with_ai
+            video_package: Output of generate_video_prompt
+            output_dir: Directory to write into
+            unique: Add the topic id to the filename so concurrent writes don't collide
+
+        Returns:
+            Path of the written file
+        """
+        filename = self._package_path(topic, output_dir, unique)
+
+        with open(filename, 'w', encoding='utf-8') as f:
+            self._write_package_header(f, topic, article_summary)
+            f.write(video_package)
+
+        return filename
+
+    @staticmethod
+    def _package_path(topic: TrendingTopic, output_dir: Path = Path("."), unique: bool = False) -> Path:
+        """Timestamped output path for a video package"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        suffix = f"_{topic.id}" if unique else ""
+        return Path(output_dir) / f"video_package_{timestamp}{suffix}.txt"
+
+    @staticmethod
+    def _write_package_header(f: TextIO, topic: TrendingTopic, article_summary: str) -> None:
+        """Write everything that precedes the generated package text"""
+        f.write("=" * 60 + "\n")
+        f.write("YOUTUBE VIDEO CREATION PACKAGE\n")
+        f.write(f"Generated: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}\n")
+        f.write(f"Topic: {topic.title}\n")
+        if topic.article_url:
+            f.write(f"Article URL: {topic.article_url}\n")
+            f.write(f"Article Source: {topic.article_source}\n")
+        f.write(f"Reddit Discussion: {topic.url}\n")
+        f.write(f"Reddit Score: {topic.score:,}\n")
+        f.write(f"Comments: {topic.comment_count:,}\n")
+        f.write("=" * 60 + "\n\n")
+        f.write("CONTENT ANALYSIS:\n")
+        f.write(article_summary)
+        f.write("\n\n" + "=" * 60 + "\n\n")
+
+    def run_batch(
+        self,
+        count: int = 10,
+        output_dir: Path = Path("."),
+        analyze_workers: int = 2,
+        generate_workers: int = 2,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        topics: Optional[List[TrendingTopic]] = None,
+        batch_backend: Optional[BatchBackend] = None,
+        batch_state_path: Path = Path(".message_batch_state.json"),
+        combined: bool = False,
+    ) -> List[BatchResult]:
+        """
+        Produce video packages for the top topics without any prompts
+
+        Args:
+            count: Number of top topics to process
+            output_dir: Directory the package files are written to
+            analyze_workers: Maximum concurrent analysis calls
+            generate_workers: Maximum concurrent generation calls
+            requests_per_minute: Anthropic request budget shared by both stages
+            tokens_per_minute: Anthropic input-token budget shared by both stages
+            topics: Process these topics instead of fetching from Reddit
+            batch_backend: Submit both stages through this Message Batches backend
+                instead of synchronous calls (slower to finish, but cheaper)
+            batch_state_path: Checkpoint file that lets an interrupted batch resume
+            combined: Analyze and generate each topic in a single call
+
+        Returns:
+            One BatchResult per topic, in ranking order
+        """
+        if combined and batch_backend is not None:
+            raise ValueError("Combined mode can't be used with the Message Batches API")
+        if topics is None and batch_backend is not None:
+            # Pick up the topics of an interrupted Message Batches run
+            topics = MessageBatchRunner(batch_backend, batch_state_path).resumable_topics() or None
+            if topics:
+                print(f"♻️  Resuming Message Batches run for {len(topics)} topics")
+        if topics is None:
+            topics = self.fetch_viral_content_from_reddit(count)
+        topics = topics[:count]
+
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        article_texts = self.fetch_article_texts(topics)
+
+        if batch_backend is not None:
+            return self._run_message_batches(
+                topics, output_dir, batch_backend, batch_state_path, article_texts
+            )
+
+        client = self.client
+        if requests_per_minute or tokens_per_minute:
+            client = RateLimitedClient(
+                self.client, RateLimiter(requests_per_minute, tokens_per_minute)
+            )
+        original_client, self.client = self.client, client
+
+        if combined:
+            packages: Dict[str, str] = {}
+
+            def analyze(topic: TrendingTopic) -> str:
+                summary, package = self.analyze_and_generate(topic, article_texts.get(topic.id, ""))
+                packages[topic.id] = package
+                return summary
+
+            def generate(topic: TrendingTopic, summary: str) -> str:
+                return packages.pop(topic.id)
+
+            # The single call is all the work, so it gets every worker
+            analyze_workers, generate_workers = analyze_workers + generate_workers, 1
+        else:
+            def analyze(topic: TrendingTopic) -> str:
+                return self.analyze_article_with_ai(
+                    topic.article_url or topic.url, topic.title, article_texts.get(topic.id, "")
+                )
+
+            generate = self.generate_video_prompt
+
+        def write(topic: TrendingTopic, summary: str, package: str) -> Path:
+            return self.save_video_package(topic, summary, package, output_dir, unique=True)
+
+        pipeline = BatchPipeline(
+            analyze, generate, write,
+            analyze_workers=analyze_workers,
+            generate_workers=generate_workers,
+        )
+        try:
+            results = pipeline.run(topics, on_result=self._report_batch_result)
+        finally:
+            self.client = original_client
+
+        succeeded = sum(1 for r in results if r.ok)
+        print(f"\n✨ Batch complete: {succeeded}/{len(results)} video packages written to {output_dir}")
+        return results
+
+    def _run_message_batches(
+        self,
+        topics: List[TrendingTopic],
+        output_dir: Path,
+        backend: BatchBackend,
+        state_path: Path,
+        article_texts: Dict[str, str],
+    ) -> List[BatchResult]:
+        """Run both stages as Message Batches and write the packages"""
+        runner = MessageBatchRunner(backend, state_path)
+        outcomes = runner.run(
+            topics,
+            lambda topic: self.build_analysis_request(
+                topic.article_url or topic.url, topic.title, article_texts.get(topic.id, "")
+            ),
+            self.build_generation_request,
+        )
+
+        results: List[BatchResult] = []
+        for topic in topics:
+            result = BatchResult(topic=topic)
+            stages = outcomes.get(topic.id, {})
+            analysis, generation = stages.get("analysis"), stages.get("generation")
+            try:
+                if analysis is None or not analysis.ok:
+                    raise RuntimeError(f"Analysis failed: {analysis.error if analysis else 'no result'}")
+                if generation is None or not generation.ok:
+                    raise RuntimeError(f"Generation failed: {generation.error if generation else 'no result'}")
+                result.path = self.save_video_package(
+                    topic, analysis.text, generation.text, output_dir, unique=True
+                )
+            except Exception as e:
+                result.error = e
+            self._report_batch_result(result)
+            results.append(result)
+
+        runner.clear()
+        succeeded = sum(1 for r in results if r.ok)
+        print(f"\n✨ Batch complete: {succeeded}/{len(results)} video packages written to {output_dir}")
+        return results
+
+    def _report_batch_result(self, result: BatchResult) -> None:
+        if result.ok:
+            self.topic_store.mark_seen([result.topic.id])
+            print(f"💾 [{result.elapsed:.1f}s] {result.topic.title} -> {result.path}")
+        else:
+            print(f"❌ {result.topic.title}: {result.error}")
+
+    def run(self, stream: bool = True, combined: bool = False):
+        """
+        Main automation workflow
+
+        Args:
+            stream: Stream the video package to the console and file as it is generated
+            combined: Analyze and generate in a single call (see analyze_and_generate)
+        """
         print("=" * 60)
         print("🚀 VIRAL CONTENT AUTOMATION TOOL")
         print("=" * 60)
@@ -242,55 +796,439 @@ Format everything clearly with headers so it's ready to copy and paste."""
                         print(f"{i}. {topic}")
                         print()
 
-        # Step 4: Analyze the content
-        # Use article_url if available, otherwise fall back to url
-        analysis_url = selected_topic.article_url if selected_topic.article_url else selected_topic.url
-        article_summary = self.analyze_article_with_ai(
-            analysis_url,
-            selected_topic.title
-        )
-        print(article_summary)
-
-        # Step 5: Generate video creation materials
-        video_package = self.generate_video_prompt(selected_topic, article_summary)
+        if not combined:
+            # Step 4: Analyze the content
+            # Use article_url if available, otherwise fall back to url
+            analysis_url = selected_topic.article_url if selected_topic.article_url else selected_topic.url
+            article_summary = self.analyze_article_with_ai(
+                analysis_url,
+                selected_topic.title
+            )
+            print(article_summary)
 
-        print("\n" + "=" * 60)
-        print("🎉 YOUR YOUTUBE VIDEO PACKAGE IS READY!")
-        print("=" * 60)
-        print(video_package)
+        if stream:
+            # Steps 5 and 6: Stream the package into its file as it is generated
+            filename = self._package_path(selected_topic)
+            with open(filename, 'w', encoding='utf-8') as f:
+                if not combined:
+                    self._write_package_header(f, selected_topic, article_summary)
+                try:
+                    if combined:
+                        # Steps 4-6 in one call; the header goes in once the analysis is done
+                        def start_package(summary: str) -> None:
+                            print(summary)
+                            self._write_package_header(f, selected_topic, summary)
+                        self.analyze_and_generate(selected_topic, sink=f, on_summary=start_package)
+                    else:
+                        self.generate_video_prompt(selected_topic, article_summary, sink=f)
+                except Exception:
+                    f.write("\n\n[Generation interrupted - this package is incomplete]\n")
+                    print(f"\n\n⚠️  Generation interrupted; partial package saved to: {filename}")
+                    raise
+            print("\n\n" + "=" * 60)
+            print("🎉 YOUR YOUTUBE VIDEO PACKAGE IS READY!")
+            print("=" * 60)
+            if self.last_generation_timing is not None:
+                print(f"⏱️  Generation: {self.last_generation_timing}")
+        else:
+            # Step 5: Generate video creation materials
+            if combined:
+                article_summary, video_package = self.analyze_and_generate(selected_topic)
+                print(article_summary)
+            else:
+                video_package = self.generate_video_prompt(selected_topic, article_summary)
 
-        # Step 6: Save to file
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"video_package_{timestamp}.txt"
+            print("\n" + "=" * 60)
+            print("🎉 YOUR YOUTUBE VIDEO PACKAGE IS READY!")
+            print("=" * 60)
+            print(video_package)
 
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write("=" * 60 + "\n")
-            f.write("YOUTUBE VIDEO CREATION PACKAGE\n")
-            f.write(f"Generated: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}\n")
-            f.write(f"Topic: {selected_topic.title}\n")
-            if selected_topic.article_url:
-                f.write(f"Article URL: {selected_topic.article_url}\n")
-                f.write(f"Article Source: {selected_topic.article_source}\n")
-            f.write(f"Reddit Discussion: {selected_topic.url}\n")
-            f.write(f"Reddit Score: {selected_topic.score:,}\n")
-            f.write(f"Comments: {selected_topic.comment_count:,}\n")
-            f.write("=" * 60 + "\n\n")
-            f.write("CONTENT ANALYSIS:\n")
-            f.write(article_summary)
-            f.write("\n\n" + "=" * 60 + "\n\n")
-            f.write(video_package)
+            # Step 6: Save to file
+            filename = self.save_video_package(selected_topic, article_summary, video_package)
 
+        self.topic_store.mark_seen([selected_topic.id])
         print(f"\n💾 Saved to: {filename}")
         print("\n✨ Copy the content above and paste into your AI video creator!")
 
 
-if __name__ == "__main__":
+def run_daemon(min_interval: float, max_interval: float) -> None:
+    """Poll every config on its own adaptive cadence, recording new topics"""
+    # Imported here so the interactive tool doesn't load asyncio machinery
+    import asyncio
+    from automation.daemon import PollingDaemon
+
+    store = TopicStore()
+    configs = [
+        VIRAL_ENTERTAINMENT_CONFIG,
+        VIRAL_FOOD_CONFIG,
+        VIRAL_GAMING_CONFIG,
+        VIRAL_LIFESTYLE_CONFIG,
+        VIRAL_HOBBIES_CONFIG,
+        VIRAL_SPORTS_CONFIG,
+        VIRAL_ALL_CONFIG
+    ]
+
+    def announce(topics: List[TrendingTopic]) -> None:
+        for topic in topics:
+            print(f"🆕 r/{topic.subreddit}: {topic.title} ({topic.score:,})")
+
+    daemon = PollingDaemon(
+        configs,
+        announce,
+        # No response cache: a cached listing would look unchanged, faking zero
+        # churn for the poll interval and zero velocity in the store
+        client_factory=lambda config: RedditClient(config, store=store),
+        initial_interval=min(max(300.0, min_interval), max_interval),
+        min_interval=min_interval,
+        max_interval=max_interval,
+    )
+    print(f"🛰️  Polling {len(configs)} configs every {min_interval:.0f}-{max_interval:.0f}s (Ctrl+C to stop)")
+    asyncio.run(daemon.run())
+    store.close()
+    print("\n👋 Polling stopped.")
+
+
+def _read_topic_records(source: str) -> List[Dict[str, Any]]:
+    """Topic records from a JSON array or JSON Lines file, e.g. fetch output ("-" reads stdin)"""
+    text = sys.stdin.read() if source == "-" else Path(source).read_text(encoding="utf-8")
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def _input_records(automation: ViralContentAutomation, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Topics named by --topics or --url, or else the current top --count from Reddit"""
+    if args.topics:
+        return _read_topic_records(args.topics)
+    if getattr(args, "url", None):
+        topic = TrendingTopic(
+            id="custom",
+            title=args.title or args.url,
+            url=args.url,
+            score=0,
+            comment_count=0,
+            retrieved_at=datetime.now(timezone.utc),
+            article_url=args.url,
+        )
+        return [topic.to_dict()]
+    return [topic.to_dict() for topic in automation.fetch_viral_content_from_reddit(args.count)]
+
+
+def _emit(
+    out: TextIO,
+    records: Iterable[Dict[str, Any]],
+    fmt: str,
+    render: Callable[[Dict[str, Any]], str],
+) -> None:
+    """Write records as numbered text, one JSON array, or JSON Lines as they arrive"""
+    if fmt == "json":
+        json.dump(list(records), out, indent=2, ensure_ascii=False)
+        out.write("\n")
+        return
+    for i, record in enumerate(records, 1):
+        out.write(json.dumps(record, ensure_ascii=False) if fmt == "jsonl" else f"{i}. {render(record)}")
+        out.write("\n")
+        out.flush()
+
+
+def cmd_fetch(automation: ViralContentAutomation, args: argparse.Namespace, out: TextIO) -> int:
+    topics = automation.fetch_viral_content_from_reddit(args.count)
+    _emit(out, (topic.to_dict() for topic in topics), args.format,
+          lambda record: str(TrendingTopic.from_dict(record)))
+    return 0
+
+
+def cmd_analyze(automation: ViralContentAutomation, args: argparse.Namespace, out: TextIO) -> int:
+    records = _input_records(automation, args)
+    topics = [TrendingTopic.from_dict(record) for record in records]
+    article_texts = automation.fetch_article_texts(topics)
+
+    def analyzed() -> Iterable[Dict[str, Any]]:
+        for record, topic in zip(records, topics):
+            summary = automation.analyze_article_with_ai(
+                topic.article_url or topic.url, topic.title, article_texts.get(topic.id, "")
+            )
+            yield dict(record, summary=summary)
+
+    _emit(out, analyzed(), args.format, lambda record: f"{record['title']}\n\n{record['summary']}\n")
+    return 0
+
+
+def cmd_generate(automation: ViralContentAutomation, args: argparse.Namespace, out: TextIO) -> int:
+    records = _input_records(automation, args)
+    topics = [TrendingTopic.from_dict(record) for record in records]
+    # Records from the analyze command already carry their summary
+    article_texts = automation.fetch_article_texts(
+        [topic for record, topic in zip(records, topics) if not record.get("summary")]
+    )
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+
+    def generated() -> Iterable[Dict[str, Any]]:
+        for record, topic in zip(records, topics):
+            summary = record.get("summary")
+            if summary:
+                package = automation.generate_video_prompt(topic, summary)
+            elif args.combined:
+                summary, package = automation.analyze_and_generate(topic, article_texts.get(topic.id, ""))
+            else:
+                summary = automation.analyze_article_with_ai(
+                    topic.article_url or topic.url, topic.title, article_texts.get(topic.id, "")
+                )
+                package = automation.generate_video_prompt(topic, summary)
+            path = automation.save_video_package(topic, summary, package, args.output_dir, unique=True)
+            automation.topic_store.mark_seen([topic.id])
+            yield dict(record, summary=summary, package=package, path=str(path))
+
+    _emit(out, generated(), args.format, lambda record: f"{record['title']} -> {record['path']}")
+    return 0
+
+
+def cmd_batch(automation: ViralContentAutomation, args: argparse.Namespace, out: TextIO) -> int:
+    topics = None
+    if args.topics:
+        topics = [TrendingTopic.from_dict(record) for record in _read_topic_records(args.topics)]
+    results = automation.run_batch(
+        count=args.count,
+        output_dir=args.output_dir,
+        analyze_workers=args.analyze_workers,
+        generate_workers=args.generate_workers,
+        requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=args.tokens_per_minute,
+        topics=topics,
+        batch_backend=AnthropicBatchBackend(automation.client) if args.message_batches else None,
+        batch_state_path=args.batch_state,
+        combined=args.combined,
+    )
+    if args.format != "text":
+        _emit(out, (
+            dict(
+                result.topic.to_dict(),
+                ok=result.ok,
+                path=str(result.path) if result.path else None,
+                error=str(result.error) if result.error else None,
+                elapsed=result.elapsed,
+            )
+            for result in results
+        ), args.format, str)
+    return 0 if all(r.ok for r in results) else 1
+
+
+def cmd_filter_dumps(args: argparse.Namespace, out: TextIO) -> int:
+    """Filter archived submission dumps; needs neither Reddit nor an API key"""
+    from automation.dumps import DumpFilter
+    from automation.post_filter import REJECTION_REASONS
+
+    dump_filter = DumpFilter(
+        minimum_score=args.minimum_score,
+        blocked_keywords=args.block,
+        workers=args.workers,
+        chunk_bytes=args.chunk_mb * 1024 * 1024,
+    )
+    store = TopicStore() if args.store else None
+    output = None if args.output is None else out if args.output == "-" else open(
+        args.output, "w", encoding="utf-8"
+    )
+    print(f"📦 Filtering {len(args.paths)} dump file(s) with {dump_filter.workers} workers...")
     try:
-        automation = ViralContentAutomation()
-        automation.run()
+        stats = dump_filter.run(args.paths, output=output, store=store)
+    finally:
+        if output is not None and output is not out:
+            output.close()
+        if store is not None:
+            store.close()
+
+    rejected = ", ".join(f"{reason} {stats.results[reason]:,}" for reason in REJECTION_REASONS)
+    print(f"📦 Read {stats.lines:,} posts ({stats.bytes / 1e9:.2f} GB) in {stats.seconds:.1f}s "
+          f"({stats.megabytes_per_second:,.0f} MB/s)")
+    print(f"✅ Accepted {stats.accepted:,}; rejected: {rejected}")
+    if stats.results["malformed"]:
+        print(f"⚠️  Skipped {stats.results['malformed']:,} malformed lines")
+    return 0
+
+
+COMMANDS = {
+    "fetch": cmd_fetch,
+    "analyze": cmd_analyze,
+    "generate": cmd_generate,
+    "batch": cmd_batch,
+}
+
+
+def _add_common_options(parser: argparse.ArgumentParser, default: Callable[[Any], Any]) -> None:
+    parser.add_argument("--rank", choices=["score", "velocity"], default=default("score"),
+                        help="Rank topics by raw score or by how fast they are rising")
+    parser.add_argument("--no-cluster", action="store_true", default=default(False),
+                        help="Keep near-duplicate posts of the same story as separate topics")
+    parser.add_argument("--include-seen", action="store_true", default=default(False),
+                        help="Also list topics already shown or turned into packages")
+    parser.add_argument("--article-tokens", type=int, default=default(ARTICLE_TOKEN_BUDGET),
+                        help="Token budget for article text sent to analysis (0 skips downloading articles)")
+    parser.add_argument("--metrics", type=Path, metavar="PATH", default=default(None),
+                        help="Write request counts, latencies and token usage here on exit")
+    parser.add_argument("--metrics-format", choices=["json", "prometheus"], default=default(None),
+                        help="Format for --metrics (default: prometheus for .prom files, else json)")
+    parser.add_argument("--profile", type=Path, metavar="PATH", default=default(None),
+                        help="Run under cProfile, save the stats here and print the top functions")
+
+
+def _add_combined_option(parser: argparse.ArgumentParser, default: Callable[[Any], Any]) -> None:
+    parser.add_argument("--combined", action="store_true", default=default(False),
+                        help="Analyze and generate each package in one Claude call instead of two")
+
+
+def _add_batch_options(parser: argparse.ArgumentParser, default: Callable[[Any], Any]) -> None:
+    parser.add_argument("--output-dir", type=Path, default=default(Path(".")),
+                        help="Directory for video package files (default: current directory)")
+    parser.add_argument("--analyze-workers", type=int, default=default(2),
+                        help="Maximum concurrent analysis calls in batch mode")
+    parser.add_argument("--generate-workers", type=int, default=default(2),
+                        help="Maximum concurrent generation calls in batch mode")
+    parser.add_argument("--requests-per-minute", type=int, default=default(None),
+                        help="Anthropic request budget for batch mode")
+    parser.add_argument("--tokens-per-minute", type=int, default=default(None),
+                        help="Anthropic input-token budget for batch mode")
+    parser.add_argument("--message-batches", action="store_true", default=default(False),
+                        help="Submit batch mode requests through the Message Batches API")
+    parser.add_argument("--batch-state", type=Path, default=default(Path(".message_batch_state.json")),
+                        help="Checkpoint file used to resume an interrupted --message-batches run")
+
+
+def _add_daemon_options(parser: argparse.ArgumentParser, default: Callable[[Any], Any]) -> None:
+    parser.add_argument("--min-interval", type=float, default=default(60.0),
+                        help="Shortest polling interval per config in daemon mode (seconds)")
+    parser.add_argument("--max-interval", type=float, default=default(1800.0),
+                        help="Longest polling interval per config in daemon mode (seconds)")
+
+
+def _add_command_options(parser: argparse.ArgumentParser, topics: bool = False, url: bool = False) -> None:
+    parser.add_argument("--count", type=int, default=10, help="Number of top topics (default: 10)")
+    parser.add_argument("--format", choices=["text", "json", "jsonl"], default="text",
+                        help="Output format; with json/jsonl, progress messages go to stderr")
+    if topics:
+        parser.add_argument("--topics", metavar="FILE",
+                            help="Use topics from a fetch --format json/jsonl file (- for stdin) "
+                                 "instead of fetching")
+    if url:
+        parser.add_argument("--url", help="Use this article URL instead of fetching topics")
+        parser.add_argument("--title", help="Title to go with --url")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0],
+        epilog="Without a command, runs the interactive tool.",
+    )
+    keep = lambda value: value  # noqa: E731
+    # Options repeated on a command must not reset values given before the command name
+    unset = lambda value: argparse.SUPPRESS  # noqa: E731
+    _add_common_options(parser, keep)
+    parser.add_argument("--batch", type=int, metavar="N",
+                        help="Same as the batch command with --count N")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Same as the daemon command")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="Wait for the whole video package instead of streaming it")
+    _add_combined_option(parser, keep)
+    _add_batch_options(parser, keep)
+    _add_daemon_options(parser, keep)
+
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    fetch = commands.add_parser("fetch", help="Fetch and record trending topics (no API key needed)")
+    _add_command_options(fetch)
+    analyze = commands.add_parser("analyze", help="Summarize topics' articles with Claude")
+    _add_command_options(analyze, topics=True, url=True)
+    generate = commands.add_parser("generate", help="Write a video package for each topic")
+    _add_command_options(generate, topics=True, url=True)
+    generate.add_argument("--output-dir", type=Path, default=unset(None),
+                          help="Directory for video package files (default: current directory)")
+    _add_combined_option(generate, unset)
+    batch = commands.add_parser("batch", help="Analyze and generate the top topics concurrently")
+    _add_command_options(batch, topics=True)
+    _add_batch_options(batch, unset)
+    _add_combined_option(batch, unset)
+    daemon = commands.add_parser("daemon", help="Keep polling Reddit and record new topics until stopped")
+    _add_daemon_options(daemon, unset)
+    dumps = commands.add_parser("filter-dumps",
+                                help="Run archived NDJSON submission dumps through the fetch filters")
+    dumps.add_argument("paths", nargs="+", type=Path, help="Uncompressed NDJSON dump files")
+    dumps.add_argument("--minimum-score", type=int, default=100, help="Score threshold (default: 100)")
+    dumps.add_argument("--block", action="append", default=[], metavar="TERM",
+                       help="Extra title term to reject, on top of the political filter (repeatable)")
+    dumps.add_argument("--workers", type=int, help="Worker processes (default: one per core)")
+    dumps.add_argument("--chunk-mb", type=int, default=32, help="Megabytes of dump per work unit")
+    dumps.add_argument("--output", metavar="PATH",
+                       help="Write accepted topics as JSON Lines to PATH (- for stdout)")
+    dumps.add_argument("--store", action="store_true", help="Record accepted topics in the topic history")
+    for command in (fetch, analyze, generate, batch, daemon, dumps):
+        _add_common_options(command, unset)
+    return parser.parse_args(argv)
+
+
+def write_metrics(path: Path, fmt: Optional[str] = None) -> None:
+    """Write the shared metrics registry as JSON or Prometheus text"""
+    metrics = get_metrics()
+    if fmt is None:
+        fmt = "prometheus" if path.suffix == ".prom" else "json"
+    path.write_text(metrics.to_prometheus() if fmt == "prometheus" else metrics.to_json(), encoding="utf-8")
+    print(f"📈 Metrics written to {path}", file=sys.stderr)
+
+
+def run_command(args: argparse.Namespace) -> int:
+    if args.daemon or args.command == "daemon":
+        run_daemon(args.min_interval, args.max_interval)
+        return 0
+    if args.command == "filter-dumps":
+        # Keep stdout machine-readable: progress messages go to stderr
+        out = sys.stdout
+        with redirect_stdout(sys.stderr):
+            return cmd_filter_dumps(args, out)
+    if args.batch and args.command is None:
+        args.command, args.count, args.topics, args.format = "batch", args.batch, None, "text"
+
+    automation = ViralContentAutomation(
+        ranking=args.rank, article_tokens=args.article_tokens, cluster=not args.no_cluster,
+        include_seen=args.include_seen,
+    )
+    if args.command != "fetch":
+        automation.client  # Fail now rather than after fetching when there's no API key
+    if args.command is None:
+        automation.run(stream=not args.no_stream, combined=args.combined)
+        return 0
+
+    # Keep stdout machine-readable: progress messages go to stderr
+    out = sys.stdout
+    with redirect_stdout(sys.stderr) if args.format != "text" else nullcontext():
+        return COMMANDS[args.command](automation, args, out)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        return run_command(args)
     except KeyboardInterrupt:
-        print("\n\n❌ Operation cancelled by user.")
+        print("\n\n❌ Operation cancelled by user.", file=sys.stderr)
+        return 130
     except Exception as e:
-        print(f"\n❌ Error: {e}")
+        print(f"\n❌ Error: {e}", file=sys.stderr)
         import traceback
         traceback.print_exc()
+        return 1
+    finally:
+        if profiler is not None:
+            import pstats
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"\n⏱️  Profile written to {args.profile}; top functions by cumulative time:",
+                  file=sys.stderr)
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(15)
+        if args.metrics:
+            write_metrics(args.metrics, args.metrics_format)
+
+
+if __name__ == "__main__":
+    sys.exit(main())